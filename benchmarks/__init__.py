@@ -0,0 +1,13 @@
+"""Performance benchmarks
+
+- ``benchmarks.corpus`` generates synthetic Pelican content trees
+- ``benchmarks.suite`` measures throughput and peak memory of reading,
+  indexing, formatting and saving posts, and compares them with baseline
+- ``benchmarks.bench_syscalls`` counts filesystem calls made while
+  finding and reading posts
+- ``benchmarks.bench_query`` measures time of queries over tags,
+  categories and authors of 100k posts
+- ``bench_parser.py`` and ``bench_startup.py`` are standalone scripts
+
+Run from repository root, e.g. ``python -m benchmarks.suite``.
+"""
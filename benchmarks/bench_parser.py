@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Microbenchmark of header parsing in file handlers
+
+Reports time spent in ``read_stream`` per line of input, for header
+lines and for body lines separately.
+
+Usage: python benchmarks/bench_parser.py [--repeat N]
+"""
+
+import argparse
+import timeit
+
+from pelican_metadata_generator import file_handler
+
+MARKDOWN_HEADERS = [
+    "Title: Benchmarking header parser\n",
+    "Slug: benchmarking-header-parser\n",
+    "Date: 2020-09-01 12:00\n",
+    "Modified: 2020-09-02 12:00\n",
+    "Category: Performance\n",
+    "Tags: Python, Regular expressions,\n",
+    "    Benchmarks, Parsing\n",
+    "Authors: First Author; Second Author\n",
+    "Summary: Simple post used to measure how fast headers are parsed\n",
+    "\n",
+]
+
+RESTRUCTUREDTEXT_HEADERS = [
+    "Benchmarking header parser\n",
+    "##########################\n",
+    "\n",
+    ":slug: benchmarking-header-parser\n",
+    ":date: 2020-09-01 12:00\n",
+    ":modified: 2020-09-02 12:00\n",
+    ":category: Performance\n",
+    ":tags: Python, Regular expressions, Benchmarks, Parsing\n",
+    ":authors: - First Author\n",
+    "          - Second Author\n",
+    ":summary: Simple post used to measure how fast headers are parsed\n",
+    "\n",
+]
+
+BODY = ["Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n", "\n"] * 50
+
+
+def bench(handler_class, lines, repeat):
+    handler = handler_class("")
+
+    def run():
+        handler.headers = {}
+        handler.read_stream(lines)
+
+    return min(timeit.repeat(run, number=300, repeat=repeat)) / 300 / len(lines) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    cases = [
+        ("markdown", file_handler.MarkdownHandler, MARKDOWN_HEADERS),
+        ("restructuredtext", file_handler.RestructuredtextHandler, RESTRUCTUREDTEXT_HEADERS),
+    ]
+    for name, handler_class, headers in cases:
+        header_time = bench(handler_class, headers, args.repeat)
+        post_time = bench(handler_class, headers + BODY, args.repeat)
+        print(
+            "{name:>16}: {header:.3f} us/line (headers only), "
+            "{post:.3f} us/line (full post)".format(name=name, header=header_time, post=post_time)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Measures time of evaluating queries over tags, categories and authors
+
+Headers of synthetic posts (see benchmarks.corpus) are parsed in memory,
+without writing files, and added to Vocabulary. Then every query is
+evaluated repeatedly; best time is reported.
+
+Usage: python -m benchmarks.bench_query [--posts N] [--repeat N]
+"""
+
+import sys
+import time
+import argparse
+import timeit
+
+from pelican_metadata_generator import file_handler
+from pelican_metadata_generator import query
+from pelican_metadata_generator import scanner
+from pelican_metadata_generator import vocabulary
+
+from benchmarks import corpus
+
+QUERIES = [
+    '"tag:Tag 0"',
+    '"tag:Tag 0" AND "category:Category 1"',
+    '"tag:Tag 0" AND "category:Category 1" AND NOT "author:Author 0"',
+    '"tag:Tag 1" OR "tag:Tag 2" OR "tag:Tag 3"',
+    '"tag:Tag 1*" AND NOT "category:Category 0"',
+    'NOT "tag:Tag 0"',
+    '"tag:Tag 400" AND "tag:Tag 0"',
+]
+
+
+def build(spec):
+    """Returns Vocabulary with headers of every post in corpus"""
+    index = vocabulary.Vocabulary()
+    for path, content in corpus.iter_posts(spec):
+        handler = file_handler.Factory(path).handler("")
+        handler.read_stream(content.splitlines(keepends=True))
+        index.add_record(scanner.HeaderRecord(path, handler.headers))
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    corpus.add_spec_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=5)
+    # Only headers are indexed
+    parser.set_defaults(posts=100000, body_lines=[1, 1])
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build(corpus.spec_from_args(args))
+    print("Indexed {} posts in {:.1f} s".format(len(index.records), time.perf_counter() - start))
+
+    for text in QUERIES:
+        parsed = query.Query(text)
+        matches = len(parsed.evaluate(index))
+        best = min(timeit.repeat(lambda: parsed.evaluate(index), number=1, repeat=args.repeat))
+        print("{:>8.2f} ms {:>8} posts  {}".format(best * 1000, matches, text))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Startup latency of graphical user interface
+
+Starts application in fresh process, on Qt offscreen platform, and
+reports time from start of PyQt5 import to first paint of main window.
+Every run is done in new process, so nothing is cached between runs.
+
+Usage: python benchmarks/bench_startup.py [--repeat N] [--directory DIR]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import time
+
+
+def run_once(directory):
+    """Starts application and prints timings (in seconds) as JSON"""
+    start = time.perf_counter()
+    from PyQt5 import QtCore, QtWidgets
+
+    import pelican_metadata_generator.cli
+    import pelican_metadata_generator.controller
+    import pelican_metadata_generator.model
+    import pelican_metadata_generator.view
+
+    imported = time.perf_counter()
+    app = QtWidgets.QApplication([])
+    known_metadata_model = pelican_metadata_generator.model.MetadataDatabase()
+    post_model = pelican_metadata_generator.model.NewPostMetadata()
+    window = pelican_metadata_generator.view.MainWindow()
+    controller = pelican_metadata_generator.controller.Controller(  # noqa: F841
+        known_metadata_model, post_model, window
+    )
+    constructed = time.perf_counter()
+    timings = {}
+
+    class PaintFilter(QtCore.QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QtCore.QEvent.Paint and "first_paint" not in timings:
+                timings["first_paint"] = time.perf_counter() - start
+                if not directory:
+                    app.quit()
+            return False
+
+    paint_filter = PaintFilter()
+    window.installEventFilter(paint_filter)
+    known_metadata_model.scanFinished.connect(
+        lambda done, elapsed: timings.update(scan_finished=time.perf_counter() - start)
+    )
+    window.show()
+    QtCore.QTimer.singleShot(
+        0,
+        lambda: pelican_metadata_generator.cli.read_directories(
+            known_metadata_model, [directory] if directory else [], app.quit
+        ),
+    )
+    QtCore.QTimer.singleShot(30000, app.quit)
+    app.exec_()
+
+    timings["import"] = imported - start
+    timings["construct"] = constructed - imported
+    print(json.dumps(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--directory", help="Directory read at startup")
+    parser.add_argument("--once", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.once:
+        run_once(args.directory)
+        return
+
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    command = [sys.executable, __file__, "--once"]
+    if args.directory:
+        command.extend(["--directory", args.directory])
+
+    results = []
+    for _ in range(args.repeat):
+        output = subprocess.check_output(command, env=env, stderr=subprocess.DEVNULL)
+        results.append(json.loads(output.decode().splitlines()[-1]))
+
+    for key in ["import", "construct", "first_paint", "scan_finished"]:
+        values = [r[key] * 1000 for r in results if key in r]
+        if not values:
+            continue
+        print(
+            "{key:>14}: median {median:8.1f} ms, min {min:8.1f} ms".format(
+                key=key, median=statistics.median(values), min=min(values)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Counts filesystem calls made while finding and reading posts
+
+Synthetic Pelican project is generated: content (see benchmarks.corpus)
+next to version control, output and image directories full of files
+that are not posts. Calls of os functions that map to single system call
+(stat, lstat, scandir, open, pread, posix_fadvise) are counted while
+directory is walked with os.walk (as scanner did before) and with
+pelican_metadata_generator.walker, and while headers of found posts are
+read; bytes read per post are reported too.
+
+File type checks of os.DirEntry are not counted; they cost a system call
+only on filesystems that do not report file type in directory entries.
+
+Usage: python -m benchmarks.bench_syscalls [--posts N] [--noise N]
+"""
+
+import io
+import os
+import sys
+import shutil
+import argparse
+import builtins
+import tempfile
+import contextlib
+import collections
+
+from pelican_metadata_generator import file_handler
+from pelican_metadata_generator import walker
+
+from benchmarks import corpus
+
+COUNTED = [
+    (module, name)
+    for module, name in [
+        (os, "stat"),
+        (os, "lstat"),
+        (os, "fstat"),
+        (os, "scandir"),
+        (os, "listdir"),
+        (os, "open"),
+        (os, "pread"),
+        (os, "posix_fadvise"),
+        (builtins, "open"),
+        (io, "open"),
+    ]
+    # pread and posix_fadvise are missing on some platforms
+    if hasattr(module, name)
+]
+
+
+@contextlib.contextmanager
+def count_calls():
+    """Counts calls of COUNTED functions while in context; yields Counter"""
+    counts = collections.Counter()
+    originals = []
+    for module, name in COUNTED:
+        original = getattr(module, name)
+        originals.append((module, name, original))
+
+        def counted(*args, _name=name, _original=original, **kwargs):
+            counts[_name] += 1
+            return _original(*args, **kwargs)
+
+        setattr(module, name, counted)
+    try:
+        yield counts
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+
+
+def generate_project(directory, spec, noise):
+    """Writes Pelican project with ``noise`` files in each non-content directory"""
+    corpus.generate(os.path.join(directory, "content"), spec)
+    with open(os.path.join(directory, "pelicanconf.py"), "w") as fh:
+        fh.write("PATH = 'content'\n")
+
+    for name, extension in [
+        (".git/objects", ""),
+        ("output", ".html"),
+        ("content/images", ".png"),
+        ("node_modules/theme", ".js"),
+    ]:
+        for i in range(noise):
+            path = os.path.join(
+                directory, name, "{:02x}".format(i % 64), "{}{}".format(i, extension)
+            )
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as fh:
+                fh.write(b"x")
+
+
+def legacy_walk(directory):
+    """Finds posts as scanner did before walker: os.walk and Factory of every file"""
+    paths = []
+    for path in (
+        os.path.join(root, filename)
+        for root, _, filenames in os.walk(directory)
+        for filename in filenames
+    ):
+        try:
+            file_handler.Factory(path)
+        except NotImplementedError:
+            continue
+        paths.append(path)
+    return paths
+
+
+def report(name, counts, files):
+    total = sum(counts.values())
+    details = ", ".join("{}={}".format(key, counts[key]) for key in sorted(counts))
+    print(
+        "{name:>14}: {total:8} calls, {per_file:6.2f} per post  ({details})".format(
+            name=name, total=total, per_file=total / max(files, 1), details=details
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    corpus.add_spec_arguments(parser)
+    parser.add_argument(
+        "--noise", type=int, default=2000, help="Files in each directory that is not content"
+    )
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="pmg-syscalls-")
+    try:
+        generate_project(directory, corpus.spec_from_args(args), args.noise)
+
+        with count_calls() as counts:
+            paths = legacy_walk(directory)
+        report("os.walk", counts, len(paths))
+
+        with count_calls() as counts:
+            found = list(walker.walk(directory))
+        report("walker", counts, len(found))
+
+        bytes_read = 0
+        with count_calls() as counts:
+            for path in found:
+                bytes_read += file_handler.Factory(path, headers_only=True).generate().bytes_read
+        report("read headers", counts, len(found))
+        print("{:>14}: {:8.0f} bytes per post".format("", bytes_read / max(len(found), 1)))
+    finally:
+        shutil.rmtree(directory)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""Generator of synthetic Pelican content trees
+
+The same seed and options always produce the same files, so results of
+benchmarks run on different machines or commits can be compared.
+
+Usage: python -m benchmarks.corpus DIRECTORY [--posts N] [--seed N] ...
+"""
+
+import os
+import random
+import argparse
+import itertools
+
+FORMATS = ["md", "rst"]
+
+# simple:    "Tags: a, b"
+# multiline: values continued on indented lines
+# list:      values separated by semicolons (Markdown) or "- " list (RST)
+# yaml:      Markdown headers between "---" lines (RST falls back to simple)
+HEADER_SHAPES = ["simple", "multiline", "list", "yaml"]
+
+# Posts in single directory; bigger corpora are split into subdirectories
+POSTS_PER_DIRECTORY = 1000
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat duis aute irure"
+).split()
+
+
+class CorpusSpec:
+    """Parameters of generated corpus
+
+    Parameters
+    ----------
+    posts
+        Number of posts.
+    seed
+        Seed of random number generator.
+    formats
+        File formats (extensions) used, chosen uniformly.
+    header_shapes
+        Header shapes used, chosen uniformly. See HEADER_SHAPES.
+    body_lines
+        Tuple of minimal and maximal number of lines of post body.
+    tags
+        Number of distinct tags.
+    categories
+        Number of distinct categories.
+    authors
+        Number of distinct authors.
+    skew
+        Exponent of Zipf distribution of tags, categories and authors. 0
+        means that all values are used equally often; bigger value means
+        that few values are used by most posts.
+    """
+
+    __slots__ = (
+        "posts",
+        "seed",
+        "formats",
+        "header_shapes",
+        "body_lines",
+        "tags",
+        "categories",
+        "authors",
+        "skew",
+    )
+
+    def __init__(
+        self,
+        posts=1000,
+        seed=0,
+        formats=FORMATS,
+        header_shapes=HEADER_SHAPES,
+        body_lines=(5, 50),
+        tags=500,
+        categories=20,
+        authors=30,
+        skew=1.1,
+    ):
+        self.posts = posts
+        self.seed = seed
+        self.formats = list(formats)
+        self.header_shapes = list(header_shapes)
+        self.body_lines = tuple(body_lines)
+        self.tags = tags
+        self.categories = categories
+        self.authors = authors
+        self.skew = skew
+
+    def as_dict(self):
+        """Returns parameters as JSON-compatible dictionary"""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["body_lines"] = list(self.body_lines)
+        return data
+
+
+class _ZipfValues:
+    """Draws values from vocabulary with Zipf-distributed frequency"""
+
+    def __init__(self, rng, prefix, size, skew):
+        self.rng = rng
+        self.values = ["{} {}".format(prefix, i) for i in range(size)]
+        weights = [1 / (rank**skew) for rank in range(1, size + 1)]
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def sample(self, k):
+        values = self.rng.choices(self.values, cum_weights=self.cum_weights, k=k)
+        # Posts do not list the same value twice
+        return list(dict.fromkeys(values))
+
+
+def _markdown_headers(headers, shape):
+    lines = []
+    if shape == "yaml":
+        lines.append("---")
+    for key, values in headers:
+        if not isinstance(values, list):
+            lines.append("{}: {}".format(key.title(), values))
+        elif shape == "multiline":
+            lines.append("{}: {}".format(key.title(), values[0]))
+            lines.extend("    {}".format(value) for value in values[1:])
+        elif shape == "list":
+            lines.append("{}: {}".format(key.title(), "; ".join(values)))
+        else:
+            lines.append("{}: {}".format(key.title(), ", ".join(values)))
+    if shape == "yaml":
+        lines.append("---")
+    return lines
+
+
+def _restructuredtext_headers(headers, shape):
+    title = headers[0][1]
+    lines = [title, "#" * len(title), ""]
+    for key, values in headers[1:]:
+        if not isinstance(values, list):
+            lines.append(":{}: {}".format(key, values))
+        elif shape == "multiline":
+            # Continuation lines are joined with space, so values keep commas
+            wrapped = ", ".join(values).split(" ")
+            lines.append(":{}: {}".format(key, " ".join(wrapped[:2])))
+            lines.extend("    {}".format(word) for word in wrapped[2:])
+        elif shape == "list":
+            lines.append(":{}: - {}".format(key, values[0]))
+            lines.extend("    - {}".format(value) for value in values[1:])
+        else:
+            lines.append(":{}: {}".format(key, ", ".join(values)))
+    return lines
+
+
+def _body(rng, spec):
+    lines = []
+    for _ in range(rng.randint(*spec.body_lines)):
+        lines.append(" ".join(rng.choices(WORDS, k=rng.randint(3, 14))).capitalize())
+        if rng.random() < 0.2:
+            lines.append("")
+    return lines
+
+
+def iter_posts(spec):
+    """Yields (relative path, content) of every post in corpus"""
+    rng = random.Random(spec.seed)
+    tags = _ZipfValues(rng, "Tag", spec.tags, spec.skew)
+    categories = _ZipfValues(rng, "Category", spec.categories, spec.skew)
+    authors = _ZipfValues(rng, "Author", spec.authors, spec.skew)
+
+    for i in range(spec.posts):
+        file_format = rng.choice(spec.formats)
+        shape = rng.choice(spec.header_shapes)
+        title = "Post number {}".format(i)
+        headers = [
+            ("title", title),
+            ("slug", "post-number-{}".format(i)),
+            ("date", "20{:02d}-{:02d}-{:02d} 12:00".format(i % 20, i % 12 + 1, i % 28 + 1)),
+            ("category", categories.sample(1)[0]),
+            ("tags", tags.sample(rng.randint(1, 6))),
+            ("authors", authors.sample(rng.randint(1, 2))),
+            ("summary", " ".join(rng.choices(WORDS, k=12))),
+        ]
+
+        if file_format == "md":
+            lines = _markdown_headers(headers, shape)
+        else:
+            lines = _restructuredtext_headers(headers, shape)
+        lines.append("")
+        lines.extend(_body(rng, spec))
+
+        directory = "{:04d}".format(i // POSTS_PER_DIRECTORY)
+        path = os.path.join(directory, "post-{:07d}.{}".format(i, file_format))
+        yield path, "\n".join(lines) + "\n"
+
+
+def generate(directory, spec):
+    """Writes corpus described by CorpusSpec into directory
+
+    Posts are generated and written one at a time, so even corpora of
+    million posts do not need much memory.
+
+    Returns
+    -------
+    int
+        Total size of written posts, in bytes.
+    """
+    size = 0
+    created = set()
+    for path, content in iter_posts(spec):
+        path = os.path.join(directory, path)
+        parent = os.path.dirname(path)
+        if parent not in created:
+            os.makedirs(parent, exist_ok=True)
+            created.add(parent)
+        data = content.encode("utf-8")
+        with open(path, "wb") as fh:
+            fh.write(data)
+        size += len(data)
+    return size
+
+
+def add_spec_arguments(parser):
+    """Adds CorpusSpec options to argparse parser"""
+    parser.add_argument("--posts", type=int, default=1000, help="Number of posts")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS)
+    parser.add_argument("--header-shapes", nargs="+", choices=HEADER_SHAPES, default=HEADER_SHAPES)
+    parser.add_argument("--body-lines", type=int, nargs=2, default=[5, 50], metavar=("MIN", "MAX"))
+    parser.add_argument("--tags", type=int, default=500, help="Number of distinct tags")
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--authors", type=int, default=30)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of value frequency")
+
+
+def spec_from_args(args):
+    return CorpusSpec(
+        posts=args.posts,
+        seed=args.seed,
+        formats=args.formats,
+        header_shapes=args.header_shapes,
+        body_lines=args.body_lines,
+        tags=args.tags,
+        categories=args.categories,
+        authors=args.authors,
+        skew=args.skew,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="Directory that corpus is written to")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    size = generate(args.directory, spec_from_args(args))
+    print("Wrote {posts} posts, {size:.1f} MB".format(posts=args.posts, size=size / 1e6))
+
+
+if __name__ == "__main__":
+    main()
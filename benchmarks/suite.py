@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""Throughput and peak memory benchmarks of reading, indexing and saving posts
+
+Benchmarks run on synthetic corpus (see benchmarks.corpus). Results are
+written as JSON and may be compared with baseline, so regressions are
+caught: run exits with status 1 if any benchmark is slower, or uses more
+memory, than baseline allows.
+
+Usage: python -m benchmarks.suite [--posts N] [--output FILE] [--baseline FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+from pelican_metadata_generator import file_handler
+from pelican_metadata_generator import model
+from pelican_metadata_generator import walker
+
+from benchmarks import corpus
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Posts that read_stream and format_headers benchmarks use; they work on
+# data in memory, so they do not need whole corpus
+SAMPLE_SIZE = 1000
+
+# Relative slowdown or memory growth that is still not a regression
+TOLERANCE = 0.25
+
+# Memory growth (in bytes) that is never a regression; tiny peaks are noisy
+MEMORY_SLACK = 1024 * 1024
+
+
+class Context:
+    """Data shared by benchmarks
+
+    Attributes
+    ----------
+    directory
+        Directory with corpus.
+    paths
+        Paths of all posts in corpus.
+    scratch
+        Directory that benchmarks which modify files may use.
+    """
+
+    def __init__(self, directory, scratch):
+        self.directory = directory
+        self.paths = sorted(walker.walk(directory))
+        self.scratch = scratch
+        self._sample = None
+
+    @property
+    def sample(self):
+        """List of (handler class, lines) of first SAMPLE_SIZE posts"""
+        if self._sample is None:
+            self._sample = []
+            for path in self.paths[:SAMPLE_SIZE]:
+                with open(path, encoding="utf-8") as fh:
+                    lines = fh.readlines()
+                self._sample.append((file_handler.Factory(path).handler, lines))
+        return self._sample
+
+    def copy_corpus(self):
+        """Returns paths of posts in fresh copy of corpus"""
+        target = os.path.join(self.scratch, "corpus")
+        shutil.rmtree(target, ignore_errors=True)
+        shutil.copytree(self.directory, target)
+        return [os.path.join(target, os.path.relpath(p, self.directory)) for p in self.paths]
+
+
+# Every benchmark prepares data (not measured) and returns
+# (function to measure, number of items it processes, unit of items)
+
+
+def prepare_read_stream(context):
+    handlers = [(handler_class(""), lines) for handler_class, lines in context.sample]
+    items = sum(len(lines) for _, lines in handlers)
+
+    def run():
+        for handler, lines in handlers:
+            handler.headers = {}
+            handler.read_stream(lines)
+
+    return run, items, "lines"
+
+
+def prepare_read_directory(context):
+    def run():
+        model.MetadataDatabase().read_directory(context.directory)
+
+    return run, len(context.paths), "files"
+
+
+def prepare_format_headers(context):
+    posts = []
+    for handler_class, lines in context.sample:
+        handler = handler_class("", headers_only=True)
+        handler.read_stream(lines)
+        post = model.NewPostMetadata()
+        post.title = handler.headers.get("title", "")
+        post.slug = handler.headers.get("slug", "")
+        post.date = handler.headers.get("date", "")
+        post.category = handler.headers.get("category", "")
+        post.tags = handler.headers.get("tags", "").split(", ")
+        post.authors = handler.headers.get("authors", "").split(", ")
+        post.summary = handler.headers.get("summary", "")
+        post.file_format = "markdown" if handler.default_extension == "md" else "restructuredtext"
+        posts.append(post)
+
+    def run():
+        for post in posts:
+            post._format_headers_object()
+            post.as_pelican_header()
+
+    return run, len(posts), "posts"
+
+
+def _prepare_save(context, method):
+    handlers = []
+    for path in context.copy_corpus():
+        handler = file_handler.Factory(path, headers_only=True).generate()
+        handler.headers["summary"] = "Changed by benchmark"
+        handlers.append(handler)
+
+    def run():
+        for handler in handlers:
+            getattr(handler, method)()
+
+    return run, len(handlers), "files"
+
+
+def prepare_overwrite_headers(context):
+    return _prepare_save(context, "overwrite_headers")
+
+
+def prepare_prepend_headers(context):
+    return _prepare_save(context, "prepend_headers")
+
+
+BENCHMARKS = {
+    "read_stream": prepare_read_stream,
+    "read_directory": prepare_read_directory,
+    "format_headers": prepare_format_headers,
+    "overwrite_headers": prepare_overwrite_headers,
+    "prepend_headers": prepare_prepend_headers,
+}
+
+
+def measure(prepare, context, repeat):
+    """Returns result of single benchmark; time is best of ``repeat`` runs"""
+    best = None
+    for _ in range(repeat):
+        run, items, unit = prepare(context)
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    # Memory is measured in separate run, since tracing slows code down
+    run, items, unit = prepare(context)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "items": items,
+        "unit": unit,
+        "seconds": best,
+        "throughput": items / best,
+        "peak_memory": peak,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Prints comparison with baseline; returns names of regressed benchmarks"""
+    if baseline["meta"]["corpus"] != results["meta"]["corpus"]:
+        print("Warning: baseline was recorded on different corpus")
+
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if not base:
+            continue
+        speed = result["throughput"] / base["throughput"]
+        memory = result["peak_memory"] / max(base["peak_memory"], 1)
+        memory_limit = base["peak_memory"] * (1 + tolerance) + MEMORY_SLACK
+        regressed = speed < 1 - tolerance or result["peak_memory"] > memory_limit
+        if regressed:
+            regressions.append(name)
+        print(
+            "{name:>18}: throughput {speed:6.1%} of baseline, "
+            "peak memory {memory:6.1%} of baseline{flag}".format(
+                name=name, speed=speed, memory=memory, flag="  REGRESSION" if regressed else ""
+            )
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--corpus", help="Existing corpus directory; generated from options below if not given"
+    )
+    corpus.add_spec_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of every benchmark")
+    parser.add_argument(
+        "--benchmark", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS)
+    )
+    parser.add_argument("--output", "-o", help="File that results are written to")
+    parser.add_argument("--baseline", help="Results to compare with (default: {})".format(BASELINE))
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Store results as new baseline"
+    )
+    args = parser.parse_args()
+
+    spec = corpus.spec_from_args(args)
+    scratch = tempfile.mkdtemp(prefix="pmg-bench-")
+    try:
+        directory = args.corpus
+        if not directory:
+            directory = os.path.join(scratch, "source")
+            corpus.generate(directory, spec)
+
+        context = Context(directory, scratch)
+        results = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "corpus": args.corpus or spec.as_dict(),
+                "repeat": args.repeat,
+            },
+            "benchmarks": {},
+        }
+        for name in args.benchmark:
+            result = measure(BENCHMARKS[name], context, args.repeat)
+            results["benchmarks"][name] = result
+            print(
+                "{name:>18}: {throughput:12.0f} {unit}/s, peak memory {memory:8.1f} MB".format(
+                    name=name,
+                    throughput=result["throughput"],
+                    unit=result["unit"],
+                    memory=result["peak_memory"] / 1e6,
+                )
+            )
+    finally:
+        shutil.rmtree(scratch)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(output + "\n")
+    if args.save_baseline:
+        with open(BASELINE, "w") as fh:
+            fh.write(output + "\n")
+        return 0
+
+    baseline_path = args.baseline or BASELINE
+    if not os.path.exists(baseline_path):
+        return 0
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+    return 1 if compare(results, baseline, args.tolerance) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import logging
+import hashlib
+
+
+def default_cache_dir():
+    """Returns directory where index files are stored by default"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pelican-metadata-generator")
+
+
+class MetadataCache:
+    """Persistent index of post headers read from directory
+
+    Every scanned directory has its own index file. Entries are keyed by
+    real path of post file and are considered valid only as long as
+    modification time, size and inode of that file did not change - so
+    rescan needs to parse only new and modified files.
+
+    Index is written to disk every ``checkpoint_interval`` new entries.
+    If scan is interrupted, next scan of the same directory will pick
+    up entries stored at last checkpoint and only parse remaining files.
+
+    Parameters
+    ----------
+    cache_dir
+        Directory where index files are stored.
+    max_size
+        Total size (in bytes) of all index files. Least recently used
+        index files are removed when this limit is exceeded.
+    max_age
+        Index files not used for that many seconds are removed.
+    checkpoint_interval
+        Number of new entries after which index is written to disk.
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self, cache_dir=None, max_size=64 * 1024 * 1024, max_age=30 * 86400, checkpoint_interval=500
+    ):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_size = max_size
+        self.max_age = max_age
+        self.checkpoint_interval = checkpoint_interval
+        self.root = None
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen = set()
+        self._dirty = 0
+
+    def index_path(self, root):
+        """Returns path of index file used for directory or list of directories ``root``
+
+        Directories scanned together share single index file.
+        """
+        roots = [root] if isinstance(root, str) else root
+        key = "\n".join(sorted({os.path.realpath(path) for path in roots}))
+        digest = hashlib.sha1(key.encode("utf-8", "surrogateescape"))
+        return os.path.join(self.cache_dir, "{}.json".format(digest.hexdigest()))
+
+    def open(self, root):
+        """Loads index of directory or list of directories ``root``
+
+        Must be called before scan starts.
+        """
+        self.root = root
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen = set()
+        self._dirty = 0
+
+        try:
+            with open(self.index_path(root), "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return
+
+        if data.get("version") != self.VERSION:
+            return
+
+        self.entries = data.get("entries", {})
+        if not data.get("complete", True):
+            msg = "Resuming interrupted scan of {root} ({count} files already indexed)"
+            logging.info(msg.format(root=root, count=len(self.entries)))
+
+    def lookup(self, path):
+        """Returns cached headers of file, or None if file must be parsed"""
+        path = os.path.realpath(path)
+        self._seen.add(path)
+        try:
+            key = self._key(os.stat(path))
+        except OSError:
+            return None
+
+        entry = self.entries.get(path)
+        if entry and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        return None
+
+    def store(self, path, headers):
+        """Saves parsed headers of file in index"""
+        path = os.path.realpath(path)
+        self._seen.add(path)
+        try:
+            key = self._key(os.stat(path))
+        except OSError:
+            return
+
+        self.entries[path] = [key, headers]
+        self._dirty += 1
+        if self._dirty >= self.checkpoint_interval:
+            self.save(complete=False)
+
+    def close(self, complete=True):
+        """Writes index to disk after scan
+
+        Parameters
+        ----------
+        complete
+            True if whole directory was scanned. Only then entries of files
+            that were not seen during scan (deleted files) are dropped.
+        """
+        if self.root is None:
+            return
+
+        if complete:
+            for path in set(self.entries) - self._seen:
+                del self.entries[path]
+
+        logging.info(
+            "Metadata index of {root}: {hits} cached, {misses} parsed".format(
+                root=self.root, hits=self.hits, misses=self.misses
+            )
+        )
+        self.save(complete=complete)
+        self.evict()
+        self.root = None
+
+    def save(self, complete=True):
+        """Atomically writes index of current directory to disk"""
+        if self.root is None:
+            return
+
+        index_path = self.index_path(self.root)
+        tmp_path = "{}.{}.tmp".format(index_path, os.getpid())
+        data = {
+            "version": self.VERSION,
+            "root": self.root,
+            "complete": complete,
+            "entries": self.entries,
+        }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(data, fh, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            logging.warning("Could not write metadata index {}: {}".format(index_path, e))
+        self._dirty = 0
+
+    def evict(self):
+        """Removes index files that are too old or exceed total size limit"""
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+
+        current = self.index_path(self.root) if self.root else None
+        now = time.time()
+        index_files = []
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            if not name.endswith(".json") or path == current:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if now - st.st_mtime > self.max_age:
+                self._remove(path)
+                continue
+            index_files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in index_files)
+        if current and os.path.exists(current):
+            total += os.path.getsize(current)
+
+        for _, size, path in sorted(index_files):
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        logging.debug("Removing metadata index {}".format(path))
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _key(stat_result):
+        return [stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino]
@@ -3,16 +3,18 @@
 import sys
 import logging
 import argparse
-from PyQt5 import QtCore, QtWidgets
 
-import pelican_metadata_generator.controller
-import pelican_metadata_generator.model
-import pelican_metadata_generator.view
+import pelican_metadata_generator.cache
+import pelican_metadata_generator.commands
+import pelican_metadata_generator.instrumentation
 
 
 def process_args():
     description = "Generate Pelican post metadata based on previous content"
-    parser = argparse.ArgumentParser(description=description)
+    epilog = "Headless commands (run '<command> --help' for details): {}".format(
+        ", ".join(pelican_metadata_generator.commands.COMMANDS)
+    )
+    parser = argparse.ArgumentParser(description=description, epilog=epilog)
     parser.add_argument(
         "--format",
         "-f",
@@ -26,11 +28,53 @@ def process_args():
     parser.add_argument(
         "--directory", "-d", help="Directories to read metadata from", nargs="*", default=[]
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        help="Number of processes used to read directories; 0 uses all CPUs",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory where metadata index is stored between runs",
+        default=pelican_metadata_generator.cache.default_cache_dir(),
+    )
+    parser.add_argument(
+        "--watch",
+        "-w",
+        help="Keep metadata up to date when files in read directories change",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no-cache", help="Always parse all files in directory", action="store_true"
+    )
+    parser.add_argument(
+        "--profile",
+        help="Print timings of reading files, and the slowest files, to standard error on exit",
+        action="store_true",
+    )
 
     return parser.parse_known_args()
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in pelican_metadata_generator.commands.COMMANDS:
+        sys.exit(pelican_metadata_generator.commands.main(sys.argv[1:]))
+
+    run_gui()
+
+
+def run_gui():
+    # PyQt5 is imported only when it is needed, so headless commands
+    # start fast and work without it
+    from PyQt5 import QtCore, QtWidgets
+
+    import pelican_metadata_generator.controller
+    import pelican_metadata_generator.model
+    import pelican_metadata_generator.view
+    import pelican_metadata_generator.watcher
+
     args, unparsed_args = process_args()
 
     # Logging
@@ -49,16 +93,24 @@ def main():
 
     # Initialize main objects
     app = QtWidgets.QApplication(unparsed_args)
-    known_metadata_model = pelican_metadata_generator.model.MetadataDatabase()
+    if args.profile:
+        profiler = pelican_metadata_generator.instrumentation.enable()
+        app.aboutToQuit.connect(lambda: sys.stderr.write(profiler.summary() + "\n"))
+    cache = None
+    if not args.no_cache:
+        cache = pelican_metadata_generator.cache.MetadataCache(args.cache_dir)
+    known_metadata_model = pelican_metadata_generator.model.MetadataDatabase(
+        cache=cache, jobs=args.jobs
+    )
     post_model = pelican_metadata_generator.model.NewPostMetadata()
     window = pelican_metadata_generator.view.MainWindow()
     controller = pelican_metadata_generator.controller.Controller(  # noqa: F841
         known_metadata_model, post_model, window
     )
-
-    # Load data from source directories
-    for directory in args.directory:
-        known_metadata_model.read_directory(directory)
+    app.aboutToQuit.connect(known_metadata_model.cancel_scan)
+    if args.watch:
+        watcher = pelican_metadata_generator.watcher.DirectoryWatcher(known_metadata_model)
+        app.aboutToQuit.connect(watcher.stop)
 
     # Set model and view in expected state
     post_model.file_format = file_format
@@ -66,10 +118,25 @@ def main():
         if file_format_action.text().lower() == file_format:
             file_format_action.setChecked(True)
     window.setupTab.dateField.setDateTime(QtCore.QDateTime.currentDateTime())
-    if len(known_metadata_model.category) == 1:
-        window.setupTab.categoryList.setCurrentIndex(1)
     window.show()
 
+    def select_only_category():
+        if len(known_metadata_model.category) == 1:
+            window.setupTab.categoryList.setCurrentIndex(1)
+
+    # Load data from source directories once event loop runs, so window
+    # is painted before scan starts. Directories are read as single scan,
+    # so posts they share are parsed once
+    def read_directories():
+        known_metadata_model.scanFinished.connect(scan_finished)
+        known_metadata_model.read_directories_async(args.directory)
+
+    def scan_finished(*args):
+        known_metadata_model.scanFinished.disconnect(scan_finished)
+        select_only_category()
+
+    QtCore.QTimer.singleShot(0, read_directories)
+
     sys.exit(app.exec_())
 
 
@@ -0,0 +1,304 @@
+"""Headless commands that work without graphical user interface
+
+Nothing in this module (and modules it imports) may import PyQt5, so
+commands start fast and work on machines without display.
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+import collections
+
+import pelican_metadata_generator.cache
+import pelican_metadata_generator.file_handler
+import pelican_metadata_generator.instrumentation
+import pelican_metadata_generator.query
+import pelican_metadata_generator.refactor
+import pelican_metadata_generator.scanner
+import pelican_metadata_generator.vocabulary
+
+# Command name suffix -> name of field that ``rename-*`` and ``merge-*`` change
+REFACTOR_FIELDS = {
+    "tag": "tags",
+    "category": "category",
+    "author": "authors",
+}
+
+
+def scan(args):
+    """Streams headers of every post in directories as JSON Lines
+
+    Every post is written as soon as it is parsed. Last line is summary
+    with number of uses of each known category, tag and author. Only that
+    summary is kept in memory, so memory use does not depend on number
+    of posts. Directories are scanned together, so post reachable from
+    several of them is written once. Files that could not be read are
+    listed in summary with reasons, and do not stop the scan.
+    """
+    vocabulary = {
+        name: collections.Counter()
+        for name in set(pelican_metadata_generator.vocabulary.FIELDS.values())
+    }
+    scanner = pelican_metadata_generator.scanner.Scanner(
+        jobs=args.jobs, count_files=False, max_size=args.max_size
+    )
+    start = time.perf_counter()
+    files = 0
+
+    for record in scanner.scan(args.directory):
+        files += 1
+        if args.format == "jsonl":
+            line = {
+                "path": record.path,
+                "headers": record.headers,
+                "parse_time": record.parse_time,
+            }
+            _write_json_line(line)
+
+        for header, value in record.headers.items():
+            name = pelican_metadata_generator.vocabulary.FIELDS.get(header)
+            if name:
+                vocabulary[name].update(pelican_metadata_generator.vocabulary.split_values(value))
+
+    summary = {
+        "files": files,
+        "elapsed": time.perf_counter() - start,
+        "quarantined": dict(scanner.quarantine),
+    }
+    for name, counter in sorted(vocabulary.items()):
+        summary[name] = dict(counter.most_common())
+    _write_json_line({"summary": summary})
+    return 0
+
+
+def query(args):
+    """Prints paths of posts that match query, one per line
+
+    Directories are scanned (using metadata index) and values of every
+    post are indexed, then query is evaluated against that index. See
+    pelican_metadata_generator.query for query syntax.
+    """
+    try:
+        parsed = pelican_metadata_generator.query.Query(args.query)
+    except pelican_metadata_generator.query.QuerySyntaxError as e:
+        sys.stderr.write("Invalid query: {error}\n".format(error=e))
+        return 2
+
+    cache = None
+    if not args.no_cache:
+        cache = pelican_metadata_generator.cache.MetadataCache(args.cache_dir)
+    scanner = pelican_metadata_generator.scanner.Scanner(
+        jobs=args.jobs, cache=cache, count_files=False, max_size=args.max_size
+    )
+    vocabulary = pelican_metadata_generator.vocabulary.Vocabulary()
+    start = time.perf_counter()
+    for record in scanner.scan(args.directory):
+        vocabulary.add_record(record)
+    scanned = time.perf_counter()
+
+    ids = parsed.evaluate(vocabulary)
+    elapsed = time.perf_counter() - scanned
+    paths = vocabulary.records.paths
+    for i in ids:
+        sys.stdout.write(paths[i] + "\n")
+
+    msg = "{count} of {total} posts match; scan took {scan:.2f} s, query {query:.1f} ms\n"
+    sys.stderr.write(
+        msg.format(
+            count=len(ids),
+            total=len(vocabulary.records),
+            scan=scanned - start,
+            query=elapsed * 1000,
+        )
+    )
+    if scanner.quarantine:
+        sys.stderr.write(scanner.quarantine.report() + "\n")
+    return 0
+
+
+def rename(args):
+    """Renames value in headers of every post that uses it"""
+    mapping = {args.old: args.new}
+    return _refactor(args, mapping)
+
+
+def merge(args):
+    """Replaces several values with one in headers of every post that uses them"""
+    mapping = {source: args.target for source in args.sources}
+    return _refactor(args, mapping)
+
+
+def _refactor(args, mapping):
+    rename = pelican_metadata_generator.refactor.Rename(args.field, mapping)
+    cache = None
+    if not args.no_cache:
+        cache = pelican_metadata_generator.cache.MetadataCache(args.cache_dir)
+
+    start = time.perf_counter()
+    paths = list(
+        pelican_metadata_generator.refactor.find_files(args.directory, rename, args.jobs, cache)
+    )
+    logging.info("Found {count} files to change".format(count=len(paths)))
+
+    changed = 0
+    failed = 0
+    results = pelican_metadata_generator.refactor.rewrite_files(
+        paths, rename, jobs=args.jobs, dry_run=args.dry_run
+    )
+    for path, diff, error in results:
+        if error:
+            failed += 1
+            sys.stderr.write("Could not rewrite {path}: {error}\n".format(path=path, error=error))
+            continue
+        changed += 1
+        sys.stdout.write(diff)
+
+    msg = "{verb} {changed} files in {elapsed:.2f} s"
+    verb = "Would change" if args.dry_run else "Changed"
+    sys.stderr.write(
+        msg.format(verb=verb, changed=changed, elapsed=time.perf_counter() - start) + "\n"
+    )
+    return 1 if failed else 0
+
+
+def _write_json_line(data):
+    sys.stdout.write(json.dumps(data, ensure_ascii=False))
+    sys.stdout.write("\n")
+
+
+COMMANDS = {
+    "scan": scan,
+    "query": query,
+}
+COMMANDS.update({"rename-" + name: rename for name in REFACTOR_FIELDS})
+COMMANDS.update({"merge-" + name: merge for name in REFACTOR_FIELDS})
+
+
+def process_args(argv):
+    description = "Work with Pelican metadata without graphical user interface"
+    parser = argparse.ArgumentParser(prog="pelican-metadata-generator", description=description)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--debug", "-v", help="Be more verbose; may be passed up to 5 times", action="count"
+    )
+    common.add_argument(
+        "--profile",
+        help="Print timings of reading files, and the slowest files, to standard error",
+        action="store_true",
+    )
+    scan_options = argparse.ArgumentParser(add_help=False, parents=[common])
+    scan_options.add_argument(
+        "--jobs",
+        "-j",
+        help="Number of processes used to read directories; 0 uses all CPUs",
+        type=int,
+        default=1,
+    )
+    scan_options.add_argument(
+        "--max-size",
+        help="Skip files larger than that many bytes (default: %(default)s)",
+        type=int,
+        default=pelican_metadata_generator.file_handler.MAX_FILE_SIZE,
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    scan_parser = subparsers.add_parser(
+        "scan", help=scan.__doc__.splitlines()[0], parents=[scan_options]
+    )
+    scan_parser.add_argument("directory", help="Directories to read metadata from", nargs="+")
+    scan_parser.add_argument(
+        "--format",
+        "-f",
+        help="Output format; 'summary' prints only known values",
+        choices=["jsonl", "summary"],
+        default="jsonl",
+    )
+
+    query_parser = subparsers.add_parser(
+        "query", help=query.__doc__.splitlines()[0], parents=[scan_options]
+    )
+    query_parser.add_argument(
+        "query", help="Query, e.g. 'tag:python AND category:ops AND NOT author:bob'"
+    )
+    query_parser.add_argument("directory", help="Directories to read metadata from", nargs="+")
+    query_parser.add_argument(
+        "--cache-dir",
+        help="Directory where metadata index is stored between runs",
+        default=pelican_metadata_generator.cache.default_cache_dir(),
+    )
+    query_parser.add_argument("--no-cache", help="Do not use metadata index", action="store_true")
+
+    refactor_options = argparse.ArgumentParser(add_help=False, parents=[common])
+    refactor_options.add_argument(
+        "--directory",
+        "-d",
+        help="Directory with posts; may be passed multiple times",
+        action="append",
+        required=True,
+    )
+    refactor_options.add_argument(
+        "--dry-run",
+        "-n",
+        help="Do not change files; print unified diff of changes instead",
+        action="store_true",
+    )
+    refactor_options.add_argument(
+        "--jobs",
+        "-j",
+        help="Number of processes used to read and write files; 0 uses all CPUs",
+        type=int,
+        default=1,
+    )
+    refactor_options.add_argument(
+        "--cache-dir",
+        help="Directory where metadata index is stored between runs",
+        default=pelican_metadata_generator.cache.default_cache_dir(),
+    )
+    refactor_options.add_argument(
+        "--no-cache", help="Do not use metadata index", action="store_true"
+    )
+
+    for name, field in REFACTOR_FIELDS.items():
+        rename_parser = subparsers.add_parser(
+            "rename-" + name, help=rename.__doc__, parents=[refactor_options]
+        )
+        rename_parser.add_argument("old", help="Current value")
+        rename_parser.add_argument("new", help="New value")
+        rename_parser.set_defaults(field=field)
+
+        merge_parser = subparsers.add_parser(
+            "merge-" + name, help=merge.__doc__, parents=[refactor_options]
+        )
+        merge_parser.add_argument("sources", help="Values to replace", nargs="+")
+        merge_parser.add_argument("target", help="Value that replaces them")
+        merge_parser.set_defaults(field=field)
+
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    """Runs headless command; ``argv`` starts with command name"""
+    args = process_args(argv)
+
+    debug_level = logging.CRITICAL
+    debug_levels = ["", logging.ERROR, logging.WARNING, logging.INFO, logging.DEBUG]
+    if args.debug:
+        debug_level = debug_levels[min(args.debug, len(debug_levels) - 1)]
+    logging.basicConfig(format="%(asctime)s %(message)s", level=debug_level)
+
+    profiler = None
+    if args.profile:
+        profiler = pelican_metadata_generator.instrumentation.enable()
+
+    try:
+        return COMMANDS[args.command](args)
+    except BrokenPipeError:
+        # Output was piped to program that exited early (e.g. head)
+        sys.stderr.close()
+        return 1
+    finally:
+        if profiler:
+            pelican_metadata_generator.instrumentation.disable()
+            sys.stderr.write(profiler.summary() + "\n")
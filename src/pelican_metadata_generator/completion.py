@@ -0,0 +1,152 @@
+"""Case- and accent-insensitive completion of known metadata values
+
+Plain Python, independent of PyQt5, like
+pelican_metadata_generator.vocabulary.
+"""
+
+import re
+import bisect
+import unicodedata
+
+# Prefix ranges up to that size are ranked directly; bigger ones are
+# found by walking values from the most used, which stops early because
+# matching values are common
+RANGE_LIMIT = 1000
+
+# Values (most used first) searched for subsequence matches; rarely used
+# values are found only by prefix
+SUBSEQUENCE_LIMIT = 2000
+
+
+class _AccentTable(dict):
+    """str.translate table that strips accents; filled as characters are met"""
+
+    def __missing__(self, char):
+        decomposed = unicodedata.normalize("NFKD", chr(char))
+        stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+        self[char] = stripped
+        return stripped
+
+
+_ACCENTS = _AccentTable()
+
+
+def normalize(text):
+    """Returns ``text`` without accents and case, for comparison"""
+    try:
+        text.encode("ascii")
+    except UnicodeEncodeError:
+        return text.translate(_ACCENTS).casefold()
+    return text.lower()
+
+
+class CompletionIndex:
+    """Values of single metadata field, searchable by prefix and subsequence
+
+    Index is immutable; build new one when values change.
+
+    Parameters
+    ----------
+    values
+        Iterable of values.
+    counts
+        Dictionary of value -> number of uses; values used more often
+        are ranked first. Values missing from it count as unused.
+    """
+
+    __slots__ = ("_keys", "_ranks", "_ranked", "_text", "_line_starts", "_subsequence_end")
+
+    def __init__(self, values, counts=None):
+        counts = counts or {}
+        values = list(values)
+        normalized = [normalize(value) for value in values]
+
+        # Sorted keys allow bisecting prefix ranges
+        order = sorted(range(len(values)), key=normalized.__getitem__)
+        self._keys = [normalized[i] for i in order]
+
+        # Most used first; sort is stable, so equally used stay alphabetical
+        uses = [counts.get(value, 0) for value in values]
+        ranked = sorted(order, key=uses.__getitem__, reverse=True)
+        self._ranked = [values[i] for i in ranked]
+
+        # Rank of value of every key; it doubles as score, lower is better
+        rank = [0] * len(values)
+        for position, i in enumerate(ranked):
+            rank[i] = position
+        self._ranks = [rank[i] for i in order]
+
+        # All keys in rank order, one per line, so subsequence is searched
+        # by single regular expression that yields the most used first
+        lines = [normalized[i].replace("\n", " ") for i in ranked]
+        self._line_starts = []
+        offset = 0
+        for line in lines:
+            self._line_starts.append(offset)
+            offset += len(line) + 1
+        self._text = "\n".join(lines)
+        if len(lines) > SUBSEQUENCE_LIMIT:
+            self._subsequence_end = self._line_starts[SUBSEQUENCE_LIMIT]
+        else:
+            self._subsequence_end = len(self._text)
+
+    def __len__(self):
+        return len(self._ranked)
+
+    def complete(self, text, n=10):
+        """Returns up to ``n`` values that match ``text``, most used first
+
+        Values that start with ``text`` come first. If there are fewer
+        than ``n`` of them, values that contain characters of ``text`` in
+        the same order (e.g. "pyqt" for "PyQt5 tips") follow; they are
+        looked for among SUBSEQUENCE_LIMIT most used values.
+        """
+        key = normalize(text)
+        if not key:
+            return self._ranked[:n]
+
+        ranks = self._prefix(key, n)
+        if len(ranks) < n:
+            seen = set(ranks)
+            for rank in self._subsequence(key):
+                if rank not in seen:
+                    ranks.append(rank)
+                    if len(ranks) == n:
+                        break
+        return [self._ranked[rank] for rank in ranks]
+
+    def _prefix(self, key, n):
+        """Returns ranks of up to ``n`` most used values starting with ``key``"""
+        start = bisect.bisect_left(self._keys, key)
+        # No key sorts between key + "\U0010ffff" and keys starting with key
+        end = bisect.bisect_left(self._keys, key + "\U0010ffff", start)
+        if end - start <= RANGE_LIMIT:
+            return sorted(self._ranks[start:end])[:n]
+
+        ranks = []
+        for rank, line_start in enumerate(self._line_starts):
+            if self._text.startswith(key, line_start):
+                ranks.append(rank)
+                if len(ranks) == n:
+                    break
+        return ranks
+
+    def _subsequence(self, key):
+        """Yields ranks of values that contain characters of ``key`` in order"""
+        # Every character is matched at its first occurrence after the
+        # previous one, which never needs backtracking
+        parts = [re.escape(key[0])]
+        for c in key[1:]:
+            parts.append("[^{}\n]*{}".format(re.escape(c), re.escape(c)))
+        pattern = re.compile("".join(parts))
+
+        pos = 0
+        while True:
+            match = pattern.search(self._text, pos, self._subsequence_end)
+            if match is None:
+                return
+            yield bisect.bisect_right(self._line_starts, match.start()) - 1
+            # Next line; value is yielded only once
+            pos = self._text.find("\n", match.end()) + 1
+            if not pos:
+                return
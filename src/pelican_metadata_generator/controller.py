@@ -2,6 +2,9 @@ from slugify import slugify
 
 from PyQt5 import QtCore
 
+# Time (in milliseconds) without changes after which preview is refreshed
+PREVIEW_DELAY = 150
+
 
 class Controller(QtCore.QObject):
     def __init__(self, known_metadata_model=None, post_model=None, view=None):
@@ -9,10 +12,18 @@ class Controller(QtCore.QObject):
         self.known_metadata_model = known_metadata_model
         self.post_model = post_model
         self.view = view
+        # Preview is regenerated once user stops typing, not on every keystroke
+        self.preview_timer = QtCore.QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DELAY)
+        self.preview_timer.timeout.connect(self._update_preview)
+        self.preview_timer.timeout.connect(self._update_suggestions)
+        self._preview = None
+        self._combobox_values = {}
         self.setup_connections()
 
     def setup_connections(self):
-        self.view.readMetadataDialog.fileSelected.connect(self.known_metadata_model.read_directory)
+        self.view.directorySelected.connect(self.known_metadata_model.read_directory_async)
         self.view.choose_file_format_group.triggered.connect(self._set_file_format)
         self.view.setupTab.titleField.textChanged.connect(self._set_title)
         self.view.setupTab.slugActive.stateChanged.connect(self._set_slug_based_on_title)
@@ -24,8 +35,10 @@ class Controller(QtCore.QObject):
             self._category_list_item_selected
         )
         self.view.setupTab.categoryField.textChanged.connect(self.post_model.set_category)
-        self.view.setupTab.tagButtonsGroup.buttonToggled.connect(self._tag_button_toggled)
+        self.view.setupTab.tagModel.tagToggled.connect(self._tag_toggled)
         self.view.setupTab.tagField.returnPressed.connect(self._set_tags_group)
+        self.view.setupTab.suggestedTagSelected.connect(self._suggested_tag_selected)
+        self.view.setupTab.completionRequested.connect(self._complete)
         self.view.setupTab.authorList.currentIndexChanged.connect(self._author_list_item_selected)
         self.view.setupTab.authorField.textChanged.connect(self.post_model.set_author)
         self.view.setupTab.summaryField.textChanged.connect(
@@ -34,21 +47,43 @@ class Controller(QtCore.QObject):
         self.view.saveAsFileButton.clicked.connect(
             lambda: self.view.app.showSaveDialog(self.post_model.filename)
         )
-        self.view.saveFileDialog.fileSelected.connect(self.post_model.to_file)
+        self.view.saveFileSelected.connect(self.post_model.to_file)
         self.view.prependHeaders.connect(self.post_model.to_file_prepend_headers)
         self.view.overwriteHeaders.connect(self.post_model.to_file_overwrite_headers)
         self.post_model.fileHasHeaders.connect(self.view.show_file_exists_dialog)
-        self.post_model.changed.connect(
-            lambda: self.view.generatedTab.set_content(self.post_model.as_pelican_header())
-        )
+        self.post_model.saveFailed.connect(self.view.show_save_failed)
+        self.post_model.changed.connect(self._schedule_preview)
         self.known_metadata_model.changed.connect(self._update_view_options_based_on_metadata)
+        self.known_metadata_model.scanProgress.connect(self.view.show_scan_progress)
+        self.known_metadata_model.scanFinished.connect(self._scan_finished)
+
+    def _scan_finished(self, done, elapsed):
+        skipped = len(self.known_metadata_model.quarantine)
+        self.view.show_scan_finished(done, elapsed, skipped)
+
+    def _schedule_preview(self):
+        self.preview_timer.start()
+
+    def _update_preview(self):
+        preview = self.post_model.as_pelican_header()
+        if preview != self._preview:
+            self._preview = preview
+            self.view.app.set_generated_content(preview)
+
+    def _update_suggestions(self):
+        suggestions = self.known_metadata_model.suggest_tags(
+            self.post_model.tags, self.post_model.category, self.post_model.authors
+        )
+        self.view.setupTab.setSuggestedTags(suggestions)
 
     def _set_file_format(self, value):
         self.post_model.set_file_format(value.text().lower().replace("&", ""))
 
     def _set_title(self, value):
-        self.post_model.set_title(value)
-        self._set_slug_based_on_title()
+        # Title and slug generated from it are a single change
+        with self.post_model.batch_update():
+            self.post_model.set_title(value)
+            self._set_slug_based_on_title()
 
     def _set_slug_based_on_title(self):
         if self.view.setupTab.slugActive.isChecked():
@@ -73,16 +108,20 @@ class Controller(QtCore.QObject):
             value = self.view.setupTab.authorList.itemText(value)
         self.view.setupTab.authorField.setText(value)
 
-    def _tag_button_toggled(self, button, checked):
-        value = button.text()
-        value = "!#@%!".join(value.split("&&"))
-        value = value.replace("&", "")
-        value = value.replace("!#@%!", "&")
+    def _tag_toggled(self, value, checked):
         if checked:
             self.post_model.add_tag(value)
         else:
             self.post_model.remove_tag(value)
 
+    def _complete(self, name, text):
+        values = self.known_metadata_model.complete(name, text) if text else []
+        self.view.setupTab.setCompletions(name, values)
+
+    def _suggested_tag_selected(self, value):
+        self.post_model.add_tag(value)
+        self.view.setupTab.tagModel.set_checked(self.post_model.tags)
+
     def _set_tags_group(self):
         values = self.view.setupTab.tagField.text()
         separator = ","
@@ -93,25 +132,47 @@ class Controller(QtCore.QObject):
             tag = tag.strip()
             if not tag:
                 continue
-            if tag not in self.known_metadata_model.tags:
-                self.known_metadata_model.tags.append(tag)
+            self.known_metadata_model.add_value("tags", tag)
             self.post_model.add_tag(tag)
 
         self.view.setupTab.tagField.clear()
-        known_tags = ["&&".join(x.split("&")) for x in sorted(self.known_metadata_model.tags)]
-        checked_tags = ["&&".join(x.split("&")) for x in self.post_model.tags]
-        self.view.setupTab.setTagButtons(known_tags, checked_tags)
+        self._set_known_tags()
+
+    def _set_known_tags(self):
+        # Text typed in tag field is left alone; it is committed with Enter only
+        self.view.setupTab.setTags(
+            self.known_metadata_model.sorted_values("tags"), self.post_model.tags
+        )
 
     def _set_combobox_values(self, qcombobox, values):
+        # Sorted values are the same list object until they change
+        if self._combobox_values.get(qcombobox) is values:
+            return
+        self._combobox_values[qcombobox] = values
         new_values = ["Pick value"]
-        new_values.extend(sorted(values, key=str.lower))
-        qcombobox.clear()
-        qcombobox.addItems(new_values)
+        new_values.extend(values)
+        # Refilling is not a choice of user, so it must not overwrite the
+        # field next to the list; picked value stays picked if still known
+        current = qcombobox.currentIndex()
+        current = qcombobox.currentText() if current > 0 else None
+        qcombobox.blockSignals(True)
+        try:
+            qcombobox.clear()
+            qcombobox.addItems(new_values)
+            if current is not None:
+                qcombobox.setCurrentIndex(max(qcombobox.findText(current), 0))
+        finally:
+            qcombobox.blockSignals(False)
 
     def _update_view_options_based_on_metadata(self):
-        self.view.saveFileDialog.setDirectory(self.known_metadata_model.path)
-        self._set_tags_group()
+        # Emitted after every batch of background scan, so it only refreshes
+        # known values and keeps whatever user is editing
+        self.view.app.set_save_directory(self.known_metadata_model.path)
+        self._set_known_tags()
+        self._set_combobox_values(
+            self.view.setupTab.categoryList, self.known_metadata_model.sorted_values("category")
+        )
         self._set_combobox_values(
-            self.view.setupTab.categoryList, self.known_metadata_model.category
+            self.view.setupTab.authorList, self.known_metadata_model.sorted_values("authors")
         )
-        self._set_combobox_values(self.view.setupTab.authorList, self.known_metadata_model.authors)
+        self._update_suggestions()
@@ -1,5 +1,94 @@
 import os
 import re
+import stat
+import mmap
+import codecs
+import errno
+import shutil
+import logging
+
+import pelican_metadata_generator.instrumentation
+
+# Well-known headers are written in that order, before all other headers
+HEADERS_ORDER = ["slug", "date", "modified", "category", "tags", "authors", "summary"]
+
+# File extension -> file format; see HANDLERS for FileHandler of every format
+EXTENSIONS = {
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".mdown": "markdown",
+    ".mkd": "markdown",
+    ".rst": "restructuredtext",
+}
+
+# Bytes at start of file that are checked for byte order mark, binary
+# content and encoding before file is parsed. Metadata is parsed from the
+# same buffer, which is enlarged only if metadata block runs past it
+SNIFF_SIZE = 4096
+
+# Metadata block that runs past that many bytes (rare; e.g. long summary
+# in huge file) is read from memory map of file instead of buffer
+MMAP_THRESHOLD = 1024 * 1024
+
+# Files bigger than that (in bytes) are refused, since no post is that big
+MAX_FILE_SIZE = 16 * 1024 * 1024
+
+# Encoding of files that are not valid UTF-8; most such posts were written
+# by Windows editors. If sniffed prefix has bytes it does not define (0x81,
+# 0x8D, 0x8F, 0x90, 0x9D), whole file is read as Latin-1 instead
+FALLBACK_ENCODING = "cp1252"
+
+_LINE = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+")
+
+# Byte order marks of encodings Pelican does not read
+_UNSUPPORTED_BOMS = [
+    (codecs.BOM_UTF32_LE, "UTF-32"),
+    (codecs.BOM_UTF32_BE, "UTF-32"),
+    (codecs.BOM_UTF16_LE, "UTF-16"),
+    (codecs.BOM_UTF16_BE, "UTF-16"),
+]
+
+
+class UnreadableFileError(ValueError):
+    """File is not text post that can be read: binary, too big or in unsupported encoding"""
+
+
+def sniff(prefix, complete=False):
+    """Returns (encoding, byte order mark) of file that starts with bytes ``prefix``
+
+    Parameters
+    ----------
+    prefix
+        First SNIFF_SIZE (or more) bytes of file.
+    complete
+        True if ``prefix`` is whole file; otherwise character that is cut
+        at its end is not an error.
+
+    Raises
+    ------
+    UnreadableFileError
+        If file is binary or encoded in UTF-16 or UTF-32.
+    """
+    if prefix.startswith(codecs.BOM_UTF8):
+        return "utf-8", codecs.BOM_UTF8
+    # UTF-32 LE mark starts with UTF-16 LE one, so it is checked first
+    for bom, name in _UNSUPPORTED_BOMS:
+        if prefix.startswith(bom):
+            raise UnreadableFileError("File is encoded in {}; Pelican reads UTF-8".format(name))
+    if b"\0" in prefix:
+        raise UnreadableFileError("File is binary")
+
+    try:
+        prefix.decode("utf-8")
+    except UnicodeDecodeError as e:
+        cut = e.end == len(prefix) and e.reason == "unexpected end of data"
+        if complete or not cut:
+            try:
+                prefix.decode(FALLBACK_ENCODING)
+            except UnicodeDecodeError:
+                return "latin-1", b""
+            return FALLBACK_ENCODING, b""
+    return "utf-8", b""
 
 
 class Factory:
@@ -16,32 +105,264 @@ class Factory:
         Path to file (FileHandler will be chosen based on extension).
     file_format
         Required format of FileHandler.
+    headers_only
+        If True, FileHandler stops reading file at the end of metadata
+        block and does not keep file content.
+    max_size
+        Files bigger than that many bytes are refused; see
+        AbstractFileHandler.
     """
 
-    def __init__(self, path, file_format=None):
+    def __init__(self, path, file_format=None, headers_only=False, max_size=None):
         self.path = path
         self.file_format = file_format
+        self.headers_only = headers_only
+        self.max_size = max_size
         self.handler = self._choose_handler()
 
     def _choose_handler(self):
         """Chooses and returns FileHandler object based on extension or user request"""
         if not self.file_format:
             _, ext = os.path.splitext(self.path)
-            if ext in [".md", ".markdown", ".mdown", ".mkd"]:
-                self.file_format = "markdown"
-            elif ext in [".rst"]:
-                self.file_format = "restructuredtext"
-
-        if self.file_format == "markdown":
-            return MarkdownHandler
-        elif self.file_format == "restructuredtext":
-            return RestructuredtextHandler
-        else:
-            raise NotImplementedError("File format not supported: {}".format(self.file_format))
+            self.file_format = EXTENSIONS.get(ext)
+
+        return handler_class(self.file_format)
 
     def generate(self):
         """Returns instantiated FileHandler object"""
-        return self.handler(self.path)
+        profiler = pelican_metadata_generator.instrumentation.active
+        if profiler is None:
+            return self.handler(self.path, self.headers_only, self.max_size)
+
+        with profiler.timer("read"):
+            handler = self.handler(self.path, self.headers_only, self.max_size)
+        profiler.count("files_read")
+        return handler
+
+
+class HeaderParser:
+    """
+    Single-pass, table-driven parser of metadata block at top of file.
+    It is not intended to be used directly - rather, specific file formats
+    should subclass it.
+
+    Every line is classified by single regular expression, ``LINE_RE``,
+    which is alternation of named groups - one group per kind of line.
+    Name of group that matched selects method ``on_<name>`` that handles
+    line; lines not matched by any group are handled by ``on_other``.
+    Lines are parsed until one of handlers sets ``done``.
+
+    Parameters
+    ----------
+    headers
+        Dictionary that parsed metadata is stored in.
+
+    Attributes
+    ----------
+    done
+        True if end of metadata block was reached.
+    content
+        Lines of post content encountered before end of metadata block.
+    """
+
+    LINE_RE = None
+    ACTIONS = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Dispatch table is built once per file format
+        cls.ACTIONS = {
+            name: getattr(cls, "on_" + name)
+            for name in cls.LINE_RE.groupindex
+            if hasattr(cls, "on_" + name)
+        }
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.key = None
+        self.done = False
+        self.content = []
+
+    def parse(self, lines, raw_content):
+        """Parses lines until the end of metadata block
+
+        Parameters
+        ----------
+        lines
+            Iterator of file lines. Lines after metadata block are not
+            consumed.
+        raw_content
+            List that every consumed line is appended to.
+        """
+        match_line = self.LINE_RE.match
+        actions = self.ACTIONS
+        on_other = type(self).on_other
+
+        for line in lines:
+            raw_content.append(line)
+            match = match_line(line)
+            if match:
+                actions[match.lastgroup](self, line, match)
+            else:
+                on_other(self, line, match)
+            if self.done:
+                return
+
+    def on_other(self, line, match):
+        """Handles line that is not matched by ``LINE_RE``
+
+        Note
+        ----
+        Child classes are expected to override this method
+        """
+        self.done = True
+
+
+def _copy_file_range(src_fd, dst_fd, offset):
+    """Copies content of ``src_fd`` from ``offset`` to its end into ``dst_fd``
+
+    Data is copied by kernel (``copy_file_range``, then ``sendfile``) where
+    possible; otherwise it is copied in small chunks.
+    """
+    remaining = os.fstat(src_fd).st_size - offset
+    copy_functions = []
+    if hasattr(os, "copy_file_range"):
+        copy_functions.append(
+            lambda count: os.copy_file_range(src_fd, dst_fd, count, offset_src=offset)
+        )
+    if hasattr(os, "sendfile"):
+        copy_functions.append(lambda count: os.sendfile(dst_fd, src_fd, offset, count))
+
+    for copy in copy_functions:
+        try:
+            while remaining > 0:
+                copied = copy(remaining)
+                if not copied:
+                    break
+                offset += copied
+                remaining -= copied
+            return
+        except OSError as e:
+            # Not supported for these files; fall back to next method
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.ENOTSUP):
+                raise
+
+    with os.fdopen(os.dup(src_fd), "rb") as src, os.fdopen(os.dup(dst_fd), "wb") as dst:
+        src.seek(offset)
+        shutil.copyfileobj(src, dst)
+
+
+def _pread(fh, size, offset):
+    """Reads up to ``size`` bytes at ``offset``, without moving file position if possible"""
+    if hasattr(os, "pread"):
+        return os.pread(fh.fileno(), size, offset)
+    fh.seek(offset)
+    return fh.read(size)
+
+
+def _advise(fd, advice):
+    """Gives kernel read-ahead hint (``os.POSIX_FADV_*`` name) for whole file, if supported"""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+    except OSError:
+        # Hints are optional; some file systems refuse them
+        pass
+
+
+def split_lines(text):
+    """Returns lines of ``text`` with their line endings ("\\n", "\\r\\n" or "\\r")
+
+    Unlike ``str.splitlines``, other Unicode line separators do not end
+    line, the same as when file is read.
+    """
+    return _LINE.findall(text)
+
+
+class _HeaderReader:
+    """Iterates over lines at start of binary file as text, counting bytes consumed
+
+    Lines are found in ``buffer`` of bytes, and only lines that are
+    consumed are decoded. Buffer starts with bytes read by caller and
+    doubles with ``os.pread`` only when line runs past its end; once it
+    would reach MMAP_THRESHOLD, file is mapped into memory instead.
+
+    Windows and old Mac OS line endings are translated, as in files opened
+    in text mode. Line ending used by first line is remembered in
+    ``newline``.
+    """
+
+    __slots__ = ("fh", "size", "buffer", "offset", "newline", "encoding", "bytes_read", "_map")
+
+    _LINE_END = re.compile(rb"\r\n?|\n")
+
+    def __init__(self, fh, size, buffer, encoding="utf-8", offset=0):
+        self.fh = fh
+        self.size = size
+        self.buffer = bytearray(buffer)
+        self.offset = offset
+        self.newline = None
+        self.encoding = encoding
+        self.bytes_read = len(buffer)
+        self._map = None
+
+    def __iter__(self):
+        while True:
+            match = self._LINE_END.search(self.buffer, self.offset)
+            # "\r" at the end of buffer may be first half of "\r\n"
+            if match is None or match.end() == len(self.buffer) and match.group() == b"\r":
+                if self._grow():
+                    continue
+            if match is None:
+                # Last line of file, without line ending
+                end = len(self.buffer)
+                if end == self.offset:
+                    return
+                newline = ""
+            else:
+                end = match.end()
+                newline = match.group().decode("ascii")
+            raw_line = self.buffer[self.offset : end]
+            self.offset = end
+            line = raw_line.decode(self.encoding)
+            if newline:
+                line = line[: -len(newline)] + "\n"
+                if self.newline is None:
+                    self.newline = newline
+            yield line
+
+    def _grow(self):
+        """Reads more of file into buffer; False at end of file"""
+        length = len(self.buffer)
+        if self._map is not None or length >= self.size:
+            return False
+        if length * 2 >= MMAP_THRESHOLD:
+            try:
+                self._map = mmap.mmap(self.fh.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # E.g. file on file system that cannot be mapped
+                pass
+            else:
+                self.buffer = self._map
+                self.size = len(self._map)
+                return self.size > length
+        chunk = _pread(self.fh, length, length)
+        if not chunk:
+            # File was truncated since its size was read
+            self.size = length
+            return False
+        self.buffer.extend(chunk)
+        self.bytes_read += len(chunk)
+        return True
+
+    def close(self):
+        if self._map is not None:
+            # Mapped file is read only where lines were looked for
+            self.bytes_read = max(self.bytes_read, self.offset)
+            self._map.close()
+            self._map = None
+            self.buffer = bytearray()
 
 
 class AbstractFileHandler:
@@ -50,51 +371,159 @@ class AbstractFileHandler:
     reading files. It is not intended to be used directly - rather, specific
     file formats should subclass it.
 
+    Metadata is read by ``parser_class``, HeaderParser subclass for given
+    file format.
+
     Parameters
     ----------
     path
         Path to file (FileHandler will be chosen based on extension).
+    headers_only
+        If True, reading stops at the end of metadata block. ``raw_content``
+        and ``post_content`` are left empty. File can still be saved, since
+        saving copies post content from disk.
+    max_size
+        Files bigger than that many bytes are refused; MAX_FILE_SIZE by
+        default.
+
+    Raises
+    ------
+    UnreadableFileError
+        If file is too big, binary or in encoding Pelican does not read
+        (see ``sniff``).
+
+    Attributes
+    ----------
+    header_end
+        Offset (in bytes) in file just after last line read together with
+        metadata block. Post content that follows is copied from there when
+        file is saved.
+    leading_content
+        Post content that was read together with metadata block (e.g.
+        first paragraph of file that has no metadata).
+    newline
+        Line ending used by file, or None if it is not known. Headers are
+        saved with the same line ending as the rest of file.
+    bytes_read
+        Number of bytes read from file. Handler created with
+        ``headers_only`` reads only first SNIFF_SIZE bytes of most files.
+    header_lines
+        Number of lines read by metadata parser.
+    encoding
+        Encoding of file; FALLBACK_ENCODING if file is not valid UTF-8.
+        Such file is converted to UTF-8, which Pelican reads, when saved.
+    bom
+        Byte order mark at start of file; it is kept when file is saved.
     """
 
-    def __init__(self, path):
-        self.path = os.path.realpath(path)
-        self.exists = os.path.exists(self.path) and os.path.isfile(self.path)
-        self.default_extension = ""
-        self.format = ""
+    parser_class = None
+    default_extension = ""
+
+    def __init__(self, path, headers_only=False, max_size=None):
+        # Symbolic links are resolved only when file is saved
+        self.path = path
+        self.exists = False
+        self.headers_only = headers_only
+        self.max_size = MAX_FILE_SIZE if max_size is None else max_size
+        self.encoding = "utf-8"
+        self.bom = b""
         self.headers = {}
         self.post_content = ""
         self.raw_content = ""
+        self.header_end = 0
+        self.leading_content = ""
+        self.newline = None
+        self.bytes_read = 0
+        self.header_lines = 0
 
         self.read()
 
     def has_metadata(self):
-        """True if file has metadata"""
+        """True if file has metadata
+
+        Only metadata block is needed, so handler created with
+        ``headers_only`` reads just a small prefix of file to answer it.
+        """
         return bool(self.headers)
 
     def read(self):
         """Reads file content
         This method can be used to work with real files.
+
+        Metadata block is parsed from bytes read with single ``os.pread``
+        for most files; only lines the parser consumes are decoded.
         """
-        if not self.exists:
+        try:
+            # Unbuffered: reads below are as big as needed, no bigger
+            fh = open(self.path, "rb", buffering=0)
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
             return
 
-        with open(self.path, "r", encoding="utf-8") as fh:
-            self.read_stream(fh)
+        with fh:
+            self.exists = True
+            size = os.fstat(fh.fileno()).st_size
+            if size > self.max_size:
+                msg = "File has {size} bytes, more than limit of {limit}"
+                raise UnreadableFileError(msg.format(size=size, limit=self.max_size))
+            # Without read-ahead, cold scan of big files does not fetch
+            # content it skips; full read gets larger read-ahead instead
+            _advise(
+                fh.fileno(), "POSIX_FADV_RANDOM" if self.headers_only else "POSIX_FADV_SEQUENTIAL"
+            )
+
+            prefix = _pread(fh, SNIFF_SIZE, 0)
+            self.encoding, self.bom = sniff(prefix, complete=len(prefix) == size)
+
+            reader = _HeaderReader(fh, size, prefix, self.encoding, len(self.bom))
+            try:
+                raw_content = self._read_headers(iter(reader))
+            finally:
+                reader.close()
+            self.header_end = reader.offset
+            self.newline = reader.newline
+            self.bytes_read = reader.bytes_read
+            if not self.headers_only:
+                fh.seek(reader.offset)
+                rest = fh.read()
+                self.bytes_read = reader.offset + len(rest)
+                rest = rest.decode(self.encoding).replace("\r\n", "\n").replace("\r", "\n")
+                self._read_content([rest], raw_content)
 
     def read_stream(self, stream_handle):
         """Reads and parses file format
         This method can be used to work with any object that provides
         file stream API.
-
-        Note
-        ----
-        Child classes are expected to override this method
         """
-        pass
+        lines = iter(stream_handle)
+        raw_content = self._read_headers(lines)
+        if not self.headers_only:
+            self._read_content(lines, raw_content)
+
+    def _read_headers(self, lines):
+        """Parses metadata block; returns list of lines consumed"""
+        parser = self.parser_class(self.headers)
+        raw_content = []
+        parser.parse(lines, raw_content)
+        self.leading_content = "".join(parser.content)
+        self.header_lines = len(raw_content)
+        return raw_content
+
+    def _read_content(self, lines, raw_content):
+        metadata_end = len(raw_content)
+        raw_content.extend(lines)
+        self.raw_content = "".join(raw_content)
+        self.post_content = self.leading_content + "".join(raw_content[metadata_end:])
 
     @property
     def formatted_headers(self):
-        """Returns file metadata in given format as string
+        """Returns file metadata in given format as string"""
+        return self.format_headers(self.headers)
+
+    @staticmethod
+    def format_headers(headers):
+        """Returns ``headers`` dictionary formatted as metadata block
+
+        Works on handler class, without reading any file.
 
         Note
         ----
@@ -102,12 +531,25 @@ class AbstractFileHandler:
         """
         pass
 
+    @staticmethod
+    def ordered_header_keys(headers, first=()):
+        """Returns keys of ``headers`` in order they should be written
+
+        Keys in ``first`` come first, then well-known keys in predictable
+        order, then all other keys in order they were read.
+        """
+        keys = [key for key in first if key in headers]
+        keys.extend(key for key in HEADERS_ORDER if key in headers)
+        # Title is written separately by formats that do not list it in ``first``
+        known = set(keys) | {"title"}
+        keys.extend(key for key in headers if key not in known)
+        return keys
+
     def prepend_headers(self):
         """Adds file metadata at top of file (leaving existing metadata as-is)
         This method can be used to work with real files.
         """
-        with open(self.path, "w", encoding="utf-8") as fh:
-            self.prepend_headers_stream(fh)
+        self._write_file("", 0)
 
     def prepend_headers_stream(self, stream_handle):
         """Adds file metadata at top of file (leaving existing metadata as-is)
@@ -122,8 +564,135 @@ class AbstractFileHandler:
         """Adds file metadata at top of file (removing existing metadata)
         This method can be used to work with real files.
         """
-        with open(self.path, "w", encoding="utf-8") as fh:
-            self.overwrite_headers_stream(fh)
+        self._write_file(self.leading_content, self.header_end)
+
+    def _write_file(self, content, body_offset):
+        """Atomically replaces file with formatted headers and its own content
+
+        New file is written next to the original and moved into its place,
+        so crash while saving never leaves partially written post. Post
+        content is copied from original file, starting at ``body_offset``,
+        without reading it into memory. File that is not in UTF-8 is
+        converted to UTF-8 instead, since new headers may have characters
+        its encoding does not have.
+
+        Parameters
+        ----------
+        content
+            Text written between headers and copied content.
+        body_offset
+            Offset (in bytes) in original file where copied content starts.
+        """
+        text = self.formatted_headers + "\n\n" + content
+        newline = self.newline or os.linesep
+        if newline != "\n":
+            text = text.replace("\n", newline)
+        self._replace_file(text, body_offset)
+
+    def _replace_file(self, text, body_offset):
+        """Atomically replaces file with ``text`` and its content from ``body_offset``
+
+        See ``_write_file``; ``text`` already has line endings of file.
+        """
+        # Link is kept and file it points to is replaced
+        path = os.path.realpath(self.path)
+        # Byte order mark is written again, before headers
+        body_offset = max(body_offset, len(self.bom))
+        directory, name = os.path.split(path)
+        tmp_path = os.path.join(directory, ".{}.{}.tmp".format(name, os.urandom(4).hex()))
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+        # Mode of new files follows umask, as with plain open()
+        fd = os.open(tmp_path, flags, 0o666)
+
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(self.bom + text.encode("utf-8"))
+                if self.exists:
+                    with open(path, "rb") as src:
+                        os.chmod(tmp_path, stat.S_IMODE(os.fstat(src.fileno()).st_mode))
+                        if self.encoding == "utf-8":
+                            out.flush()
+                            _copy_file_range(src.fileno(), out.fileno(), body_offset)
+                        else:
+                            src.seek(body_offset)
+                            out.write(src.read().decode(self.encoding).encode("utf-8"))
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if self.encoding != "utf-8":
+            msg = "Converted {path} from {encoding} to UTF-8"
+            logging.info(msg.format(path=self.path, encoding=self.encoding))
+            self.encoding = "utf-8"
+        self.exists = True
+
+    def update_headers(self, changes, dry_run=False):
+        """Changes values of some headers, keeping every other line of file as it is
+
+        Only lines of changed headers are rewritten (continuation lines of
+        their values are joined into single line); other headers keep
+        their order, spelling and line breaks. ``headers`` is updated.
+
+        Parameters
+        ----------
+        changes
+            Dictionary of header key (lower case, as in ``headers``) -> new
+            value. Every header must already be in file.
+        dry_run
+            If True, file is not changed.
+
+        Returns
+        -------
+        tuple
+            (old, new) metadata block, with line endings of file.
+
+        Raises
+        ------
+        ValueError
+            If header is not found, or changed metadata block would not be
+            read back as expected.
+        """
+        with open(self.path, "rb") as fh:
+            fh.seek(len(self.bom))
+            old = fh.read(self.header_end - len(self.bom)).decode(self.encoding)
+
+        lines = []
+        remaining = dict(changes)
+        key = None
+        for line in split_lines(old):
+            body = line.rstrip("\r\n")
+            match = self.parser_class.LINE_RE.match(body)
+            kind = match.lastgroup if match else None
+            if kind == "meta":
+                key = match.group("key").lower()
+                if key in remaining:
+                    prefix = body[: match.start("value")]
+                    if not prefix.endswith((" ", "\t")):
+                        prefix += " "
+                    line = prefix + remaining.pop(key) + line[len(body) :]
+            elif kind == "more" and key in changes:
+                # Continuation of changed value, which is now written on one line
+                continue
+            else:
+                key = None
+            lines.append(line)
+        if remaining:
+            raise ValueError("Headers not found: {}".format(", ".join(sorted(remaining))))
+
+        new = "".join(lines)
+        expected = dict(self.headers, **changes)
+        headers = {}
+        lines = (line.rstrip("\r\n") + "\n" for line in split_lines(new))
+        self.parser_class(headers).parse(lines, [])
+        if headers != expected:
+            raise ValueError("Other headers would change; metadata block is too unusual")
+
+        if not dry_run:
+            self._replace_file(new, self.header_end)
+        self.headers = expected
+        return old, new
 
     def overwrite_headers_stream(self, stream_handle):
         """Adds file metadata at top of file (removing existing metadata)
@@ -135,144 +704,144 @@ class AbstractFileHandler:
         stream_handle.write(self.post_content)
 
 
-class MarkdownHandler(AbstractFileHandler):
+class MarkdownHeaderParser(HeaderParser):
     """Markdown metadata parser"""
 
-    def __init__(self, path):
-        super(MarkdownHandler, self).__init__(path)
-        self.default_extension = "md"
-
-    def read_stream(self, stream_handle):
-        META_RE = re.compile(r"^[ ]{0,3}(?P<key>[A-Za-z0-9_-]+):\s*(?P<value>.*)")
-        META_MORE_RE = re.compile(r"^[ ]{4,}(?P<value>.*)")
-        BEGIN_RE = re.compile(r"^-{3}(\s.*)?")
-        END_RE = re.compile(r"^(-{3}|\.{3})(\s.*)?")
+    LINE_RE = re.compile(
+        r"(?P<begin>-{3})"
+        r"|(?P<meta>[ ]{0,3}(?P<key>[A-Za-z0-9_-]+):\s*(?P<value>.*))"
+        r"|(?P<more>[ ]{4,}(?P<more_value>.*))"
+    )
 
-        raw_content = []
-        post_content = []
-        processed_headers = False
-        key = None
+    def on_begin(self, line, match):
+        pass
 
-        for line in stream_handle:
-            raw_content.append(line)
+    def on_meta(self, line, match):
+        key, value = match.group("key", "value")
+        self.key = key.lower()
+        value = value.strip()
+        # We have mis-interpreted URL as key-value pair
+        if value.startswith("//"):
+            self.done = True
+            self.content.append(line)
+        else:
+            self.headers[self.key] = value
 
-            if processed_headers:
-                post_content.append(line)
-                continue
+    def on_more(self, line, match):
+        if not self.key:
+            self.on_other(line, match)
+            return
 
-            if BEGIN_RE.match(line):
-                continue
+        value = match.group("more_value").strip()
+        self.headers[self.key] = "{}; {}".format(self.headers[self.key], value)
 
-            m1 = META_RE.match(line)
-            if m1:
-                key = m1.group("key").lower().strip()
-                value = m1.group("value").strip()
-                # We have mis-interpreted URL as key-value pair
-                if value.startswith("//"):
-                    processed_headers = True
-                    post_content.append(line)
-                else:
-                    self.headers[key] = value
-                continue
+    def on_other(self, line, match):
+        self.done = True
+        if line.strip() != "":
+            self.content.append(line)
 
-            m2 = META_MORE_RE.match(line)
-            if m2 and key:
-                self.headers[key] = "{}; {}".format(self.headers[key], m2.group("value").strip())
-                continue
 
-            if line.strip() == "" or END_RE.match(line) or not m1:
-                processed_headers = True
-                if line.strip() != "":
-                    post_content.append(line)
+class MarkdownHandler(AbstractFileHandler):
+    """Markdown file handler"""
 
-        self.raw_content = "".join(raw_content)
-        self.post_content = "".join(post_content)
+    parser_class = MarkdownHeaderParser
+    default_extension = "md"
 
-    @property
-    def formatted_headers(self):
+    @staticmethod
+    def format_headers(headers):
         output = []
-        for key in ["title", "slug", "date", "modified", "category", "tags", "authors", "summary"]:
-            if key in self.headers:
-                output.append("{}: {}".format(key.title(), self.headers[key]))
+        for key in AbstractFileHandler.ordered_header_keys(headers, ["title"]):
+            output.append("{}: {}".format(key.title(), headers[key]))
 
         return "\n".join(output)
 
 
-class RestructuredtextHandler(AbstractFileHandler):
+class RestructuredtextHeaderParser(HeaderParser):
     """ReStructuredText metadata parser"""
 
-    def __init__(self, path):
-        super(RestructuredtextHandler, self).__init__(path)
-        self.default_extension = "rst"
-
-    def read_stream(self, stream_handle):
-        META_RE = re.compile(r"^[ ]{0,3}:(?P<key>[A-Za-z0-9_-]+):\s*(?P<value>.*)")
-        META_MORE_RE = re.compile(r"^[ ]{4,}-?\s*(?P<value>.*)")
-        META_TITLE_RE = re.compile(r"^[=~_*+#-]+")
-
-        raw_content = []
-        post_content = []
-        processed_headers = False
-        key = None
-
-        for line in stream_handle:
-            raw_content.append(line)
+    LINE_RE = re.compile(
+        r"(?P<title>[=~_*+#-])"
+        r"|(?P<meta>[ ]{0,3}:(?P<key>[A-Za-z0-9_-]+):\s*(?P<value>.*))"
+        r"|(?P<more>[ ]{4,}-?\s*(?P<more_value>.*))"
+    )
 
-            if processed_headers:
-                post_content.append(line)
-                continue
+    def on_title(self, line, match):
+        self.headers["title"] = self.content.pop().strip()
 
-            if len([x for x in post_content if x.strip()]) > 1:
-                processed_headers = True
-                post_content.append(line)
-                continue
+    def on_meta(self, line, match):
+        key, value = match.group("key", "value")
+        self.key = key.lower()
+        self.headers[self.key] = value.strip()
 
-            if META_TITLE_RE.match(line):
-                self.headers["title"] = post_content.pop().strip()
-                continue
+    def on_more(self, line, match):
+        if not self.key:
+            self.on_other(line, match)
+            return
 
-            m1 = META_RE.match(line)
-            if m1:
-                key = m1.group("key").lower().strip()
-                value = m1.group("value").strip()
-                self.headers[key] = value
-                continue
+        value = match.group("more_value").strip()
+        if line.strip().startswith("-"):
+            value = "{}; {}".format(self.headers[self.key], value)
+            self.headers[self.key] = value.lstrip("- ")
+        else:
+            self.headers[self.key] = "{} {}".format(self.headers[self.key], value).strip()
 
-            m2 = META_MORE_RE.match(line)
-            if m2 and key:
-                value = m2.group("value").strip()
-                if line.strip().startswith("-"):
-                    self.headers[key] = "{}; {}".format(self.headers[key], value)
-                    self.headers[key] = self.headers[key].lstrip("- ")
-                else:
-                    self.headers[key] = "{} {}".format(self.headers[key], value).strip()
-                continue
+    def on_other(self, line, match):
+        if line.strip() == "":
+            if len(self.headers) > 1:
+                self.done = True
+            return
 
-            if line.strip() == "":
-                if len(self.headers) > 1:
-                    processed_headers = True
-                continue
+        self.content.append(line)
+        # Second paragraph line means that first one was not underlined
+        # title, so there is no metadata block
+        if "title" in self.headers or len(self.content) > 1:
+            self.done = True
 
-            # `not m1` part of this condition is implicit - we can reach
-            # this point only if line does not match META_RE or META_MORE_RE
-            if "title" in self.headers:
-                processed_headers = True
 
-            post_content.append(line)
+class RestructuredtextHandler(AbstractFileHandler):
+    """ReStructuredText file handler"""
 
-        self.raw_content = "".join(raw_content)
-        self.post_content = "".join(post_content)
+    parser_class = RestructuredtextHeaderParser
+    default_extension = "rst"
 
-    @property
-    def formatted_headers(self):
+    @staticmethod
+    def format_headers(headers):
         output = []
-        if "title" in self.headers:
-            output.append(self.headers["title"])
-            output.append("#" * len(self.headers["title"]))
+        if "title" in headers:
+            output.append(headers["title"])
+            output.append("#" * len(headers["title"]))
             output.append("")
 
-        for key in ["slug", "date", "modified", "category", "tags", "authors", "summary"]:
-            if key in self.headers:
-                output.append(":{}: {}".format(key.lower(), self.headers[key]))
+        for key in AbstractFileHandler.ordered_header_keys(headers):
+            output.append(":{}: {}".format(key.lower(), headers[key]))
 
         return "\n".join(output)
+
+
+# File format -> FileHandler class
+HANDLERS = {
+    "markdown": MarkdownHandler,
+    "restructuredtext": RestructuredtextHandler,
+}
+
+
+def handler_class(file_format):
+    """Returns FileHandler class of ``file_format``, without creating handler"""
+    try:
+        return HANDLERS[file_format]
+    except KeyError:
+        raise NotImplementedError("File format not supported: {}".format(file_format)) from None
+
+
+def default_extension(file_format):
+    """Returns extension (without dot) of new files in ``file_format``"""
+    return handler_class(file_format).default_extension
+
+
+def format_headers(file_format, headers):
+    """Returns ``headers`` dictionary formatted as metadata block of ``file_format``
+
+    Unlike ``formatted_headers`` of FileHandler, this touches no file, so it
+    is cheap enough to call on every change of post metadata.
+    """
+    return handler_class(file_format).format_headers(headers)
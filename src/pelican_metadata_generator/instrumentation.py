@@ -0,0 +1,193 @@
+"""Timers, counters and per-file callbacks of scan and parse pipeline
+
+Instrumentation is off by default. Code that is instrumented checks
+``active`` and does nothing else when it is None, so cost of turned off
+instrumentation is single attribute lookup per file.
+
+Example::
+
+    profiler = instrumentation.enable()
+    profiler.add_callback(lambda stats: print(stats.path, stats.parse_time))
+    ... read directory ...
+    instrumentation.disable()
+    print(profiler.summary())
+"""
+
+import time
+import heapq
+import bisect
+import collections
+
+# Profiler that instrumented code reports to; None if instrumentation is off
+active = None
+
+# Upper bounds (in seconds) of parse time histogram buckets
+HISTOGRAM_BUCKETS = [1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1]
+
+
+class FileStats:
+    """Statistics of reading single file
+
+    Attributes
+    ----------
+    path
+        Path to file.
+    parse_time
+        Time (in seconds) spent reading and parsing file; None if headers
+        were taken from metadata index.
+    bytes_read
+        Number of bytes consumed from file.
+    header_lines
+        Number of lines read by metadata parser.
+    """
+
+    __slots__ = ("path", "parse_time", "bytes_read", "header_lines")
+
+    def __init__(self, path, parse_time=None, bytes_read=0, header_lines=0):
+        self.path = path
+        self.parse_time = parse_time
+        self.bytes_read = bytes_read
+        self.header_lines = header_lines
+
+    @property
+    def cached(self):
+        return self.parse_time is None
+
+
+class _Timer:
+    __slots__ = ("profiler", "stage", "start")
+
+    def __init__(self, profiler, stage):
+        self.profiler = profiler
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add_time(self.stage, time.perf_counter() - self.start)
+
+
+class Profiler:
+    """Collects timings and counters reported by instrumented code
+
+    Memory used does not depend on number of files: only ``top`` slowest
+    files and histogram of parse times are kept.
+
+    Parameters
+    ----------
+    top
+        Number of slowest files remembered.
+
+    Attributes
+    ----------
+    timers
+        Dictionary of stage name -> [total time in seconds, number of calls].
+    counters
+        collections.Counter of event name -> number of events.
+    histogram
+        Number of parsed files in every bucket of HISTOGRAM_BUCKETS, plus
+        one for files slower than the last bucket.
+    """
+
+    def __init__(self, top=10):
+        self.top = top
+        self.timers = {}
+        self.counters = collections.Counter()
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        self.callbacks = []
+        self._slowest = []
+        self._start = time.perf_counter()
+
+    def add_callback(self, callback):
+        """Calls ``callback`` with FileStats of every file that was read"""
+        self.callbacks.append(callback)
+
+    def timer(self, stage):
+        """Returns context manager that adds time spent in it to ``stage``"""
+        return _Timer(self, stage)
+
+    def add_time(self, stage, seconds):
+        timer = self.timers.get(stage)
+        if timer is None:
+            timer = self.timers[stage] = [0.0, 0]
+        timer[0] += seconds
+        timer[1] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def file_read(self, stats):
+        """Records FileStats of single file"""
+        if not stats.cached:
+            self.counters["files_parsed"] += 1
+            self.counters["bytes_read"] += stats.bytes_read
+            self.counters["header_lines"] += stats.header_lines
+            self.histogram[bisect.bisect_left(HISTOGRAM_BUCKETS, stats.parse_time)] += 1
+            item = (stats.parse_time, stats.path)
+            if len(self._slowest) < self.top:
+                heapq.heappush(self._slowest, item)
+            elif item > self._slowest[0]:
+                heapq.heapreplace(self._slowest, item)
+
+        for callback in self.callbacks:
+            callback(stats)
+
+    def slowest(self):
+        """Returns list of (parse time, path) of slowest files, slowest first"""
+        return sorted(self._slowest, reverse=True)
+
+    def summary(self):
+        """Returns human-readable report"""
+        elapsed = time.perf_counter() - self._start
+        lines = ["Profile ({elapsed:.3f} s since start)".format(elapsed=elapsed), ""]
+
+        lines.append("Stages:")
+        for stage, (total, calls) in sorted(self.timers.items(), key=lambda i: -i[1][0]):
+            share = total / elapsed if elapsed else 0
+            msg = "  {stage:<12} {total:9.3f} s {share:6.1%}  {calls:>9} calls"
+            lines.append(msg.format(stage=stage, total=total, share=share, calls=calls))
+
+        lines.extend(["", "Counters:"])
+        for name, value in sorted(self.counters.items()):
+            lines.append("  {name:<16} {value:>12}".format(name=name, value=value))
+
+        lines.extend(["", "Parse time histogram:"])
+        most = max(self.histogram) or 1
+        lower = 0
+        for upper, files in zip(HISTOGRAM_BUCKETS + [None], self.histogram):
+            if upper is None:
+                label = ">= {}".format(_format_seconds(lower))
+            else:
+                label = "<  {}".format(_format_seconds(upper))
+            bar = "#" * round(40 * files / most)
+            lines.append("  {label:<10} {files:>9} {bar}".format(label=label, files=files, bar=bar))
+            lower = upper
+
+        lines.extend(["", "Slowest files:"])
+        for parse_time, path in self.slowest():
+            lines.append("  {time:>9}  {path}".format(time=_format_seconds(parse_time), path=path))
+
+        return "\n".join(lines)
+
+
+def _format_seconds(seconds):
+    if seconds >= 1:
+        return "{:.2f} s".format(seconds)
+    if seconds >= 1e-3:
+        return "{:.2f} ms".format(seconds * 1e3)
+    return "{:.0f} us".format(seconds * 1e6)
+
+
+def enable(profiler=None):
+    """Turns instrumentation on; returns Profiler that collects data"""
+    global active
+    active = profiler or Profiler()
+    return active
+
+
+def disable():
+    """Turns instrumentation off"""
+    global active
+    active = None
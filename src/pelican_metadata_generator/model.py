@@ -1,122 +1,156 @@
 import os
+import time
 import logging
+import bisect
+import contextlib
 
-from PyQt5 import QtCore
+from PyQt5 import QtCore, QtGui
 
+import pelican_metadata_generator.completion
 import pelican_metadata_generator.file_handler
+import pelican_metadata_generator.instrumentation
+import pelican_metadata_generator.post
+import pelican_metadata_generator.query
+import pelican_metadata_generator.scanner
+import pelican_metadata_generator.suggestions
+import pelican_metadata_generator.vocabulary
+import pelican_metadata_generator.walker
+
+
+def _post_field(name):
+    """Returns property that exposes field of wrapped PostMetadata"""
+    return property(
+        lambda self: getattr(self.metadata, name),
+        lambda self, value: setattr(self.metadata, name, value),
+    )
 
 
 class NewPostMetadata(QtCore.QObject):
     """Represents metadata of new post
 
+    Thin Qt adapter over pelican_metadata_generator.post.PostMetadata;
+    it converts Qt values and emits ``changed`` after every modification
+    (or once for all modifications made in ``batch_update``). Fields of
+    PostMetadata are available as attributes.
+
     Attributes
     ----------
-    title
-        Post title
-    slug
-        Post slug (URL-safe identifier)
-    date
-        Created date
-    modified
-        Last modified date
-    category
-        Post category
-    tags
-        Post tags (list)
-    authors
-        Post authors (list)
-    summary
-        Post summary
-    file_format
-        File format. See pelican_metadata_generator.file_handler.Factory for supported file formats.
+    metadata
+        Wrapped pelican_metadata_generator.post.PostMetadata instance.
     """
 
     changed = QtCore.pyqtSignal()
     fileHasHeaders = QtCore.pyqtSignal()
+    # Path of file and reason why it could not be saved
+    saveFailed = QtCore.pyqtSignal(str, str)
+
+    title = _post_field("title")
+    slug = _post_field("slug")
+    date = _post_field("date")
+    modified = _post_field("modified")
+    category = _post_field("category")
+    tags = _post_field("tags")
+    authors = _post_field("authors")
+    summary = _post_field("summary")
+    file_format = _post_field("file_format")
 
     def __init__(self):
         super(NewPostMetadata, self).__init__(None)
-        self.title = ""
-        self.slug = ""
-        self.date = ""
-        self.modified = ""
-        self.category = ""
-        self.tags = []
-        self.authors = []
-        self.summary = ""
-        self.file_format = ""
+        self.metadata = pelican_metadata_generator.post.PostMetadata()
+        self._batch_depth = 0
+        self._batch_changed = False
+
+    @contextlib.contextmanager
+    def batch_update(self):
+        """Context manager that emits single ``changed`` for all changes in it
+
+        Batches may be nested; ``changed`` is emitted when the outermost
+        one ends, and only if anything was changed.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._batch_changed:
+                self._batch_changed = False
+                self.changed.emit()
+
+    def _emit_changed(self):
+        if self._batch_depth:
+            self._batch_changed = True
+        else:
+            self.changed.emit()
 
     @property
     def filename(self):
         """Returns file name based on file format"""
-        ext = (
-            pelican_metadata_generator.file_handler.Factory("", self.file_format)
-            .generate()
-            .default_extension
-        )
-        return "{}.{}".format(self.slug, ext)
+        return self.metadata.filename
 
     def set_title(self, value):
         self.title = value
-        self.changed.emit()
+        self._emit_changed()
 
     def set_slug(self, value):
         self.slug = value
-        self.changed.emit()
+        self._emit_changed()
 
     def set_created_date(self, value):
         self.date = value.toString("yyyy-MM-dd hh:mm:ss")
-        self.changed.emit()
+        self._emit_changed()
 
     def set_modified_date(self, value):
         if value:
             self.modified = value.toString("yyyy-MM-dd hh:mm:ss")
         else:
             self.modified = ""
-        self.changed.emit()
+        self._emit_changed()
 
     def set_category(self, value):
         self.category = value
-        self.changed.emit()
+        self._emit_changed()
 
     def add_tag(self, value):
-        if value not in self.tags:
-            self.tags.append(value)
-        self.changed.emit()
+        self.metadata.add_tag(value)
+        self._emit_changed()
 
     def remove_tag(self, value):
-        self.tags.remove(value)
-        self.changed.emit()
+        self.metadata.remove_tag(value)
+        self._emit_changed()
 
     def set_author(self, value):
-        if not value:
-            self.authors = []
-        else:
-            self.authors = [value]
-        self.changed.emit()
+        self.metadata.set_author(value)
+        self._emit_changed()
 
     def set_summary(self, text):
         self.summary = text
-        self.changed.emit()
+        self._emit_changed()
 
     def set_file_format(self, file_format):
         self.file_format = file_format
-        self.changed.emit()
+        self._emit_changed()
 
     def to_file(self, filepath):
         """Main method used to save current metadata into file
 
         Note
         ----
-        It reads file content in order to verify if file contains
+        It reads metadata block of file in order to verify if file contains
         valid metadata. If it does, it does nothing.
         Instead, controller is responsible for asking user what should
         be done and calling appropriate method directly (adding headers
         at top of file or overwriting existing metadata).
+
+        File that cannot be read (binary, too big) or written is left
+        intact and ``saveFailed`` is emitted.
         """
-        self.file = pelican_metadata_generator.file_handler.Factory(
-            filepath, self.file_format
-        ).generate()
+        try:
+            self.file = pelican_metadata_generator.file_handler.Factory(
+                filepath, self.file_format, headers_only=True
+            ).generate()
+        except (OSError, ValueError) as e:
+            self._save_failed(filepath, e)
+            return
 
         if self.file.has_metadata():
             self.fileHasHeaders.emit()
@@ -126,45 +160,41 @@ class NewPostMetadata(QtCore.QObject):
     def to_file_prepend_headers(self):
         """Adds metadata at top of file content (leaving existing metadata as-is)"""
         self.file.headers = self._format_headers_object()
-        self.file.prepend_headers()
+        try:
+            self.file.prepend_headers()
+        except (OSError, ValueError) as e:
+            self._save_failed(self.file.path, e)
 
     def to_file_overwrite_headers(self):
         """Adds metadata in place of existing metadata"""
         self.file.headers = self._format_headers_object()
-        self.file.overwrite_headers()
+        try:
+            self.file.overwrite_headers()
+        except (OSError, ValueError) as e:
+            self._save_failed(self.file.path, e)
+
+    def _save_failed(self, path, error):
+        # Exception escaping from slot would abort application
+        logging.warning("Could not save {path}: {error}".format(path=path, error=error))
+        self.saveFailed.emit(path, str(error))
 
     def _format_headers_object(self):
         """Prepares dictionary of metadata to inject in FileHandler subclass"""
-        headers = {}
-
-        for key in ["tags", "authors"]:
-            values = getattr(self, key)
-            if not values:
-                continue
-
-            separator = ", "
-            if any(["," in x for x in values]):
-                separator = "; "
-
-            headers[key] = separator.join(sorted(values, key=str.lower))
-
-        for key in ["title", "slug", "date", "modified", "category", "summary"]:
-            if getattr(self, key):
-                headers[key] = getattr(self, key)
-
-        return headers
+        return self.metadata.headers()
 
     def as_pelican_header(self):
         """Returns current metadata as string, formatted according to file
         format rules"""
-        file_ = pelican_metadata_generator.file_handler.Factory("", self.file_format).generate()
-        file_.headers = self._format_headers_object()
-        return file_.formatted_headers
+        return self.metadata.as_pelican_header()
 
 
 class MetadataDatabase(QtCore.QObject):
     """Represents all known metadata values
 
+    Thin Qt adapter over pelican_metadata_generator.vocabulary.Vocabulary;
+    it reads directories (also in background thread) and emits signals
+    when known values change.
+
     Attributes
     ----------
     category
@@ -174,6 +204,19 @@ class MetadataDatabase(QtCore.QObject):
     authors
         List of authors
 
+        Note
+        ----
+        These lists are read-only views; use ``add_value`` to add new
+        value. Each field is backed by
+        pelican_metadata_generator.vocabulary.ValueStore, available in
+        ``stores`` dictionary, which also knows how often and in which
+        files values are used.
+    vocabulary
+        Wrapped pelican_metadata_generator.vocabulary.Vocabulary instance.
+    suggestions
+        pelican_metadata_generator.suggestions.TagSuggestions built from
+        the same files; see ``suggest_tags``.
+
         Note
         ----
         No parsing of author value is attempted.
@@ -185,18 +228,111 @@ class MetadataDatabase(QtCore.QObject):
         Note
         ----
         It is intended for internal use of model methods.
+    roots
+        Paths of all directories that were read.
+    quarantine
+        pelican_metadata_generator.scanner.Quarantine of files that could
+        not be read; scans skip them instead of stopping.
+    files
+        pelican_metadata_generator.walker.FileIndex of files that were
+        read. File reachable from several directories (through symbolic
+        links, hard links or nested directories) is read once and known
+        under single path; see ``roots_of``.
+    cache
+        pelican_metadata_generator.cache.MetadataCache instance used to
+        avoid parsing files that did not change since last scan. Optional.
+    jobs
+        Number of worker processes used to read directory. See
+        pelican_metadata_generator.scanner.Scanner.
     """
 
     changed = QtCore.pyqtSignal()
+    directoryRead = QtCore.pyqtSignal(str)
+    scanProgress = QtCore.pyqtSignal(int, int, float)
+    scanFinished = QtCore.pyqtSignal(int, float)
 
-    def __init__(self, path=None):
+    def __init__(self, path=None, cache=None, jobs=1):
         super(MetadataDatabase, self).__init__(None)
-        self.category = []
-        self.tags = []
-        self.authors = []
+        self.vocabulary = pelican_metadata_generator.vocabulary.Vocabulary()
+        self.suggestions = pelican_metadata_generator.suggestions.TagSuggestions()
+        # field name -> CompletionIndex, built when first needed after change
+        self._completion = {}
         self.path = []
+        self.roots = []
+        self.files = pelican_metadata_generator.walker.FileIndex()
+        self.quarantine = pelican_metadata_generator.scanner.Quarantine()
+        self.cache = cache
+        self.jobs = jobs
+        self._scan_thread = None
+        self._scan_reader = None
         self.read_directory(path)
 
+    @property
+    def stores(self):
+        return self.vocabulary.stores
+
+    @property
+    def category(self):
+        return self.stores["category"].values
+
+    @property
+    def tags(self):
+        return self.stores["tags"].values
+
+    @property
+    def authors(self):
+        return self.stores["authors"].values
+
+    def add_value(self, name, value):
+        """Adds value (not used by any file yet) to known values of field ``name``"""
+        self.vocabulary.add_value(name, value)
+        self._completion.pop(name, None)
+
+    def sorted_values(self, name):
+        """Returns known values of field ``name``, sorted case-insensitively"""
+        return self.vocabulary.sorted_values(name)
+
+    def most_common(self, name, n=None):
+        """Returns ``n`` known values of field ``name`` used by most files"""
+        return self.vocabulary.most_common(name, n)
+
+    def complete(self, name, text, n=10):
+        """Returns up to ``n`` known values of field ``name`` that match ``text``
+
+        See pelican_metadata_generator.completion.CompletionIndex.complete.
+        Index of field is rebuilt only after its values are added or
+        forgotten, so numbers of uses it ranks values by may lag behind.
+        """
+        index = self._completion.get(name)
+        if index is None:
+            store = self.stores[name]
+            counts = {value: store.count(value) for value in store}
+            index = pelican_metadata_generator.completion.CompletionIndex(store, counts)
+            self._completion[name] = index
+        return index.complete(text, n)
+
+    def query(self, text):
+        """Returns paths of read files that match query, e.g. ``tag:python AND NOT author:bob``
+
+        See pelican_metadata_generator.query. Raises QuerySyntaxError if
+        query is not valid.
+        """
+        return pelican_metadata_generator.query.search(self.vocabulary, text)
+
+    def suggest_tags(self, tags=(), category="", authors=(), n=10):
+        """Returns up to ``n`` tags most often used together with given values
+
+        Most used tags are suggested for post that has no tags, category
+        and authors yet.
+        """
+        if not (tags or category or authors):
+            return self.most_common("tags", n)
+        return self.suggestions.suggest(tags, category, authors, n)
+
+    def roots_of(self, path):
+        """Returns tuple of read directories that contain file"""
+        return self.files.roots_of(path)
+
     def read_directory(self, path):
         """Reads metadata from files in directory
 
@@ -205,57 +341,366 @@ class MetadataDatabase(QtCore.QObject):
         path
             Path of directory that should be read.
         """
-        if not path:
+        self.read_directories([path] if path else [])
+
+    def read_directories(self, paths):
+        """Reads metadata from files in directories, as single scan
+
+        ``directoryRead`` is emitted for every directory.
+
+        Parameters
+        ----------
+        paths
+            Paths of directories that should be read.
+        """
+        paths = self._directories(paths)
+        if not paths:
             return
 
-        path = os.path.abspath(path)
-        if os.path.isdir(path):
-            self._readPathFiles(path)
-            self.path = path
-            self.changed.emit()
+        self._readPathFiles(paths)
+        self.path = paths[-1]
+        self.changed.emit()
+        for path in paths:
+            self.directoryRead.emit(path)
 
-    def _readPathFiles(self, path):
-        for root, dirs, files in os.walk(path):
-            for filename in files:
-                self._parseFile(os.path.join(root, filename))
+    def update_files(self, changed=(), removed=()):
+        """Updates known values after files were modified or deleted
 
-    def _parseFile(self, path):
-        logging.debug("Processing {file}".format(file=path))
+        Contribution of every file to known values is replaced by values
+        read from its current content. Files are recorded in ``files``, so
+        new path of file that is already known (e.g. hard link) does not
+        count it twice. ``changed`` is emitted only once.
+
+        Parameters
+        ----------
+        changed
+            Paths of files that were created or modified.
+        removed
+            Paths of files that were deleted.
+        """
+        for path in removed:
+            self._forgetFile(path)
+            self.quarantine.release(path)
+        for path in changed:
+            path = self._indexFile(path)
+            record = pelican_metadata_generator.scanner.parse_file(path, quarantine=self.quarantine)
+            if record:
+                self._addRecord(record)
+            else:
+                self._forgetFile(path)
+        self.changed.emit()
 
+    def _indexFile(self, path):
+        """Records file in ``files`` and returns path it is known under"""
         try:
-            post = pelican_metadata_generator.file_handler.Factory(path).generate()
-        except NotImplementedError:
-            msg = "Ignoring {file} because it has unsupported extension"
-            logging.info(msg.format(file=path))
-            return
+            st = os.stat(path)
+        except OSError:
+            return path
+        path = os.path.abspath(path)
+        for root in self.roots:
+            if pelican_metadata_generator.walker.is_within(path, root):
+                path = self.files.add((st.st_dev, st.st_ino), path, root)
+        return path
+
+    def read_directory_async(self, path):
+        """Reads metadata from files in directory in background thread
 
-        for header in post.headers:
-            if header in ["tags", "category", "author", "authors"]:
-                self._appendMeta(header, post.headers[header])
+        Known values are updated, and ``changed`` is emitted, in batches
+        while directory is read. ``scanProgress`` and ``scanFinished``
+        report state of scan. Scan that is already running is cancelled.
 
-    def _appendMeta(self, name, values):
+        Parameters
+        ----------
+        path
+            Path of directory that should be read.
         """
-        This takes string that is metadata tag value, makes it a list
-        (separated by semicolon or comma), and appends element from list
-        into database of known values for given tag if that value hasn't
-        been encountered earlier.
-        This way we can be sure that known values in database are unique
+        self.read_directories_async([path] if path else [])
+
+    def read_directories_async(self, paths):
+        """Reads metadata from files in directories in background thread, as single scan
+
+        See ``read_directory_async``. ``directoryRead`` is emitted for
+        every directory once scan finishes.
+
+        Parameters
+        ----------
+        paths
+            Paths of directories that should be read.
         """
-        if name == "author":
-            name = "authors"
+        self.cancel_scan()
+        paths = self._directories(paths)
+        if not paths:
+            return
+
+        self.path = paths[-1]
+        self._scan_thread = QtCore.QThread()
+        self._scan_reader = DirectoryReader(paths, self._scanner())
+        self._scan_reader.moveToThread(self._scan_thread)
+        self._scan_thread.started.connect(self._scan_reader.run)
+        self._scan_reader.recordsRead.connect(self._addRecords)
+        self._scan_reader.progress.connect(self._scanProgressed)
+        self._scan_reader.finished.connect(self._scanFinished)
+        self._scan_thread.start()
+
+    def cancel_scan(self):
+        """Stops background scan started by ``read_directory_async``, if any"""
+        if self._scan_reader is None:
+            return
 
-        if ";" in values:
-            values = values.split(";")
+        self._scan_reader.cancel()
+        self._stop_scan_thread()
+
+    def _stop_scan_thread(self):
+        self._scan_thread.quit()
+        self._scan_thread.wait()
+        self._scan_thread = None
+        self._scan_reader = None
+
+    def _addRecords(self, records):
+        # Batches of cancelled scan may still be waiting in event queue
+        if self.sender() is not self._scan_reader:
+            return
+
+        for record in records:
+            self._addRecord(record)
+        self.changed.emit()
+
+    def _scanProgressed(self, done, total, elapsed):
+        if self.sender() is self._scan_reader:
+            self.scanProgress.emit(done, total, elapsed)
+
+    def _scanFinished(self, done, elapsed):
+        if self.sender() is not self._scan_reader:
+            return
+
+        paths = self._scan_reader.path
+        self._stop_scan_thread()
+        self.scanFinished.emit(done, elapsed)
+        for path in paths:
+            self.directoryRead.emit(path)
+
+    def _directories(self, paths):
+        """Returns absolute paths of existing directories, remembered as roots"""
+        paths = [os.path.abspath(path) for path in paths if path]
+        paths = list(dict.fromkeys(path for path in paths if os.path.isdir(path)))
+        self.roots.extend(path for path in paths if path not in self.roots)
+        return paths
+
+    def _scanner(self):
+        return pelican_metadata_generator.scanner.Scanner(
+            jobs=self.jobs, cache=self.cache, index=self.files, quarantine=self.quarantine
+        )
+
+    def _readPathFiles(self, paths):
+        for record in self._scanner().scan(paths):
+            self._addRecord(record)
+
+    def _parseFile(self, path):
+        record = pelican_metadata_generator.scanner.parse_file(path, self.cache, self.quarantine)
+        if record:
+            self._addRecord(record)
+
+    def _addRecord(self, record):
+        profiler = pelican_metadata_generator.instrumentation.active
+        if profiler is None:
+            changed = self.vocabulary.add_record(record)
+            self.suggestions.add_record(record)
         else:
-            values = values.split(",")
+            with profiler.timer("index"):
+                changed = self.vocabulary.add_record(record)
+                self.suggestions.add_record(record)
+        self._invalidateCompletion(changed)
+
+    def _forgetFile(self, path):
+        """Removes contribution of file to known values"""
+        self._invalidateCompletion(self.vocabulary.forget_file(path))
+        self.suggestions.forget_file(path)
+        self.files.forget(path)
+
+    def _invalidateCompletion(self, names):
+        # Index is rebuilt on next completion only if set of values changed;
+        # ranking by number of uses is refreshed with it
+        for name in names:
+            self._completion.pop(name, None)
+
 
-        known_values = getattr(self, name)
+class DirectoryReader(QtCore.QObject):
+    """Reads headers of files in directory; intended to run in worker thread
+
+    Records are sent in batches, no more often than every
+    ``batch_interval`` seconds, so receiving thread is not flooded with
+    signals.
+
+    Parameters
+    ----------
+    path
+        Path of directory, or list of paths of directories, that should be
+        read as single scan.
+    scanner
+        pelican_metadata_generator.scanner.Scanner instance.
+    batch_interval
+        Minimal time between two batches, in seconds.
+    """
+
+    recordsRead = QtCore.pyqtSignal(object)
+    progress = QtCore.pyqtSignal(int, int, float)
+    finished = QtCore.pyqtSignal(int, float)
+
+    def __init__(self, path, scanner, batch_interval=0.25):
+        super(DirectoryReader, self).__init__(None)
+        self.path = path
+        self.scanner = scanner
+        self.batch_interval = batch_interval
+        self._cancelled = False
+
+    def cancel(self):
+        """Requests scan to stop; may be called from any thread"""
+        self._cancelled = True
+
+    def run(self):
+        start = time.monotonic()
+        last_batch = start
+        batch = []
+        done = 0
+
+        # Flag is checked while directories are listed and files are read too
+        records = self.scanner.scan(self.path, lambda: self._cancelled)
+        try:
+            for record in records:
+                if self._cancelled:
+                    return
+                batch.append(record)
+                done += 1
+
+                now = time.monotonic()
+                if now - last_batch >= self.batch_interval:
+                    self.recordsRead.emit(batch)
+                    self.progress.emit(done, self.scanner.total, now - start)
+                    batch = []
+                    last_batch = now
+        finally:
+            records.close()
+
+        if self._cancelled:
+            return
+        if batch:
+            self.recordsRead.emit(batch)
+        self.finished.emit(done, time.monotonic() - start)
 
-        # TODO: I guess we don't support empty values? pelican does this a bit different
-        values = [v.strip() for v in values]
 
-        for v in values:
-            if v and v not in known_values:
-                logging.debug("Appending {v} to {n}".format(v=v, n=name))
-                known_values.append(v)
-                setattr(self, name, known_values)
+def _tag_key(tag):
+    # The same order as pelican_metadata_generator.vocabulary.ValueStore
+    return (tag.lower(), tag)
+
+
+def _runs(rows):
+    """Yields (first, last) of runs of consecutive numbers in sorted ``rows``"""
+    first = last = None
+    for row in rows:
+        if last is not None and row == last + 1:
+            last = row
+            continue
+        if first is not None:
+            yield first, last
+        first = last = row
+    if first is not None:
+        yield first, last
+
+
+class TagListModel(QtGui.QStandardItemModel):
+    """Checkable list of known tags, sorted case-insensitively
+
+    Items live in C++, so views and QSortFilterProxyModel do not call
+    Python for every row; filtering tens of thousands of tags takes
+    milliseconds. ``set_tags`` and ``set_checked`` update only rows that
+    changed, so views keep scroll position.
+
+    Emits ``tagToggled(tag, checked)`` when user checks or unchecks tag.
+    """
+
+    tagToggled = QtCore.pyqtSignal(str, bool)
+
+    def __init__(self, parent=None):
+        super(TagListModel, self).__init__(parent)
+        self._keys = []
+        self._tags = set()
+        self._checked = set()
+        self._updating = False
+        self.itemChanged.connect(self._itemChanged)
+
+    def tags(self):
+        return [tag for _, tag in self._keys]
+
+    def checked_tags(self):
+        return set(self._checked)
+
+    def row(self, tag):
+        """Returns row of ``tag``, or -1 if tag is not known"""
+        key = _tag_key(tag)
+        row = bisect.bisect_left(self._keys, key)
+        if row < len(self._keys) and self._keys[row] == key:
+            return row
+        return -1
+
+    def set_tags(self, tags):
+        """Makes ``tags`` the known tags, inserting and removing only changed rows"""
+        new = set(tags)
+        added = new - self._tags
+        removed = self._tags - new
+        self._tags = new
+
+        # Rows are changed from the end, so rows of earlier changes stay valid
+        rows = sorted(self.row(tag) for tag in removed)
+        for first, last in reversed(list(_runs(rows))):
+            self.removeRows(first, last - first + 1)
+            del self._keys[first : last + 1]
+
+        keys = sorted(_tag_key(tag) for tag in added)
+        end = len(keys)
+        while end:
+            row = bisect.bisect_left(self._keys, keys[end - 1])
+            # All keys that belong before the same row are inserted at once
+            start = bisect.bisect_left(keys, self._keys[row - 1], 0, end) if row else 0
+            batch = keys[start:end]
+            items = [self._item(tag) for _, tag in batch]
+            self.invisibleRootItem().insertRows(row, items)
+            self._keys[row:row] = batch
+            end = start
+
+    def set_checked(self, tags):
+        """Makes ``tags`` checked and all other tags unchecked"""
+        tags = set(tags)
+        changed = tags ^ self._checked
+        self._checked = tags
+        self._updating = True
+        try:
+            for tag in changed:
+                row = self.row(tag)
+                if row >= 0:
+                    self.item(row).setCheckState(self._checkState(tag))
+        finally:
+            self._updating = False
+
+    def _item(self, tag):
+        item = QtGui.QStandardItem(tag)
+        item.setFlags(
+            QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsUserCheckable | QtCore.Qt.ItemNeverHasChildren
+        )
+        item.setCheckState(self._checkState(tag))
+        return item
+
+    def _checkState(self, tag):
+        return QtCore.Qt.Checked if tag in self._checked else QtCore.Qt.Unchecked
+
+    def _itemChanged(self, item):
+        if self._updating:
+            return
+        tag = item.text()
+        checked = item.checkState() == QtCore.Qt.Checked
+        if checked == (tag in self._checked):
+            return
+        if checked:
+            self._checked.add(tag)
+        else:
+            self._checked.discard(tag)
+        self.tagToggled.emit(tag, checked)
@@ -0,0 +1,104 @@
+import pelican_metadata_generator.file_handler
+
+
+class PostMetadata:
+    """Metadata of new post, independent of user interface
+
+    Plain Python object that does not depend on PyQt5 and can be pickled.
+    pelican_metadata_generator.model.NewPostMetadata wraps it for GUI.
+
+    Attributes
+    ----------
+    title
+        Post title
+    slug
+        Post slug (URL-safe identifier)
+    date
+        Created date, as string
+    modified
+        Last modified date, as string
+    category
+        Post category
+    tags
+        Post tags (list)
+    authors
+        Post authors (list)
+    summary
+        Post summary
+    file_format
+        File format. See pelican_metadata_generator.file_handler.Factory for supported file formats.
+    """
+
+    __slots__ = (
+        "title",
+        "slug",
+        "date",
+        "modified",
+        "category",
+        "tags",
+        "authors",
+        "summary",
+        "file_format",
+    )
+
+    def __init__(self):
+        self.title = ""
+        self.slug = ""
+        self.date = ""
+        self.modified = ""
+        self.category = ""
+        self.tags = []
+        self.authors = []
+        self.summary = ""
+        self.file_format = ""
+
+    @property
+    def filename(self):
+        """Returns file name based on file format"""
+        ext = pelican_metadata_generator.file_handler.default_extension(self.file_format)
+        return "{}.{}".format(self.slug, ext)
+
+    def add_tag(self, value):
+        if value not in self.tags:
+            self.tags.append(value)
+
+    def remove_tag(self, value):
+        self.tags.remove(value)
+
+    def set_author(self, value):
+        if not value:
+            self.authors = []
+        else:
+            self.authors = [value]
+
+    def headers(self):
+        """Returns dictionary of metadata, as expected by FileHandler subclasses
+
+        Empty fields are skipped. Lists are sorted case-insensitively and
+        joined with comma, or with semicolon if any value contains comma.
+        """
+        headers = {}
+
+        for key in ["tags", "authors"]:
+            values = getattr(self, key)
+            if not values:
+                continue
+
+            separator = ", "
+            if any(["," in x for x in values]):
+                separator = "; "
+
+            headers[key] = separator.join(sorted(values, key=str.lower))
+
+        for key in ["title", "slug", "date", "modified", "category", "summary"]:
+            if getattr(self, key):
+                headers[key] = getattr(self, key)
+
+        return headers
+
+    def as_pelican_header(self):
+        """Returns current metadata as string, formatted according to file
+        format rules"""
+        return pelican_metadata_generator.file_handler.format_headers(
+            self.file_format, self.headers()
+        )
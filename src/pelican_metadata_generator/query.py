@@ -0,0 +1,286 @@
+"""Queries over tags, categories and authors of posts
+
+Plain Python, independent of PyQt5, like
+pelican_metadata_generator.vocabulary.
+
+Query is made of terms ``field:value``, where field is ``tag``,
+``category`` or ``author`` (plural forms work too), combined with
+``AND``, ``OR``, ``NOT`` and parentheses. ``AND`` binds tighter than
+``OR`` and may be left out::
+
+    tag:python AND category:ops AND NOT author:bob
+    (tag:pelican OR tag:jinja) "category:Web development"
+    tag:"machine learning" author:ann*
+
+Values are compared case-insensitively; value ending with ``*`` matches
+every value that starts with the rest. Values with spaces are quoted,
+either whole term or only its value.
+
+Terms are looked up in pelican_metadata_generator.vocabulary.Vocabulary,
+which keeps sorted array of IDs of posts that use every value. Queries
+are evaluated as operations on such arrays: intersection starts from
+the shortest one, and ``AND NOT`` subtracts instead of complementing.
+"""
+
+import re
+import bisect
+import itertools
+from array import array
+
+# Query field -> name of vocabulary field
+FIELDS = {
+    "tag": "tags",
+    "tags": "tags",
+    "category": "category",
+    "author": "authors",
+    "authors": "authors",
+}
+
+OPERATORS = ("AND", "OR", "NOT")
+
+# Intersection looks up items of short array in long one by bisection
+# when long one is at least that many times longer
+GALLOP_RATIO = 16
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<paren>[()])
+        |"(?P<quoted>(?:[^"\\]|\\.)*)"
+        |(?P<field>[^\s():"]+):"(?P<value>(?:[^"\\]|\\.)*)"
+        |(?P<word>[^\s()"]+)
+    )""",
+    re.VERBOSE,
+)
+_ESCAPE = re.compile(r"\\(.)")
+
+
+class QuerySyntaxError(ValueError):
+    """Query could not be parsed
+
+    Attributes
+    ----------
+    position
+        Offset of character in query where problem was found.
+    """
+
+    def __init__(self, message, position):
+        super(QuerySyntaxError, self).__init__(
+            "{message} at position {position}".format(message=message, position=position)
+        )
+        self.position = position
+
+
+class Query:
+    """Parsed query
+
+    Parameters
+    ----------
+    text
+        Query, e.g. ``tag:python AND NOT author:bob``.
+
+    Raises
+    ------
+    QuerySyntaxError
+        If query is not valid.
+    """
+
+    __slots__ = ("text", "_tree")
+
+    def __init__(self, text):
+        self.text = text
+        self._tree = _Parser(text).parse()
+
+    def __repr__(self):
+        return "Query({!r})".format(self.text)
+
+    def evaluate(self, vocabulary):
+        """Returns sorted array of IDs of matching posts
+
+        IDs are those of ``vocabulary.records.paths``.
+        """
+        # Result may be array of vocabulary itself, which must not change
+        return array("I", _evaluate(self._tree, vocabulary))
+
+
+def search(vocabulary, text):
+    """Returns paths of posts that match query, in order in which they were read"""
+    paths = vocabulary.records.paths
+    return [paths[i] for i in Query(text).evaluate(vocabulary)]
+
+
+class _Parser:
+    """Recursive descent parser that turns query into tree of tuples
+
+    Nodes are ("term", field, key, prefix), ("and", [nodes]),
+    ("or", [nodes]) and ("not", node).
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = list(self._tokenize(text))
+        self.position = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise QuerySyntaxError("Empty query", 0)
+        tree = self._or()
+        if self.position < len(self.tokens):
+            kind, value, offset = self.tokens[self.position]
+            raise QuerySyntaxError("Unexpected {!r}".format(value), offset)
+        return tree
+
+    def _tokenize(self, text):
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if match is None:
+                # Only unterminated quote is left
+                raise QuerySyntaxError("Unterminated quote", text.index('"', position))
+            offset = match.end() - len(match.group(0).lstrip())
+            if match.group("paren"):
+                yield "paren", match.group("paren"), offset
+            elif match.group("field") is not None:
+                yield "term", (match.group("field"), _unescape(match.group("value"))), offset
+            elif match.group("quoted") is not None:
+                yield "term", self._split_term(_unescape(match.group("quoted")), offset), offset
+            elif match.group("word") in OPERATORS:
+                yield "operator", match.group("word"), offset
+            else:
+                yield "term", self._split_term(match.group("word"), offset), offset
+            position = match.end()
+
+    def _split_term(self, word, offset):
+        field, colon, value = word.partition(":")
+        if not colon:
+            raise QuerySyntaxError("Expected field:value, got {!r}".format(word), offset)
+        return field, value
+
+    def _peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None, None, len(self.text)
+
+    def _or(self):
+        nodes = [self._and()]
+        while self._peek()[:2] == ("operator", "OR"):
+            self.position += 1
+            nodes.append(self._and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def _and(self):
+        nodes = [self._unary()]
+        while True:
+            kind, value, _ = self._peek()
+            if (kind, value) == ("operator", "AND"):
+                self.position += 1
+            elif kind == "term" or (kind, value) in [("operator", "NOT"), ("paren", "(")]:
+                # Implicit AND
+                pass
+            else:
+                break
+            nodes.append(self._unary())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def _unary(self):
+        kind, value, offset = self._peek()
+        self.position += 1
+        if (kind, value) == ("operator", "NOT"):
+            return ("not", self._unary())
+        if (kind, value) == ("paren", "("):
+            node = self._or()
+            if self._peek()[:2] != ("paren", ")"):
+                raise QuerySyntaxError("Expected ')'", self._peek()[2])
+            self.position += 1
+            return node
+        if kind == "term":
+            return self._term(value, offset)
+        if kind is None:
+            raise QuerySyntaxError("Unexpected end of query", offset)
+        raise QuerySyntaxError("Unexpected {!r}".format(value), offset)
+
+    def _term(self, term, offset):
+        field, value = term
+        name = FIELDS.get(field.lower())
+        if name is None:
+            msg = "Unknown field {!r}; expected one of {}".format(field, ", ".join(sorted(FIELDS)))
+            raise QuerySyntaxError(msg, offset)
+        prefix = value.endswith("*")
+        key = (value[:-1] if prefix else value).lower()
+        if not key and not prefix:
+            raise QuerySyntaxError("Empty value of {!r}".format(field), offset)
+        return ("term", name, key, prefix)
+
+
+def _unescape(text):
+    return _ESCAPE.sub(r"\1", text)
+
+
+def _evaluate(node, vocabulary):
+    kind = node[0]
+    if kind == "term":
+        _, name, key, prefix = node
+        return union(vocabulary[name].matching_files(key, prefix))
+    if kind == "or":
+        return union(_evaluate(child, vocabulary) for child in node[1])
+    if kind == "not":
+        return difference(vocabulary.records.ids(), _evaluate(node[1], vocabulary))
+
+    # AND: negated operands are subtracted from intersection of the rest
+    positive = [child for child in node[1] if child[0] != "not"]
+    negative = [child[1] for child in node[1] if child[0] == "not"]
+    if positive:
+        result = intersection(_evaluate(child, vocabulary) for child in positive)
+    else:
+        result = vocabulary.records.ids()
+    for child in negative:
+        if not result:
+            break
+        result = difference(result, _evaluate(child, vocabulary))
+    return result
+
+
+def intersection(arrays):
+    """Returns sorted array of IDs present in every one of sorted ``arrays``"""
+    arrays = sorted(arrays, key=len)
+    if not arrays:
+        return array("I")
+
+    result = arrays[0]
+    for other in arrays[1:]:
+        if not result:
+            break
+        if len(result) * GALLOP_RATIO <= len(other):
+            result = _gallop(result, other)
+        else:
+            result = array("I", filter(set(other).__contains__, result))
+    return result
+
+
+def _gallop(short, long):
+    result = array("I")
+    low = 0
+    for item in short:
+        low = bisect.bisect_left(long, item, low)
+        if low == len(long):
+            break
+        if long[low] == item:
+            result.append(item)
+    return result
+
+
+def union(arrays):
+    """Returns sorted array of IDs present in any of sorted ``arrays``"""
+    arrays = [a for a in arrays if a]
+    if not arrays:
+        return array("I")
+    if len(arrays) == 1:
+        return arrays[0]
+    return array("I", sorted(set().union(*arrays)))
+
+
+def difference(first, second):
+    """Returns sorted array of IDs of sorted ``first`` that are not in ``second``"""
+    if not first or not second:
+        return first
+    return array("I", itertools.filterfalse(set(second).__contains__, first))
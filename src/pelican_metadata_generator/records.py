@@ -0,0 +1,214 @@
+"""Compact store of metadata values of posts
+
+Plain Python, independent of PyQt5, like
+pelican_metadata_generator.vocabulary.
+
+Every string (path of post, value of field) is stored once and referred
+to by integer ID. Values of all posts live in flat arrays of IDs, so
+post costs about 100 bytes, mostly dictionary entry that maps its path
+to ID, plus 4 bytes per value. Path strings themselves are shared with
+records they come from.
+"""
+
+from array import array
+
+# Bytes that post of typical blog (category, 1-6 of 500 Zipf-distributed
+# tags, author) may cost in Vocabulary and TagSuggestions combined, path
+# strings not included, when there are 5000 posts; enforced by
+# tests/test_records.py. Share of values and tag pairs shrinks as posts
+# are added: million posts with 5000 tags take about 270 MB (it was
+# 1.75 GB with dictionaries of strings)
+RECORD_BUDGET = 400
+
+# Most values of single field that post may have
+MAX_VALUES = 255
+
+
+class Interner:
+    """Two-way mapping of strings to consecutive integer IDs
+
+    IDs of released strings are not reused, so ID never refers to
+    another string.
+    """
+
+    __slots__ = ("_ids", "_values")
+
+    def __init__(self):
+        self._ids = {}
+        self._values = []
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, value):
+        return value in self._ids
+
+    def __getitem__(self, i):
+        return self._values[i]
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def intern(self, value):
+        """Returns ID of ``value``, assigning new one if needed"""
+        i = self._ids.get(value)
+        if i is None:
+            i = self._ids[value] = len(self._values)
+            self._values.append(value)
+        return i
+
+    def get(self, value):
+        """Returns ID of ``value``, or None"""
+        return self._ids.get(value)
+
+    def ids(self):
+        """Returns IDs of all values, in increasing order"""
+        # Dictionary keeps insertion order, which is order of IDs
+        return self._ids.values()
+
+    def release(self, value):
+        """Forgets ``value``; its ID stays unused"""
+        i = self._ids.pop(value, None)
+        if i is not None:
+            self._values[i] = None
+
+
+class RecordStore:
+    """Values of several fields of every post, as arrays of interned IDs
+
+    Parameters
+    ----------
+    fields
+        Names of fields that are stored.
+
+    Attributes
+    ----------
+    paths
+        Interner of paths of posts; post ID is ID of its path.
+    values
+        Dictionary of field name -> Interner of its values.
+    """
+
+    __slots__ = ("fields", "paths", "values", "_starts", "_lengths", "_data", "_garbage")
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.paths = Interner()
+        self.values = {name: Interner() for name in self.fields}
+        # Value IDs of post are _data[_starts[post]:], field after field;
+        # _lengths has number of values of every field of every post
+        self._starts = array("I")
+        self._lengths = array("B")
+        self._data = array("I")
+        # Items of _data that no post refers to any more
+        self._garbage = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, path):
+        return path in self.paths
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def ids(self):
+        """Returns sorted array of IDs of all posts"""
+        return array("I", self.paths.ids())
+
+    def get(self, path):
+        """Returns dictionary of field name -> list of values of post, or None"""
+        post = self.paths.get(path)
+        if post is None:
+            return None
+        return self._decode(post)
+
+    def set(self, path, values):
+        """Replaces values of post
+
+        Parameters
+        ----------
+        path
+            Path of post.
+        values
+            Dictionary of field name -> list of values. Fields that are
+            missing have no values.
+
+        Returns
+        -------
+        dict
+            Previous values of post, as returned by ``get``; empty if post
+            was not known.
+        """
+        ids = array("I")
+        lengths = array("B")
+        for name in self.fields:
+            field_values = values.get(name, ())[:MAX_VALUES]
+            interner = self.values[name]
+            ids.extend(interner.intern(value) for value in field_values)
+            lengths.append(len(field_values))
+
+        post = self.paths.intern(path)
+        offset = post * len(self.fields)
+        if post == len(self._starts):
+            self._starts.append(len(self._data))
+            self._lengths.extend(lengths)
+            self._data.extend(ids)
+            return {}
+
+        previous = self._decode(post)
+        start = self._starts[post]
+        size = self._size(post)
+        # Rescan of unchanged post does not touch arrays
+        if lengths == self._lengths[offset : offset + len(self.fields)]:
+            if ids == self._data[start : start + size]:
+                return previous
+
+        self._garbage += size
+        self._starts[post] = len(self._data)
+        self._lengths[offset : offset + len(self.fields)] = lengths
+        self._data.extend(ids)
+        self._compact()
+        return previous
+
+    def remove(self, path):
+        """Forgets post; returns its values, as returned by ``get``"""
+        post = self.paths.get(path)
+        if post is None:
+            return {}
+
+        previous = self._decode(post)
+        self._garbage += self._size(post)
+        offset = post * len(self.fields)
+        self._lengths[offset : offset + len(self.fields)] = array("B", bytes(len(self.fields)))
+        self.paths.release(path)
+        self._compact()
+        return previous
+
+    def _size(self, post):
+        offset = post * len(self.fields)
+        return sum(self._lengths[offset : offset + len(self.fields)])
+
+    def _decode(self, post):
+        start = self._starts[post]
+        offset = post * len(self.fields)
+        values = {}
+        for i, name in enumerate(self.fields):
+            end = start + self._lengths[offset + i]
+            interner = self.values[name]
+            values[name] = [interner[v] for v in self._data[start:end]]
+            start = end
+        return values
+
+    def _compact(self):
+        """Drops values that no post refers to, once they are half of the data"""
+        if self._garbage * 2 <= len(self._data) or self._garbage < 1024:
+            return
+
+        data = array("I")
+        for post in range(len(self._starts)):
+            start = self._starts[post]
+            self._starts[post] = len(data)
+            data.extend(self._data[start : start + self._size(post)])
+        self._data = data
+        self._garbage = 0
@@ -0,0 +1,200 @@
+"""Batch changes of metadata values in many files at once
+
+Used by headless ``rename-*`` and ``merge-*`` commands; does not depend
+on PyQt5.
+"""
+
+import os
+import difflib
+import logging
+import itertools
+import collections
+import concurrent.futures
+
+import pelican_metadata_generator.file_handler
+import pelican_metadata_generator.scanner
+import pelican_metadata_generator.vocabulary
+
+# Below that number of files, starting worker processes costs more than
+# it saves and files are rewritten serially
+PARALLEL_THRESHOLD = 200
+
+# Number of files sent to worker process at once
+CHUNK_SIZE = 50
+
+# Number of chunks waiting for each worker process
+CHUNKS_PER_JOB = 4
+
+# Number of unchanged lines shown around every change in diff
+DIFF_CONTEXT = 3
+
+
+class Rename:
+    """Replaces values of single metadata field
+
+    Merging values is renaming all of them to the same new value; if file
+    ends up with the same value twice, only the first one is kept.
+
+    Parameters
+    ----------
+    field
+        Name of field, as in pelican_metadata_generator.vocabulary.FIELDS
+        values ("category", "tags" or "authors").
+    mapping
+        Dictionary of old value -> new value.
+    """
+
+    __slots__ = ("field", "mapping")
+
+    def __init__(self, field, mapping):
+        self.field = field
+        self.mapping = mapping
+
+    def apply(self, headers):
+        """Returns copy of headers with values replaced, or None if nothing changed"""
+        new_headers = None
+        for header, value in headers.items():
+            if pelican_metadata_generator.vocabulary.FIELDS.get(header) != self.field:
+                continue
+            new_value = self._replace(value)
+            if new_value is not None:
+                if new_headers is None:
+                    new_headers = dict(headers)
+                new_headers[header] = new_value
+        return new_headers
+
+    def _replace(self, value):
+        old_values = pelican_metadata_generator.vocabulary.split_values(value)
+        if not any(v in self.mapping for v in old_values):
+            return None
+
+        new_values = []
+        for v in old_values:
+            v = self.mapping.get(v, v)
+            if v not in new_values:
+                new_values.append(v)
+
+        separator = ", "
+        if ";" in value or any("," in v for v in new_values):
+            separator = "; "
+        return separator.join(new_values)
+
+
+def find_files(directories, rename, jobs=1, cache=None):
+    """Yields paths of files that ``rename`` changes
+
+    Headers are taken from metadata index where possible, so only files
+    that changed since last scan are parsed. Directories are scanned
+    together, so file reachable from several of them is yielded once.
+
+    Parameters
+    ----------
+    directories
+        Paths of directories to search.
+    rename
+        Rename instance.
+    jobs
+        See pelican_metadata_generator.scanner.Scanner.
+    cache
+        pelican_metadata_generator.cache.MetadataCache instance. Optional.
+    """
+    scanner = pelican_metadata_generator.scanner.Scanner(jobs=jobs, cache=cache, count_files=False)
+    for record in scanner.scan(directories):
+        if rename.apply(record.headers) is not None:
+            yield record.path
+
+
+def rewrite_file(path, rename, dry_run=False):
+    """Rewrites headers of single file
+
+    Only lines of renamed headers change; every other header keeps its
+    order, spelling and line breaks (see FileHandler.update_headers).
+
+    Returns
+    -------
+    str
+        Unified diff of change (empty if file did not change) when
+        ``dry_run`` is True, otherwise empty string.
+
+    Raises
+    ------
+    ValueError
+        If file cannot be changed without rewriting other headers; such
+        file is left intact.
+    """
+    handler = pelican_metadata_generator.file_handler.Factory(path, headers_only=True).generate()
+    headers = rename.apply(handler.headers)
+    if headers is None:
+        return ""
+
+    changes = {key: value for key, value in headers.items() if handler.headers[key] != value}
+    old, new = handler.update_headers(changes, dry_run=dry_run)
+    if not dry_run:
+        return ""
+    return _diff(path, old, new)
+
+
+def _diff(path, old, new):
+    # Only metadata block changes, so it is all that is compared
+    split_lines = pelican_metadata_generator.file_handler.split_lines
+    old_lines = [line.rstrip("\r\n") + "\n" for line in split_lines(old)]
+    new_lines = [line.rstrip("\r\n") + "\n" for line in split_lines(new)]
+    return "".join(difflib.unified_diff(old_lines, new_lines, path, path, n=DIFF_CONTEXT))
+
+
+def _rewrite_chunk(paths, rename, dry_run):
+    """Rewrites list of files; runs in worker process"""
+    return [_rewrite_safely(path, rename, dry_run) for path in paths]
+
+
+def _rewrite_safely(path, rename, dry_run):
+    """Returns (diff, error message) of rewriting single file"""
+    try:
+        return rewrite_file(path, rename, dry_run), None
+    except (OSError, ValueError) as e:
+        return "", str(e)
+
+
+def rewrite_files(paths, rename, jobs=1, dry_run=False):
+    """Rewrites headers of files, in worker processes if there are many
+
+    Yields
+    ------
+    tuple
+        (path, diff, error) for every file, in order of ``paths``. Error
+        is None if file was rewritten successfully.
+    """
+    if not jobs or jobs < 0:
+        jobs = os.cpu_count() or 1
+    paths = iter(paths)
+
+    first = list(itertools.islice(paths, PARALLEL_THRESHOLD))
+    if jobs == 1 or len(first) < PARALLEL_THRESHOLD:
+        for path in itertools.chain(first, paths):
+            yield (path,) + _rewrite_safely(path, rename, dry_run)
+        return
+
+    paths = itertools.chain(first, paths)
+    logging.info("Rewriting files in {jobs} processes".format(jobs=jobs))
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+    pending = collections.deque()
+    try:
+        while True:
+            chunk = list(itertools.islice(paths, CHUNK_SIZE))
+            if not chunk:
+                break
+            pending.append((chunk, executor.submit(_rewrite_chunk, chunk, rename, dry_run)))
+            while len(pending) > jobs * CHUNKS_PER_JOB:
+                yield from _merge(*pending.popleft())
+
+        while pending:
+            yield from _merge(*pending.popleft())
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown()
+
+
+def _merge(chunk, future):
+    for path, result in zip(chunk, future.result()):
+        yield (path,) + result
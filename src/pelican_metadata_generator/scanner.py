@@ -0,0 +1,386 @@
+import os
+import time
+import logging
+import itertools
+import collections
+import concurrent.futures
+
+import pelican_metadata_generator.file_handler
+import pelican_metadata_generator.instrumentation
+import pelican_metadata_generator.walker
+
+# Below that number of files, starting worker processes costs more than
+# it saves and files are parsed serially
+PARALLEL_THRESHOLD = 1000
+
+# Number of files sent to worker process at once
+CHUNK_SIZE = 100
+
+# Number of chunks waiting for each worker process; bounds memory used by
+# parallel scan no matter how many files there are
+CHUNKS_PER_JOB = 4
+
+
+class HeaderRecord:
+    """Headers read from single post file
+
+    This is what scanning produces instead of FileHandler objects - it does
+    not hold post content, so it is cheap to send between processes.
+
+    Attributes
+    ----------
+    path
+        Path to file
+    headers
+        Dictionary of file metadata
+    parse_time
+        Time (in seconds) spent reading file, or None if headers were taken
+        from metadata index.
+    """
+
+    __slots__ = ("path", "headers", "parse_time")
+
+    def __init__(self, path, headers, parse_time=None):
+        self.path = path
+        self.headers = headers
+        self.parse_time = parse_time
+
+    def __repr__(self):
+        return "HeaderRecord({!r}, {!r})".format(self.path, self.headers)
+
+
+class Quarantine:
+    """Files that could not be read, with reasons
+
+    Scanning puts files whose reading failed here, instead of stopping.
+    File is released once it is read successfully.
+
+    Attributes
+    ----------
+    entries
+        Dictionary of path -> reason, in order in which files failed.
+    """
+
+    __slots__ = ("entries",)
+
+    def __init__(self):
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, path):
+        return path in self.entries
+
+    def __iter__(self):
+        return iter(self.entries.items())
+
+    def add(self, path, reason):
+        """Records that file could not be read"""
+        logging.warning("Skipping {file}: {reason}".format(file=path, reason=reason))
+        self.entries[path] = reason
+        profiler = pelican_metadata_generator.instrumentation.active
+        if profiler is not None:
+            profiler.count("files_quarantined")
+
+    def release(self, path):
+        """Forgets failure of file, e.g. after it was read successfully"""
+        self.entries.pop(path, None)
+
+    def report(self):
+        """Returns human-readable list of files that could not be read"""
+        if not self.entries:
+            return "All files were read"
+        lines = ["{count} files could not be read:".format(count=len(self.entries))]
+        lines.extend("  {path}: {reason}".format(path=p, reason=r) for p, r in self)
+        return "\n".join(lines)
+
+
+def _describe(error):
+    """Returns reason of failure to read file, for Quarantine"""
+    if isinstance(error, pelican_metadata_generator.file_handler.UnreadableFileError):
+        return str(error)
+    if isinstance(error, UnicodeDecodeError):
+        return "File is not valid {encoding} at byte {start}".format(
+            encoding=error.encoding, start=error.start
+        )
+    if isinstance(error, OSError):
+        return error.strerror or str(error)
+    return "{name}: {error}".format(name=type(error).__name__, error=error)
+
+
+def is_supported(path):
+    """True if file format of ``path`` can be read"""
+    try:
+        pelican_metadata_generator.file_handler.Factory(path)
+    except NotImplementedError:
+        msg = "Ignoring {file} because it has unsupported extension"
+        logging.info(msg.format(file=path))
+        return False
+    return True
+
+
+def parse_file(path, cache=None, quarantine=None, max_size=None):
+    """Returns HeaderRecord of file, or None if it is not supported or could not be read
+
+    Failure to read file never propagates: it is logged and recorded in
+    ``quarantine``.
+
+    Parameters
+    ----------
+    path
+        Path to file
+    cache
+        pelican_metadata_generator.cache.MetadataCache instance. Optional.
+    quarantine
+        Quarantine instance. Optional.
+    max_size
+        Files bigger than that many bytes are refused; see
+        pelican_metadata_generator.file_handler.AbstractFileHandler.
+    """
+    logging.debug("Processing {file}".format(file=path))
+
+    try:
+        factory = pelican_metadata_generator.file_handler.Factory(
+            path, headers_only=True, max_size=max_size
+        )
+    except NotImplementedError:
+        msg = "Ignoring {file} because it has unsupported extension"
+        logging.info(msg.format(file=path))
+        return None
+
+    if cache:
+        headers = _lookup(cache, path)
+        if headers is not None:
+            _report(path)
+            return HeaderRecord(path, headers)
+
+    try:
+        headers, parse_time, bytes_read, header_lines = _parse(factory)
+    except Exception as e:
+        if quarantine is None:
+            logging.warning("Skipping {file}: {reason}".format(file=path, reason=_describe(e)))
+        else:
+            quarantine.add(path, _describe(e))
+        return None
+
+    _report(path, parse_time, bytes_read, header_lines)
+    if cache:
+        cache.store(path, headers)
+    if quarantine is not None:
+        quarantine.release(path)
+
+    return HeaderRecord(path, headers, parse_time)
+
+
+def _parse(factory):
+    """Returns headers of file and statistics of reading it"""
+    start = time.perf_counter()
+    handler = factory.generate()
+    parse_time = time.perf_counter() - start
+    return handler.headers, parse_time, handler.bytes_read, handler.header_lines
+
+
+def _parse_isolated(factory):
+    """Returns result of ``_parse``, or reason of failure if file could not be read"""
+    try:
+        return _parse(factory)
+    except Exception as e:
+        return _describe(e)
+
+
+def _lookup(cache, path):
+    profiler = pelican_metadata_generator.instrumentation.active
+    if profiler is None:
+        return cache.lookup(path)
+
+    with profiler.timer("cache"):
+        headers = cache.lookup(path)
+    profiler.count("cache_misses" if headers is None else "cache_hits")
+    return headers
+
+
+def _report(path, parse_time=None, bytes_read=0, header_lines=0):
+    """Passes statistics of reading file to profiler, if instrumentation is on"""
+    profiler = pelican_metadata_generator.instrumentation.active
+    if profiler is not None:
+        stats = pelican_metadata_generator.instrumentation.FileStats(
+            path, parse_time, bytes_read, header_lines
+        )
+        profiler.file_read(stats)
+
+
+def _parse_chunk(paths, max_size=None):
+    """Parses list of supported files; runs in worker process
+
+    Failure of one file does not affect the others: reason is returned
+    in place of its result.
+    """
+    factory = pelican_metadata_generator.file_handler.Factory
+    return [_parse_isolated(factory(path, headers_only=True, max_size=max_size)) for path in paths]
+
+
+class Scanner:
+    """Reads headers of all supported files in directories
+
+    Parameters
+    ----------
+    jobs
+        Number of worker processes used to parse files. 1 means that files
+        are parsed in current process, 0 means one worker per CPU.
+    cache
+        pelican_metadata_generator.cache.MetadataCache instance. Optional.
+    count_files
+        If True, all files are listed before scan starts, so ``total`` is
+        known. Otherwise files are read while directory is traversed and
+        memory used by scan does not depend on number of files.
+    index
+        pelican_metadata_generator.walker.FileIndex shared by all scans, so
+        file found by several of them is known under single path. By default
+        every scan has its own.
+    quarantine
+        Quarantine that collects files that could not be read. By default
+        every Scanner has its own.
+    max_size
+        Files bigger than that many bytes are put in quarantine without
+        being read; pelican_metadata_generator.file_handler.MAX_FILE_SIZE
+        by default.
+
+    Attributes
+    ----------
+    total
+        Number of supported files found in directory. It is known once
+        ``scan`` starts yielding records, if ``count_files`` is True.
+    quarantine
+        Quarantine of files that could not be read. Scan goes on when
+        file fails; such file is not yielded.
+    """
+
+    def __init__(
+        self, jobs=1, cache=None, count_files=True, index=None, quarantine=None, max_size=None
+    ):
+        if not jobs or jobs < 0:
+            jobs = os.cpu_count() or 1
+        self.jobs = jobs
+        self.cache = cache
+        self.count_files = count_files
+        self.index = index
+        self.quarantine = Quarantine() if quarantine is None else quarantine
+        self.max_size = max_size
+        self.total = 0
+
+    def scan(self, path, cancelled=None):
+        """Yields HeaderRecord of every supported file in directory or list of directories
+
+        Directories are walked by pelican_metadata_generator.walker as
+        single job, so files and directories that Pelican ignores are
+        skipped and file reachable from several directories (through
+        symbolic links or nested directories) is read only once. Records
+        are always yielded in the same order, no matter how many worker
+        processes are used. Closing generator before it is exhausted
+        cancels scan.
+
+        Scan may also be cancelled from another thread with ``cancelled``,
+        function that returns True once scan should stop. Unlike closing,
+        that stops listing of files too, which does not yield anything.
+        Scan that was cancelled yields no more records and ends.
+        """
+        directories = [path] if isinstance(path, str) else list(path)
+        walker = pelican_metadata_generator.walker.Walker.for_directories(directories, self.index)
+        paths = walker.files(cancelled)
+        if self.count_files:
+            profiler = pelican_metadata_generator.instrumentation.active
+            if profiler is None:
+                paths = list(paths)
+            else:
+                with profiler.timer("walk"):
+                    paths = list(paths)
+            self.total = len(paths)
+        paths = iter(paths)
+
+        if self.cache:
+            self.cache.open(directories)
+
+        if cancelled is not None:
+            paths = itertools.takewhile(lambda path: not cancelled(), paths)
+
+        complete = False
+        try:
+            if self.jobs > 1:
+                yield from self._scan_parallel(paths)
+            else:
+                yield from self._scan_serial(paths)
+            complete = cancelled is None or not cancelled()
+        finally:
+            if self.cache:
+                self.cache.close(complete=complete)
+
+    def _scan_serial(self, paths):
+        for path in paths:
+            record = parse_file(path, self.cache, self.quarantine, self.max_size)
+            if record:
+                yield record
+
+    def _scan_parallel(self, paths):
+        first = list(itertools.islice(paths, PARALLEL_THRESHOLD))
+        if len(first) < PARALLEL_THRESHOLD:
+            yield from self._scan_serial(first)
+            return
+
+        paths = itertools.chain(first, paths)
+        logging.info("Parsing files in {jobs} processes".format(jobs=self.jobs))
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.jobs)
+        pending = collections.deque()
+        try:
+            while True:
+                chunk = list(itertools.islice(paths, CHUNK_SIZE))
+                if not chunk:
+                    break
+                pending.append(self._submit(executor, chunk))
+                while len(pending) > self.jobs * CHUNKS_PER_JOB:
+                    yield from self._merge(*pending.popleft())
+
+            while pending:
+                yield from self._merge(*pending.popleft())
+        finally:
+            # Do not wait for chunks that did not start yet if scan was cancelled
+            for _, _, future in pending:
+                if future:
+                    future.cancel()
+            executor.shutdown()
+
+    def _submit(self, executor, chunk):
+        """Sends files that are not in metadata index to worker process"""
+        cached = [_lookup(self.cache, path) if self.cache else None for path in chunk]
+        to_parse = [path for path, headers in zip(chunk, cached) if headers is None]
+        future = executor.submit(_parse_chunk, to_parse, self.max_size) if to_parse else None
+        return chunk, cached, future
+
+    def _merge(self, chunk, cached, future):
+        """Combines cached and freshly parsed headers in original file order"""
+        parsed = iter(self._result(future))
+        for path, headers in zip(chunk, cached):
+            parse_time = None
+            if headers is None:
+                result = next(parsed)
+                if isinstance(result, str):
+                    self.quarantine.add(path, result)
+                    continue
+                headers, parse_time, bytes_read, header_lines = result
+                _report(path, parse_time, bytes_read, header_lines)
+                if self.cache:
+                    self.cache.store(path, headers)
+            else:
+                _report(path)
+            self.quarantine.release(path)
+            yield HeaderRecord(path, headers, parse_time)
+
+    def _result(self, future):
+        if not future:
+            return ()
+
+        profiler = pelican_metadata_generator.instrumentation.active
+        if profiler is None:
+            return future.result()
+        with profiler.timer("wait"):
+            return future.result()
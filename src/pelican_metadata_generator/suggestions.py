@@ -0,0 +1,181 @@
+"""Tag suggestions based on which tags are used together
+
+Plain Python, independent of PyQt5, like
+pelican_metadata_generator.vocabulary.
+"""
+
+import bisect
+import heapq
+from array import array
+
+from pelican_metadata_generator.records import RecordStore
+from pelican_metadata_generator.vocabulary import FIELDS, split_values
+
+# Number of most likely tags remembered for every tag, category and author
+TOP_K = 50
+
+# Fields whose values are evidence for tags of the same file
+CONTEXT_FIELDS = ("tags", "category", "authors")
+
+
+class TagSuggestions:
+    """Sparse co-occurrence matrix of tags, also conditioned on category and author
+
+    Every row is keyed by (field name, value) and counts files that use
+    that value together with every tag. Likelihood of tag given value is
+    share of files with that value that also use that tag.
+
+    Rows are pairs of arrays (sorted tag IDs, counts), which take 8
+    bytes per pair of values used together. Tags with the highest counts
+    of every row (TOP_K, or at least half of that) are kept up to date as
+    files are added or forgotten, so suggestion looks at a few dozen tags
+    no matter how big vocabulary is, also right after update. Row is
+    searched again only when so many of its top tags lost their place
+    that fewer than half are left.
+    """
+
+    __slots__ = ("_rows", "_files", "_top", "_records")
+
+    def __init__(self):
+        # key -> (array of tag IDs, array of numbers of files that use both)
+        self._rows = {}
+        # key -> number of files that use it
+        self._files = {}
+        # key -> [array of tag IDs, array of counts, bound] of tags with the
+        # highest counts; no tag outside of arrays has count above bound
+        self._top = {}
+        # Values of CONTEXT_FIELDS of every file
+        self._records = RecordStore(CONTEXT_FIELDS)
+
+    def add_record(self, record):
+        """Adds tags of pelican_metadata_generator.scanner.HeaderRecord
+
+        Values that file contributed earlier are replaced.
+        """
+        values = {}
+        for header, value in record.headers.items():
+            name = FIELDS.get(header)
+            if name in CONTEXT_FIELDS:
+                values[name] = list(dict.fromkeys(values.get(name, []) + split_values(value)))
+        if not any(values.values()):
+            self.forget_file(record.path)
+            return
+
+        previous = self._records.set(record.path, values)
+        # Rescan of unchanged file leaves counts as they are
+        if _keys(previous) != _keys(values):
+            self._update(_keys(previous), -1)
+            self._update(_keys(values), 1)
+
+    def forget_file(self, path):
+        """Removes contribution of file to co-occurrence counts"""
+        keys = _keys(self._records.remove(path))
+        if keys:
+            self._update(keys, -1)
+
+    def _update(self, keys, delta):
+        if not keys:
+            return
+
+        tag_ids = self._records.values["tags"]
+        tags = sorted(tag_ids.get(value) for name, value in keys if name == "tags")
+        for key in keys:
+            self._files[key] = self._files.get(key, 0) + delta
+            if not self._files[key]:
+                del self._files[key]
+                self._rows.pop(key, None)
+                self._top.pop(key, None)
+                continue
+
+            row = self._rows.get(key)
+            if row is None:
+                row = self._rows[key] = (array("I"), array("I"))
+                self._top[key] = [array("I"), array("I"), 0]
+            ids, counts = row
+            top = self._top[key]
+            own = tag_ids.get(key[1]) if key[0] == "tags" else None
+            for tag in tags:
+                if tag == own:
+                    continue
+                position = bisect.bisect_left(ids, tag)
+                if position < len(ids) and ids[position] == tag:
+                    count = counts[position] = counts[position] + delta
+                    if not count:
+                        del ids[position]
+                        del counts[position]
+                else:
+                    count = delta
+                    ids.insert(position, tag)
+                    counts.insert(position, delta)
+                _rank(top, tag, count)
+
+            if len(top[0]) < TOP_K // 2 and len(ids) > len(top[0]):
+                self._top[key] = _ranked(ids, counts)
+
+    def top(self, name, value):
+        """Returns list of (likelihood, tag) of up to TOP_K tags most often used with value"""
+        key = (name, value)
+        files = self._files.get(key)
+        if not files:
+            return []
+        ids, counts, _ = self._top[key]
+        tags = self._records.values["tags"]
+        return sorted(((count / files, tags[i]) for i, count in zip(ids, counts)), reverse=True)
+
+    def suggest(self, tags=(), category="", authors=(), n=10):
+        """Returns up to ``n`` tags most likely to be used together with given values
+
+        Likelihoods of every tag given each selected tag, category and
+        author are summed. Tags from ``tags`` are never suggested.
+        """
+        evidence = [("tags", tag) for tag in tags]
+        if category:
+            evidence.append(("category", category))
+        evidence.extend(("authors", author) for author in authors)
+
+        scores = {}
+        for name, value in evidence:
+            for likelihood, tag in self.top(name, value):
+                scores[tag] = scores.get(tag, 0) + likelihood
+
+        selected = set(tags)
+        candidates = ((score, tag) for tag, score in scores.items() if tag not in selected)
+        return [tag for _, tag in heapq.nlargest(n, candidates)]
+
+
+def _rank(top, tag, count):
+    """Updates top tags of row after count of ``tag`` changed to ``count``"""
+    ids, counts, bound = top
+    try:
+        position = ids.index(tag)
+    except ValueError:
+        # Tag that stays at or below bound may stay out
+        if count <= bound:
+            return
+        ids.append(tag)
+        counts.append(count)
+        if len(ids) > TOP_K:
+            lowest = min(range(len(counts)), key=counts.__getitem__)
+            top[2] = max(bound, counts[lowest])
+            del ids[lowest]
+            del counts[lowest]
+        return
+
+    if count and count >= bound:
+        counts[position] = count
+        return
+    # Some tag outside may have more uses now
+    del ids[position]
+    del counts[position]
+
+
+def _ranked(ids, counts):
+    """Returns top tags of row, as kept by TagSuggestions"""
+    order = heapq.nlargest(TOP_K + 1, range(len(ids)), key=counts.__getitem__)
+    bound = counts[order.pop()] if len(order) > TOP_K else 0
+    return [array("I", (ids[i] for i in order)), array("I", (counts[i] for i in order)), bound]
+
+
+def _keys(values):
+    """Returns list of (field name, value) of dictionary of field name -> values"""
+    return [(name, value) for name in CONTEXT_FIELDS for value in values.get(name, ())]
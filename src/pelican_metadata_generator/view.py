@@ -1,25 +1,36 @@
+import re
+import html
+
 from PyQt5 import QtCore, QtWidgets
 
+import pelican_metadata_generator.model
+
 
 class MainWindow(QtWidgets.QMainWindow):
-    """Builds main application window"""
+    """Builds main application window
+
+    Dialogs are built when they are first shown, so they do not delay
+    first paint of the window. Use ``directorySelected`` and
+    ``saveFileSelected`` signals instead of signals of dialogs.
+    """
 
     prependHeaders = QtCore.pyqtSignal()
     overwriteHeaders = QtCore.pyqtSignal()
+    directorySelected = QtCore.pyqtSignal(str)
+    saveFileSelected = QtCore.pyqtSignal(str)
 
     def __init__(self, parent=None):
         super(MainWindow, self).__init__(parent)
 
         self.app = Window()
+        self.app.saveFileSelected.connect(self.saveFileSelected)
         self.setCentralWidget(self.app)
         self.setWindowTitle("Pelican Metadata Generator")
 
         # FIXME?
         # to retain compatibility with current Controller code
         self.setupTab = self.app.setupTab
-        self.generatedTab = self.app.generatedTab
         self.saveAsFileButton = self.app.saveAsFileButton
-        self.saveFileDialog = self.app.saveFileDialog
 
         self.read_metadata_act = QtWidgets.QAction(
             "Read Pelican metadata from directory",
@@ -41,9 +52,40 @@ class MainWindow(QtWidgets.QMainWindow):
             self.choose_file_format_menu.addAction(file_format)
         self.fileMenu.addAction(self.quit_act)
 
-        self.readMetadataDialog = QtWidgets.QFileDialog()
-        self.readMetadataDialog.setFileMode(QtWidgets.QFileDialog.Directory)
-        self.readMetadataDialog.setOption(QtWidgets.QFileDialog.ShowDirsOnly, True)
+        self._readMetadataDialog = None
+
+    @property
+    def generatedTab(self):
+        return self.app.generatedTab
+
+    @property
+    def saveFileDialog(self):
+        return self.app.saveFileDialog
+
+    @property
+    def readMetadataDialog(self):
+        if self._readMetadataDialog is None:
+            self._readMetadataDialog = QtWidgets.QFileDialog()
+            self._readMetadataDialog.setFileMode(QtWidgets.QFileDialog.Directory)
+            self._readMetadataDialog.setOption(QtWidgets.QFileDialog.ShowDirsOnly, True)
+            self._readMetadataDialog.fileSelected.connect(self.directorySelected)
+        return self._readMetadataDialog
+
+    def show_scan_progress(self, done, total, elapsed):
+        message = "Reading metadata: {done}/{total} files".format(done=done, total=total)
+        if elapsed > 0 and done:
+            rate = done / elapsed
+            eta = (total - done) / rate
+            message += ", {rate:.0f} files/s, ETA {eta:.0f} s".format(rate=rate, eta=eta)
+        self.statusBar().showMessage(message)
+
+    def show_scan_finished(self, done, elapsed, skipped=0):
+        message = "Read metadata from {done} files in {elapsed:.1f} s"
+        if skipped:
+            message += "; {skipped} files could not be read (see log)"
+        self.statusBar().showMessage(
+            message.format(done=done, elapsed=elapsed, skipped=skipped), 5000
+        )
 
     def show_file_exists_dialog(self):
         message = """
@@ -64,42 +106,101 @@ class MainWindow(QtWidgets.QMainWindow):
         elif reply == QtWidgets.QMessageBox.No:
             self.prependHeaders.emit()
 
+    def show_save_failed(self, path, reason):
+        message = "<p>Could not save headers to {path}:</p><p>{reason}</p>"
+        QtWidgets.QMessageBox.warning(
+            self,
+            "File was not saved",
+            message.format(path=html.escape(path), reason=html.escape(reason)),
+        )
+
 
 # FIXME: remove that class entirely
 class Window(QtWidgets.QWidget):
+    """Builds tabs and save button
+
+    "Generated metadata" tab and save dialog are built on first use.
+    Until then, content and directory meant for them are only remembered.
+    """
+
+    saveFileSelected = QtCore.pyqtSignal(str)
+
     def __init__(self, parent=None):
         super(Window, self).__init__(parent)
 
         self.setupTab = SetupTab()
-        self.generatedTab = GeneratedTab()
-
-        tabWidget = QtWidgets.QTabWidget()
-        tabWidget.addTab(self.setupTab, "Metadata form")
-        tabWidget.addTab(self.generatedTab, "Generated metadata")
+        self._generatedTab = None
+        self._generatedContent = ""
+        self._generatedPage = QtWidgets.QWidget()
+        self._generatedPage.setLayout(QtWidgets.QVBoxLayout())
+        self._generatedPage.layout().setContentsMargins(0, 0, 0, 0)
+        self._saveFileDialog = None
+        self._saveDirectory = ""
+
+        self.tabWidget = QtWidgets.QTabWidget()
+        self.tabWidget.addTab(self.setupTab, "Metadata form")
+        self.tabWidget.addTab(self._generatedPage, "Generated metadata")
+        self.tabWidget.currentChanged.connect(self._tabChanged)
 
         self.saveAsFileButton = QtWidgets.QPushButton("Save as file")
         self.saveAsFileButton.setShortcut("Ctrl+S")
 
         mainLayout = QtWidgets.QVBoxLayout()
-        mainLayout.addWidget(tabWidget)
+        mainLayout.addWidget(self.tabWidget)
         mainLayout.addWidget(self.saveAsFileButton)
         self.setLayout(mainLayout)
 
         self.setWindowTitle("Pelican Metadata Generator")
 
         self.saveAsFileButton.setAutoDefault(False)
-        self.saveFileDialog = QtWidgets.QFileDialog()
-        self.saveFileDialog.setAcceptMode(QtWidgets.QFileDialog.AcceptSave)
-        self.saveFileDialog.setOption(QtWidgets.QFileDialog.DontConfirmOverwrite, True)
+
+    @property
+    def generatedTab(self):
+        if self._generatedTab is None:
+            self._buildGeneratedTab()
+        return self._generatedTab
+
+    @property
+    def saveFileDialog(self):
+        if self._saveFileDialog is None:
+            self._saveFileDialog = QtWidgets.QFileDialog()
+            self._saveFileDialog.setAcceptMode(QtWidgets.QFileDialog.AcceptSave)
+            self._saveFileDialog.setOption(QtWidgets.QFileDialog.DontConfirmOverwrite, True)
+            self._saveFileDialog.setDirectory(self._saveDirectory)
+            self._saveFileDialog.fileSelected.connect(self.saveFileSelected)
+        return self._saveFileDialog
+
+    def set_generated_content(self, text):
+        self._generatedContent = text
+        if self._generatedTab is not None:
+            self._generatedTab.set_content(text)
+
+    def set_save_directory(self, path):
+        self._saveDirectory = path
+        if self._saveFileDialog is not None:
+            self._saveFileDialog.setDirectory(path)
 
     def showSaveDialog(self, filename):
         self.saveFileDialog.selectFile(filename)
         self.saveFileDialog.exec()
 
+    def _buildGeneratedTab(self):
+        self._generatedTab = GeneratedTab()
+        self._generatedTab.set_content(self._generatedContent)
+        self._generatedPage.layout().addWidget(self._generatedTab)
+
+    def _tabChanged(self, index):
+        if self._generatedTab is None and self.tabWidget.widget(index) is self._generatedPage:
+            self._buildGeneratedTab()
+
 
 class SetupTab(QtWidgets.QWidget):
     """Builds main tab (with input fields)"""
 
+    suggestedTagSelected = QtCore.pyqtSignal(str)
+    # Field name ("tags", "category" or "authors") and text being typed
+    completionRequested = QtCore.pyqtSignal(str, str)
+
     def __init__(self, parent=None):
         super(SetupTab, self).__init__(parent)
 
@@ -134,19 +235,29 @@ class SetupTab(QtWidgets.QWidget):
         self.categoryLine.addWidget(self.categoryList)
         self.categoryLine.addWidget(self.categoryField)
 
-        self.tagButtonsLayout = QtWidgets.QGridLayout()
-        self.tagButtonsGroup = QtWidgets.QButtonGroup()
-        self.tagButtonsGroup.setExclusive(False)
-        tagButtonsScrollArea = QtWidgets.QScrollArea()
-        tagButtonsScrollArea.setWidgetResizable(True)
-        tagButtonsScrollArea.setMinimumSize(500, 200)  # FIXME: hardcoded values
-        tagButtonsScrollArea.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
-        tagButtonsScrollAreaWidget = QtWidgets.QWidget()
-        tagButtonsScrollArea.setWidget(tagButtonsScrollAreaWidget)
-        tagButtonsScrollAreaWidget.setLayout(self.tagButtonsLayout)
+        # Only visible rows are drawn, so list stays fast with tens of thousands of tags
+        self.tagModel = pelican_metadata_generator.model.TagListModel(self)
+        self.tagFilterModel = QtCore.QSortFilterProxyModel(self)
+        self.tagFilterModel.setSourceModel(self.tagModel)
+        self.tagFilterModel.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        self.tagList = QtWidgets.QListView()
+        self.tagList.setModel(self.tagFilterModel)
+        self.tagList.setUniformItemSizes(True)
+        self.tagList.setMinimumSize(500, 200)  # FIXME: hardcoded values
         self.tagField = QtWidgets.QLineEdit()
+        self.tagField.setPlaceholderText("Filter tags or add new ones, separated by commas")
+        self.tagField.textChanged.connect(self._filterTags)
+        self.suggestedTagList = QtWidgets.QListWidget()
+        self.suggestedTagList.setFlow(QtWidgets.QListView.LeftToRight)
+        self.suggestedTagList.setSpacing(2)
+        self.suggestedTagList.setMaximumHeight(32)  # FIXME: hardcoded value
+        self.suggestedTagList.setToolTip("Suggested tags; click to add")
+        self.suggestedTagList.itemClicked.connect(
+            lambda item: self.suggestedTagSelected.emit(item.text())
+        )
         self.tagLine = QtWidgets.QVBoxLayout()
-        self.tagLine.addWidget(tagButtonsScrollArea)
+        self.tagLine.addWidget(self.tagList)
+        self.tagLine.addWidget(self.suggestedTagList)
         self.tagLine.addWidget(self.tagField)
 
         self.authorList = QtWidgets.QComboBox()
@@ -158,6 +269,13 @@ class SetupTab(QtWidgets.QWidget):
         self.summaryField = QtWidgets.QPlainTextEdit()
         self.summaryField.setMaximumHeight(36)  # FIXME: hardcoded value
 
+        # Completions are computed by controller, so completers do not filter
+        self.completers = {
+            "category": self._makeCompleter(self.categoryField, "category"),
+            "tags": self._makeCompleter(self.tagField, "tags"),
+            "authors": self._makeCompleter(self.authorField, "authors"),
+        }
+
         mainLayout = QtWidgets.QFormLayout()
         mainLayout.addRow("Title:", self.titleField)
         mainLayout.addRow("Slug:", self.slugLine)
@@ -172,24 +290,52 @@ class SetupTab(QtWidgets.QWidget):
     def _setModifiedAllowed(self, value):
         self.modifiedField.setReadOnly(not value)
 
-    def setTagButtons(self, available_tags, checked_tags):
-        while True:
-            item = self.tagButtonsLayout.itemAt(0)
-            if not item:
-                break
-            self.tagButtonsGroup.removeButton(item.widget())
-            self.tagButtonsLayout.removeItem(item)
-            item.widget().setParent(None)
-
-        for tag in available_tags:
-            button = QtWidgets.QPushButton(tag)
-            self.tagButtonsGroup.addButton(button)
-            button.setAutoDefault(False)
-            button.setCheckable(True)
-            button.setChecked(tag in checked_tags)
-            i = self.tagButtonsLayout.count()
-            inRow = 4  # FIXME: hardcoded value
-            self.tagButtonsLayout.addWidget(button, i / inRow, i % inRow)
+    def setTags(self, available_tags, checked_tags):
+        self.tagModel.set_tags(available_tags)
+        self.tagModel.set_checked(checked_tags)
+
+    def setSuggestedTags(self, tags):
+        self.suggestedTagList.clear()
+        self.suggestedTagList.addItems(tags)
+
+    def setCompletions(self, name, values):
+        completer = self.completers[name]
+        completer.model().setStringList(values)
+        if values:
+            completer.complete()
+        else:
+            completer.popup().hide()
+
+    def _makeCompleter(self, field, name):
+        completer = QtWidgets.QCompleter(QtCore.QStringListModel(self), self)
+        completer.setCompletionMode(QtWidgets.QCompleter.UnfilteredPopupCompletion)
+        completer.setWidget(field)
+        completer.activated[str].connect(lambda value: self._completionActivated(field, value))
+        field.textEdited.connect(
+            lambda text: self.completionRequested.emit(name, self._typedValue(field, text))
+        )
+        return completer
+
+    def _typedValue(self, field, text):
+        if field is self.tagField:
+            return _last_tag(text)
+        return text.strip()
+
+    def _completionActivated(self, field, value):
+        if field is self.tagField:
+            typed = _last_tag(field.text())
+            text = field.text()
+            value = text[: text.rindex(typed) if typed else len(text)] + value
+        field.setText(value)
+
+    def _filterTags(self, text):
+        # Only the tag being typed filters the list
+        self.tagFilterModel.setFilterFixedString(_last_tag(text))
+
+
+def _last_tag(text):
+    """Returns tag being typed into list of tags separated by commas"""
+    return re.split("[,;]", text)[-1].strip()
 
 
 class GeneratedTab(QtWidgets.QWidget):
@@ -0,0 +1,320 @@
+import bisect
+import heapq
+import itertools
+import logging
+from array import array
+
+from pelican_metadata_generator.records import Interner, RecordStore
+
+# Header name -> name of field that collects its values
+FIELDS = {
+    "category": "category",
+    "tags": "tags",
+    "author": "authors",
+    "authors": "authors",
+}
+
+
+def split_values(value):
+    """Splits header value into list of values
+
+    Values are separated by semicolon or, if there is no semicolon,
+    by comma. Empty values are skipped.
+    """
+    if ";" in value:
+        values = value.split(";")
+    else:
+        values = value.split(",")
+
+    # TODO: I guess we don't support empty values? pelican does this a bit different
+    return [v for v in (v.strip() for v in values) if v]
+
+
+class ValueStore:
+    """Known values of single metadata field (e.g. all tags)
+
+    Values are kept in a hash table, together with sorted array of IDs of
+    files that use them. New values are appended to unsorted list, which
+    is merged into case-insensitively sorted list when it is needed, so
+    adding many values at once costs single sort of mostly sorted list
+    instead of insertion into the middle of it for every value. Forgotten
+    values are likewise removed from sorted list in one pass.
+
+    Parameters
+    ----------
+    paths
+        pelican_metadata_generator.records.Interner that assigns IDs to
+        paths of files; stores of the same files should share one.
+
+    Attributes
+    ----------
+    values
+        List of values, in order in which they were first encountered.
+    """
+
+    __slots__ = (
+        "_files",
+        "_sorted",
+        "_unsorted",
+        "_removed",
+        "_values",
+        "_sorted_values",
+        "_paths",
+    )
+
+    def __init__(self, paths=None):
+        # Dictionary keeps order in which values were first encountered
+        self._files = {}
+        # (lowercase value, value), sorted, not sorted yet and to be removed
+        self._sorted = []
+        self._unsorted = []
+        self._removed = set()
+        self._values = None
+        self._sorted_values = None
+        self._paths = Interner() if paths is None else paths
+
+    def __contains__(self, value):
+        return value in self._files
+
+    def __len__(self):
+        return len(self._files)
+
+    def __iter__(self):
+        return iter(self._files)
+
+    @property
+    def values(self):
+        if self._values is None:
+            self._values = list(self._files)
+        return self._values
+
+    def add(self, value, path=None):
+        """Adds value used by file ``path``
+
+        Returns
+        -------
+        bool
+            True if value was not known before.
+        """
+        files = self._files.get(value)
+        is_new = files is None
+        if is_new:
+            files = self._files[value] = array("I")
+            key = (value.lower(), value)
+            if key in self._removed:
+                # Still in one of lists
+                self._removed.discard(key)
+            else:
+                self._unsorted.append(key)
+            self._values = None
+            self._sorted_values = None
+
+        if path is not None:
+            i = self._paths.intern(path)
+            # Files read for the first time have the biggest IDs
+            if not files or files[-1] < i:
+                files.append(i)
+            else:
+                position = bisect.bisect_left(files, i)
+                if files[position] != i:
+                    files.insert(position, i)
+
+        return is_new
+
+    def discard(self, value, path):
+        """Removes usage of value by file ``path``
+
+        Value itself is forgotten when no other file uses it.
+
+        Returns
+        -------
+        bool
+            True if value was forgotten.
+        """
+        files = self._files.get(value)
+        i = self._paths.get(path)
+        if files is None or i is None:
+            return False
+
+        position = bisect.bisect_left(files, i)
+        if position == len(files) or files[position] != i:
+            return False
+
+        del files[position]
+        if files:
+            return False
+
+        del self._files[value]
+        self._values = None
+        self._sorted_values = None
+        self._removed.add((value.lower(), value))
+        return True
+
+    def count(self, value):
+        """Returns number of files that use value"""
+        return len(self._files.get(value, ()))
+
+    def files(self, value):
+        """Returns set of files that use value"""
+        return frozenset(self._paths[i] for i in self._files.get(value, ()))
+
+    def file_ids(self, value):
+        """Returns sorted array of IDs of files that use value; must not be modified"""
+        return self._files.get(value, array("I"))
+
+    def matching_files(self, key, prefix=False):
+        """Returns list of sorted arrays of IDs of files that use matching values
+
+        Parameters
+        ----------
+        key
+            Lowercase value. Values are matched case-insensitively.
+        prefix
+            If True, values that start with ``key`` match too.
+        """
+        result = []
+        keys = self._keys()
+        position = bisect.bisect_left(keys, (key,))
+        for lower, value in itertools.islice(keys, position, None):
+            if lower != key and not (prefix and lower.startswith(key)):
+                break
+            result.append(self._files[value])
+        return result
+
+    def sorted_values(self):
+        """Returns values sorted case-insensitively"""
+        if self._sorted_values is None:
+            self._sorted_values = [value for _, value in self._keys()]
+        return self._sorted_values
+
+    def _keys(self):
+        """Returns sorted list of (lowercase value, value) of all values"""
+        if self._removed:
+            removed = self._removed.__contains__
+            self._sorted = list(itertools.filterfalse(removed, self._sorted))
+            self._unsorted = list(itertools.filterfalse(removed, self._unsorted))
+            self._removed = set()
+        if self._unsorted:
+            # Sort finds sorted run, so only new values are really sorted
+            self._sorted.extend(self._unsorted)
+            self._sorted.sort()
+            self._unsorted = []
+        return self._sorted
+
+    def most_common(self, n=None):
+        """Returns up to ``n`` values used by the largest number of files"""
+        if n is None:
+            n = len(self._files)
+        top = heapq.nlargest(n, self._files.items(), key=lambda item: len(item[1]))
+        return [value for value, _ in top]
+
+
+class Vocabulary:
+    """Known values of all metadata fields, indexed by files that use them
+
+    Plain Python object that does not depend on PyQt5 and can be pickled,
+    e.g. to be built in worker process.
+
+    Attributes
+    ----------
+    stores
+        Dictionary of field name -> ValueStore, for every field in FIELDS.
+    records
+        pelican_metadata_generator.records.RecordStore with values that
+        every file contributed.
+    """
+
+    __slots__ = ("stores", "records")
+
+    def __init__(self):
+        names = sorted(set(FIELDS.values()))
+        self.records = RecordStore(names)
+        self.stores = {name: ValueStore(self.records.paths) for name in names}
+
+    def __getitem__(self, name):
+        return self.stores[name]
+
+    def add_value(self, name, value):
+        """Adds value (not used by any file yet) to known values of field ``name``"""
+        self.stores[name].add(value)
+
+    def add_values(self, header, value, path=None):
+        """Adds values of header to known values of its field
+
+        Header value is split into list of values (see ``split_values``).
+        Usage of each value by file ``path`` is recorded, so it can be
+        removed by ``forget_file``.
+        """
+        name = FIELDS[header]
+        if path is None:
+            for v in split_values(value):
+                self._add(name, v, path)
+            return
+
+        values = self.records.get(path) or {}
+        values[name] = values.get(name, []) + split_values(value)
+        self._update(path, values)
+
+    def add_record(self, record):
+        """Adds values from pelican_metadata_generator.scanner.HeaderRecord
+
+        Values that file contributed earlier are replaced.
+
+        Returns
+        -------
+        set
+            Names of fields whose known values were added or forgotten.
+        """
+        values = {}
+        for header, value in record.headers.items():
+            name = FIELDS.get(header)
+            if name:
+                values[name] = values.get(name, []) + split_values(value)
+        return self._update(record.path, values)
+
+    def forget_file(self, path):
+        """Removes contribution of file to known values
+
+        Returns names of fields whose known values were forgotten.
+        """
+        changed = set()
+        # Usage is discarded while ID of path is still known
+        for name, values in (self.records.get(path) or {}).items():
+            for value in values:
+                if self.stores[name].discard(value, path):
+                    changed.add(name)
+        self.records.remove(path)
+        return changed
+
+    def _update(self, path, values):
+        """Replaces values of file, touching only values that changed
+
+        Returns names of fields whose known values were added or forgotten.
+        """
+        changed = set()
+        values = {name: list(dict.fromkeys(v)) for name, v in values.items()}
+        previous = self.records.set(path, values)
+        for name, store in self.stores.items():
+            old = previous.get(name, ())
+            new = values.get(name, ())
+            for value in old:
+                if value not in new and store.discard(value, path):
+                    changed.add(name)
+            for value in new:
+                if value not in old and self._add(name, value, path):
+                    changed.add(name)
+        return changed
+
+    def _add(self, name, value, path):
+        is_new = self.stores[name].add(value, path)
+        if is_new:
+            logging.debug("Appending {v} to {n}".format(v=value, n=name))
+        return is_new
+
+    def sorted_values(self, name):
+        """Returns known values of field ``name``, sorted case-insensitively"""
+        return self.stores[name].sorted_values()
+
+    def most_common(self, name, n=None):
+        """Returns ``n`` known values of field ``name`` used by most files"""
+        return self.stores[name].most_common(n)
@@ -0,0 +1,399 @@
+"""Finding post files in Pelican content directories
+
+Directories are read with os.scandir and files are filtered by name, so
+walking costs about two system calls per directory: file type and inode
+come from directory entry and no file is stat-ed or opened. Directories
+that Pelican ignores are not entered at all.
+
+If ``pelicanconf.py`` is found in walked directory or its parent, its
+PATH, ARTICLE_PATHS, ARTICLE_EXCLUDES, OUTPUT_PATH and IGNORE_FILES
+settings are honored. Configuration is parsed, never executed; settings
+that are not literals are left at Pelican defaults.
+"""
+
+import os
+import re
+import ast
+import stat
+import fnmatch
+import logging
+
+import pelican_metadata_generator.file_handler
+
+CONFIG_NAME = "pelicanconf.py"
+
+# Pelican defaults of settings that walker uses
+DEFAULT_SETTINGS = {
+    "PATH": os.curdir,
+    "ARTICLE_PATHS": [""],
+    "ARTICLE_EXCLUDES": [],
+    "OUTPUT_PATH": "output",
+    "IGNORE_FILES": [".#*"],
+}
+
+# Never contain posts, but may contain thousands of files
+ALWAYS_IGNORED = [".git", ".hg", ".svn", "__pycache__", "node_modules"]
+
+
+def find_config(directory):
+    """Returns path of Pelican configuration of directory, or None"""
+    for candidate in [directory, os.path.dirname(directory)]:
+        path = os.path.join(candidate, CONFIG_NAME)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def read_settings(path):
+    """Returns settings from Pelican configuration file, without executing it
+
+    Only top-level assignments of literal values are read. Settings not
+    assigned that way have their values from DEFAULT_SETTINGS.
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(path, "rb") as fh:
+            tree = ast.parse(fh.read(), path)
+    except (OSError, SyntaxError, ValueError) as e:
+        logging.warning("Could not read Pelican settings from {}: {}".format(path, e))
+        return settings
+
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        target = node.targets[0]
+        if not isinstance(target, ast.Name) or not target.id.isupper():
+            continue
+        try:
+            value = ast.literal_eval(node.value)
+        except ValueError:
+            msg = "Ignoring {name} in {path}: value is not a literal"
+            logging.debug(msg.format(name=target.id, path=path))
+            continue
+        # Pelican accepts single string where list is expected
+        if isinstance(DEFAULT_SETTINGS.get(target.id), list) and isinstance(value, str):
+            value = [value]
+        settings[target.id] = value
+    return settings
+
+
+def is_within(path, directory):
+    """True if ``path`` is ``directory`` or is inside of it"""
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+class FileIndex:
+    """Files found by walkers, identified by device and inode number
+
+    The same file reached through different paths (symbolic links, hard
+    links, overlapping roots) is known under the path it was found at
+    first, together with every root it was found under. Remembered path
+    is checked to still lead to the same file before it is reused, since
+    files are renamed and inode numbers of deleted files are reused.
+    """
+
+    __slots__ = ("_paths", "_files", "_roots")
+
+    def __init__(self):
+        # (device, inode) -> path
+        self._paths = {}
+        # path -> [(device, inode), tuple of roots]
+        self._files = {}
+        # Tuples of roots are shared by all files found under the same roots
+        self._roots = {}
+
+    def __len__(self):
+        return len(self._files)
+
+    def __contains__(self, path):
+        return path in self._files
+
+    def add(self, identity, path, root):
+        """Records that file ``identity`` was found at ``path`` under ``root``
+
+        Returns
+        -------
+        str
+            Path file is known under.
+        """
+        known = self._paths.get(identity)
+        if known is not None and known != path and not _is_file(known, identity):
+            # File was renamed, or its inode now belongs to another file
+            del self._files[known]
+            known = None
+        if known is None:
+            old = self._files.get(path)
+            if old is not None and self._paths.get(old[0]) == path:
+                # File at that path was replaced by another one
+                del self._paths[old[0]]
+            self._paths[identity] = path
+            self._files[path] = [identity, self._intern((root,))]
+            return path
+
+        self.add_root(known, root)
+        return known
+
+    def roots_of(self, path):
+        """Returns tuple of roots file was found under"""
+        entry = self._files.get(path)
+        return entry[1] if entry else ()
+
+    def forget(self, path):
+        """Removes file, e.g. after it was deleted"""
+        entry = self._files.pop(path, None)
+        if entry is not None:
+            self._paths.pop(entry[0], None)
+
+    def add_root(self, path, root):
+        """Records that known file was found again under ``root``"""
+        entry = self._files[path]
+        if root not in entry[1]:
+            entry[1] = self._intern(entry[1] + (root,))
+
+    def _intern(self, roots):
+        return self._roots.setdefault(roots, roots)
+
+
+def _is_file(path, identity):
+    """True if ``path`` leads to file with given (device, inode)"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return (st.st_dev, st.st_ino) == identity
+
+
+class Walker:
+    """Yields supported post files under root directories
+
+    Roots are walked as single job: symbolic links to directories are
+    followed, and every file is yielded once, no matter how many paths
+    lead to it. Files are identified by device and inode number, which
+    directory entries provide without reading file metadata; only
+    directories and symbolic links are stat-ed.
+
+    Parameters
+    ----------
+    roots
+        Directories that are walked.
+    ignore_files
+        Glob patterns of names of files and directories that are skipped
+        (as Pelican IGNORE_FILES). ALWAYS_IGNORED names are skipped too.
+    excludes
+        Paths of directories that are not entered.
+    index
+        FileIndex that records found files. Index shared by several
+        walkers makes file found by all of them known under single path.
+
+    Attributes
+    ----------
+    index
+        FileIndex of found files.
+    """
+
+    def __init__(self, roots=(), ignore_files=(), excludes=(), index=None):
+        self.index = FileIndex() if index is None else index
+        self._roots = []
+        for root in roots:
+            self.add_root(root, ignore_files=ignore_files, excludes=excludes)
+        self._extensions = pelican_metadata_generator.file_handler.EXTENSIONS
+
+    @property
+    def roots(self):
+        return [path for path, _, _, _ in self._roots]
+
+    def add_root(self, path, owner=None, ignore_files=(), excludes=()):
+        """Adds directory to walk
+
+        Parameters
+        ----------
+        path
+            Path of directory.
+        owner
+            Root recorded in ``index`` for files found there; ``path`` by
+            default.
+        ignore_files
+            See Walker.
+        excludes
+            See Walker.
+        """
+        path = os.path.normpath(os.path.abspath(path))
+        patterns = list(ignore_files) + ALWAYS_IGNORED
+        ignored = re.compile("|".join(fnmatch.translate(p) for p in patterns))
+        excludes = {os.path.normpath(os.path.abspath(e)) for e in excludes}
+        self._roots.append((path, owner or path, ignored, excludes))
+
+    def add_directory(self, directory):
+        """Adds directory to walk, following its Pelican settings, if any"""
+        directory = os.path.normpath(os.path.abspath(directory))
+        config = find_config(directory)
+        if config is None:
+            self.add_root(directory)
+            return
+
+        settings = read_settings(config)
+        base = os.path.dirname(config)
+        content = os.path.normpath(os.path.join(base, settings["PATH"]))
+        roots = []
+        for article_path in settings["ARTICLE_PATHS"]:
+            root = os.path.normpath(os.path.join(content, article_path))
+            if is_within(root, directory):
+                roots.append(root)
+            elif is_within(directory, root):
+                roots.append(directory)
+        if not roots:
+            # Directory outside of Pelican content is walked as chosen
+            roots = [directory]
+
+        excludes = [os.path.join(content, path) for path in settings["ARTICLE_EXCLUDES"]]
+        excludes.append(os.path.join(base, settings["OUTPUT_PATH"]))
+        logging.info("Reading {roots} as configured by {config}".format(roots=roots, config=config))
+        for root in dict.fromkeys(roots):
+            self.add_root(root, directory, settings["IGNORE_FILES"], excludes)
+
+    @classmethod
+    def for_directory(cls, directory, index=None):
+        """Returns Walker of directory that follows its Pelican settings, if any"""
+        return cls.for_directories([directory], index)
+
+    @classmethod
+    def for_directories(cls, directories, index=None):
+        """Returns Walker of directories, each following its Pelican settings"""
+        walker = cls(index=index)
+        for directory in directories:
+            walker.add_directory(directory)
+        return walker
+
+    def walk(self, cancelled=None):
+        """Yields (directory, list of paths of supported files) of every directory
+
+        Directories of every root are yielded top-down, in the same order
+        as os.walk. Directory reachable from several roots is yielded for
+        each of them (so ``index`` knows all roots of its files), but its
+        files are yielded only the first time.
+
+        Parameters
+        ----------
+        cancelled
+            Function that returns True once walk should stop. It is called
+            before every directory is read, so walk that nobody iterates
+            (e.g. while files are listed) stops soon too. Optional.
+        """
+        # (device, inode) -> path, of files found by this walk
+        seen = {}
+        for root, owner, ignored, excludes in self._roots:
+            try:
+                st = os.stat(root)
+            except OSError as e:
+                logging.warning("Could not read directory {}: {}".format(root, e))
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                visited = {(st.st_dev, st.st_ino)}
+                args = (owner, ignored, excludes, seen, visited, cancelled)
+                yield from self._walk(root, st.st_dev, *args)
+
+    def walk_from(self, directory, cancelled=None):
+        """Yields the same as ``walk``, but only for directory and its subdirectories
+
+        Directory is walked with settings of first root it is in, e.g. when
+        it was created after that root was walked. Nothing is yielded if
+        ``includes`` is False for it.
+        """
+        directory = os.path.normpath(os.path.abspath(directory))
+        root = self._root_of(directory)
+        if root is None:
+            return
+        try:
+            st = os.stat(directory)
+        except OSError:
+            return
+        if stat.S_ISDIR(st.st_mode):
+            _, owner, ignored, excludes = root
+            args = (owner, ignored, excludes, {}, {(st.st_dev, st.st_ino)}, cancelled)
+            yield from self._walk(directory, st.st_dev, *args)
+
+    def includes(self, path):
+        """True if file or directory is in walked part of some root
+
+        Only names of path and its parent directories are checked; path
+        does not have to exist and extension of file is not checked.
+        """
+        return self._root_of(os.path.normpath(os.path.abspath(path))) is not None
+
+    def _root_of(self, path):
+        for root in self._roots:
+            directory, _, ignored, excludes = root
+            if not is_within(path, directory):
+                continue
+            relative = os.path.relpath(path, directory)
+            for name in relative.split(os.sep) if relative != os.curdir else ():
+                directory = os.path.join(directory, name)
+                if ignored.match(name) or directory in excludes:
+                    break
+            else:
+                return root
+        return None
+
+    def files(self, cancelled=None):
+        """Yields paths of supported files, each only once; see ``walk``"""
+        for _, paths in self.walk(cancelled):
+            yield from paths
+
+    def directories(self, cancelled=None):
+        """Yields paths of directories that are walked; see ``walk``"""
+        for directory, _ in self.walk(cancelled):
+            yield directory
+
+    def _walk(self, directory, device, owner, ignored, excludes, seen, visited, cancelled):
+        if cancelled is not None and cancelled():
+            return
+        files = []
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if ignored.match(name):
+                        continue
+                    try:
+                        if entry.is_dir():
+                            if entry.path in excludes:
+                                continue
+                            st = entry.stat()
+                            identity = (st.st_dev, st.st_ino)
+                            # Links may lead back to directory that is being walked
+                            if identity not in visited:
+                                visited.add(identity)
+                                subdirectories.append((entry.path, st.st_dev))
+                        elif os.path.splitext(name)[1] in self._extensions and entry.is_file():
+                            if entry.is_symlink():
+                                st = entry.stat()
+                                identity = (st.st_dev, st.st_ino)
+                            else:
+                                identity = (device, entry.inode())
+                            path = seen.get(identity)
+                            if path is None:
+                                path = seen[identity] = self.index.add(identity, entry.path, owner)
+                                files.append(path)
+                            else:
+                                self.index.add_root(path, owner)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logging.warning("Could not read directory {}: {}".format(directory, e))
+            return
+
+        yield directory, files
+        args = (owner, ignored, excludes, seen, visited, cancelled)
+        for subdirectory, subdirectory_device in subdirectories:
+            yield from self._walk(subdirectory, subdirectory_device, *args)
+
+
+def walk(directory):
+    """Yields paths of supported files in directory or list of directories
+
+    See Walker.for_directories.
+    """
+    if isinstance(directory, str):
+        directory = [directory]
+    return Walker.for_directories(directory).files()
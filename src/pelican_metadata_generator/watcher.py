@@ -0,0 +1,270 @@
+import os
+import time
+import logging
+
+from PyQt5 import QtCore
+
+import pelican_metadata_generator.scanner
+import pelican_metadata_generator.walker
+
+
+class DirectoryWatcher(QtCore.QObject):
+    """Keeps MetadataDatabase up to date with changes in directories it read
+
+    Every directory read by database (and all its subdirectories that
+    walker enters, following Pelican settings) is watched for changes.
+    Only files that were created, modified or deleted are read again.
+
+    Only directories are watched, so number of watches does not grow with
+    number of posts. Directory reports files that were created, deleted or
+    renamed in it, but not files modified in place, so listings of all
+    watched directories are also compared every ``poll_interval``
+    milliseconds. Directories are listed and compared in worker thread.
+
+    Bursts of events (e.g. caused by ``git checkout``) are coalesced into
+    single update: files are read ``delay`` milliseconds after last event,
+    but no later than ``max_delay`` milliseconds after first one.
+
+    Call ``stop`` before application quits.
+
+    Parameters
+    ----------
+    database
+        pelican_metadata_generator.model.MetadataDatabase instance.
+    delay
+        Time (in milliseconds) without events after which update is done.
+    max_delay
+        Maximal time (in milliseconds) between first event and update.
+    poll_interval
+        Time (in milliseconds) between comparisons of all listings. 0
+        disables them.
+    """
+
+    # Emitted with path of directory once it and its subdirectories are watched
+    watchStarted = QtCore.pyqtSignal(str)
+
+    _watchRequested = QtCore.pyqtSignal(str)
+    _refreshRequested = QtCore.pyqtSignal(object)
+    _stopRequested = QtCore.pyqtSignal()
+
+    def __init__(self, database, delay=300, max_delay=2000, poll_interval=5000):
+        super(DirectoryWatcher, self).__init__(None)
+        self.database = database
+        self.delay = delay
+        self.max_delay = max_delay
+
+        self.watcher = QtCore.QFileSystemWatcher()
+        self.watcher.directoryChanged.connect(self._directory_changed)
+        self.timer = QtCore.QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._flush)
+
+        self._dirty = set()
+        self._first_event = None
+
+        self._thread = QtCore.QThread()
+        self._lister = DirectoryLister(poll_interval)
+        self._lister.moveToThread(self._thread)
+        self._thread.started.connect(self._lister.start)
+        self._watchRequested.connect(self._lister.watch)
+        self._refreshRequested.connect(self._lister.refresh)
+        self._stopRequested.connect(self._lister.stop)
+        self._lister.watched.connect(self._watched)
+        self._lister.listed.connect(self._listed)
+        self._thread.start()
+
+        database.directoryRead.connect(self.watch)
+
+    def watch(self, path):
+        """Starts watching directory and its subdirectories that may contain posts"""
+        self._watchRequested.emit(path)
+
+    def stop(self):
+        """Stops watching and waits for worker thread to finish"""
+        if self._thread is None:
+            return
+        self._lister.cancel()
+        self._stopRequested.emit()
+        self._thread.wait()
+        self._thread = None
+
+    def _watched(self, path, directories):
+        if directories:
+            self.watcher.addPaths(directories)
+        self.watchStarted.emit(path)
+
+    def _directory_changed(self, path):
+        self._dirty.add(path)
+        self._schedule()
+
+    def _schedule(self):
+        now = time.monotonic()
+        if self._first_event is None:
+            self._first_event = now
+        elapsed = (now - self._first_event) * 1000
+        self.timer.start(int(max(0, min(self.delay, self.max_delay - elapsed))))
+
+    def _flush(self):
+        self._refreshRequested.emit(sorted(self._dirty))
+        self._dirty.clear()
+        self._first_event = None
+
+    def _listed(self, changed, removed, found, gone):
+        if found:
+            self.watcher.addPaths(found)
+        watched = set(self.watcher.directories())
+        stale = [path for path in gone if path in watched]
+        if stale:
+            self.watcher.removePaths(stale)
+
+        if changed or removed:
+            msg = "Files changed on disk: {changed} modified, {removed} removed"
+            logging.info(msg.format(changed=len(changed), removed=len(removed)))
+            self.database.update_files(changed, removed)
+
+
+class DirectoryLister(QtCore.QObject):
+    """Lists watched directories and finds changed files; lives in worker thread
+
+    Listing of directory maps names of supported files to their
+    modification time, size and inode number, and names of
+    subdirectories to None. Directories are walked with walker of
+    directory they were found in, so files and directories that Pelican
+    ignores are not listed.
+
+    Parameters
+    ----------
+    poll_interval
+        See DirectoryWatcher.
+    """
+
+    # Path of directory and list of its directories that started to be listed
+    watched = QtCore.pyqtSignal(str, object)
+    # Lists of changed and removed files, and of found and gone directories
+    listed = QtCore.pyqtSignal(object, object, object, object)
+
+    def __init__(self, poll_interval=0):
+        super(DirectoryLister, self).__init__(None)
+        self.poll_interval = poll_interval
+        self._walkers = []
+        # directory path -> {name: signature}
+        self._listings = {}
+        self._cancelled = False
+        self._timer = None
+
+    def start(self):
+        if self.poll_interval:
+            # Created here, so that it belongs to worker thread
+            self._timer = QtCore.QTimer(self)
+            self._timer.timeout.connect(lambda: self.refresh(list(self._listings)))
+            self._timer.start(self.poll_interval)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.stop()
+        self.thread().quit()
+
+    def cancel(self):
+        """Makes listing stop soon; may be called from any thread"""
+        self._cancelled = True
+
+    def watch(self, path):
+        walker = pelican_metadata_generator.walker.Walker.for_directory(path)
+        self._walkers.append(walker)
+        found = []
+        for directory in walker.directories(self._is_cancelled):
+            if directory not in self._listings:
+                self._listings[directory] = self._list(directory, walker)
+                found.append(directory)
+        self.watched.emit(path, found)
+
+    def refresh(self, directories):
+        """Compares listings of directories with their previous listings"""
+        changed = set()
+        removed = set()
+        found = []
+        gone = []
+
+        for directory in directories:
+            old = self._listings.get(directory)
+            if old is None or self._cancelled:
+                continue
+
+            if not os.path.isdir(directory):
+                removed.update(self._forget_tree(directory, gone))
+                continue
+
+            walker = self._walker_of(directory)
+            new = self._listings[directory] = self._list(directory, walker)
+            for name, signature in new.items():
+                path = os.path.join(directory, name)
+                if signature is None and name not in old:
+                    changed.update(self._list_tree(path, walker, found))
+                elif signature is not None and old.get(name) != signature:
+                    changed.add(path)
+
+            for name, signature in old.items():
+                if name in new:
+                    continue
+                path = os.path.join(directory, name)
+                if signature is None:
+                    removed.update(self._forget_tree(path, gone))
+                else:
+                    removed.add(path)
+
+        changed -= removed
+        if changed or removed or found or gone:
+            self.listed.emit(sorted(changed), sorted(removed), found, gone)
+
+    def _is_cancelled(self):
+        return self._cancelled
+
+    def _walker_of(self, directory):
+        for walker in self._walkers:
+            if walker.includes(directory):
+                return walker
+        return None
+
+    def _list(self, path, walker):
+        listing = {}
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return listing
+
+        for entry in entries:
+            try:
+                if not walker.includes(entry.path):
+                    continue
+                if entry.is_dir():
+                    listing[entry.name] = None
+                elif entry.is_file() and pelican_metadata_generator.scanner.is_supported(
+                    entry.path
+                ):
+                    st = entry.stat()
+                    listing[entry.name] = (st.st_mtime_ns, st.st_size, st.st_ino)
+            except OSError:
+                continue
+        return listing
+
+    def _list_tree(self, path, walker, found):
+        """Lists new directory and its subdirectories and returns files in them"""
+        for directory, _ in walker.walk_from(path, self._is_cancelled):
+            if directory in self._listings:
+                continue
+            listing = self._listings[directory] = self._list(directory, walker)
+            found.append(directory)
+            for name, signature in listing.items():
+                if signature is not None:
+                    yield os.path.join(directory, name)
+
+    def _forget_tree(self, path, gone):
+        """Drops listings of directory and its subdirectories and returns files in them"""
+        prefix = os.path.join(path, "")
+        directories = [d for d in self._listings if d == path or d.startswith(prefix)]
+        files = []
+        for directory in directories:
+            listing = self._listings.pop(directory)
+            files.extend(os.path.join(directory, n) for n, s in listing.items() if s is not None)
+        gone.extend(directories)
+        return files
@@ -0,0 +1,95 @@
+import unittest
+
+import os
+import json
+import shutil
+import tempfile
+
+from pelican_metadata_generator import cache
+from pelican_metadata_generator import model
+
+
+CUR_DIR = os.path.dirname(__file__)
+CONTENT_PATH = os.path.join(CUR_DIR, "posts")
+
+
+class TestMetadataCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.content_dir = os.path.join(self.tmp_dir, "content")
+        shutil.copytree(CONTENT_PATH, self.content_dir)
+        self.cache = cache.MetadataCache(self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _scan(self):
+        db = model.MetadataDatabase(cache=self.cache)
+        db.read_directory(self.content_dir)
+        return db
+
+    def test_rescan_uses_index(self):
+        first = self._scan()
+        self.assertEqual(self.cache.hits, 0)
+
+        second = self._scan()
+
+        self.assertGreater(self.cache.hits, 0)
+        self.assertEqual(self.cache.misses, 0)
+        self.assertEqual(second.tags, first.tags)
+        self.assertEqual(second.category, first.category)
+        self.assertEqual(second.authors, first.authors)
+
+    def test_modified_file_is_parsed_again(self):
+        self._scan()
+        path = os.path.join(self.content_dir, "tags_separated_by_comma.md")
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write("More content\n")
+
+        self._scan()
+
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_deleted_file_is_dropped(self):
+        self._scan()
+        path = os.path.join(self.content_dir, "tags_separated_by_comma.md")
+        os.remove(path)
+
+        self._scan()
+
+        self.assertNotIn(os.path.realpath(path), self.cache.entries)
+
+    def test_interrupted_scan_is_resumed(self):
+        self.cache.checkpoint_interval = 1
+        self.cache.open(self.content_dir)
+        db = model.MetadataDatabase()
+        db.cache = self.cache
+        db._parseFile(os.path.join(self.content_dir, "tags_separated_by_comma.md"))
+
+        resumed = cache.MetadataCache(self.cache_dir)
+        resumed.open(self.content_dir)
+
+        self.assertEqual(len(resumed.entries), 1)
+
+    def test_old_index_files_are_evicted(self):
+        os.makedirs(self.cache_dir)
+        old_index = os.path.join(self.cache_dir, "old.json")
+        with open(old_index, "w") as fh:
+            json.dump({}, fh)
+        os.utime(old_index, (0, 0))
+
+        self._scan()
+
+        self.assertFalse(os.path.exists(old_index))
+
+    def test_index_files_are_evicted_by_size(self):
+        os.makedirs(self.cache_dir)
+        big_index = os.path.join(self.cache_dir, "big.json")
+        with open(big_index, "w") as fh:
+            fh.write(" " * 2048)
+        self.cache.max_size = 1024
+
+        self._scan()
+
+        self.assertFalse(os.path.exists(big_index))
@@ -0,0 +1,79 @@
+import unittest
+
+import io
+import os
+import sys
+import json
+import contextlib
+import subprocess
+
+from pelican_metadata_generator import commands
+
+
+CUR_DIR = os.path.dirname(__file__)
+CONTENT_PATH = os.path.join(CUR_DIR, "posts")
+
+
+class TestScanCommand(unittest.TestCase):
+    def _run(self, *argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = commands.main(list(argv))
+        self.assertEqual(status, 0)
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_every_post_is_written_as_line(self):
+        lines = self._run("scan", CONTENT_PATH)
+
+        paths = [os.path.basename(line["path"]) for line in lines[:-1]]
+        self.assertIn("file_with_headers.md", paths)
+        self.assertNotIn("file.txt", paths)
+        self.assertEqual(lines[-1]["summary"]["files"], len(paths))
+
+    def test_summary_counts_values(self):
+        lines = self._run("scan", "--format", "summary", CONTENT_PATH)
+
+        self.assertEqual(len(lines), 1)
+        summary = lines[0]["summary"]
+        self.assertIn("Tag", summary["tags"])
+        self.assertGreater(summary["tags"]["Tag"], 0)
+
+    def test_summary_lists_files_that_could_not_be_read(self):
+        lines = self._run("scan", "--format", "summary", "--max-size", "10", CONTENT_PATH)
+
+        quarantined = lines[0]["summary"]["quarantined"]
+        self.assertIn(os.path.join(CONTENT_PATH, "file_with_headers.md"), quarantined)
+        self.assertEqual(lines[0]["summary"]["files"], 0)
+
+    def test_query_prints_matching_paths(self):
+        argv = ["query", "--no-cache", "tag:tag AND NOT tag:file", CONTENT_PATH]
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+            status = commands.main(argv)
+
+        self.assertEqual(status, 0)
+        paths = output.getvalue().splitlines()
+        self.assertTrue(paths)
+        self.assertTrue(all(path.startswith(CONTENT_PATH) for path in paths))
+
+    def test_invalid_query_is_rejected(self):
+        errors = io.StringIO()
+        with contextlib.redirect_stderr(errors):
+            status = commands.main(["query", "--no-cache", "tag:a AND", CONTENT_PATH])
+
+        self.assertEqual(status, 2)
+        self.assertIn("Invalid query", errors.getvalue())
+
+    def test_pyqt_is_not_imported(self):
+        code = (
+            "import sys, io, contextlib\n"
+            "import pelican_metadata_generator.cli\n"
+            "from pelican_metadata_generator import commands\n"
+            "with contextlib.redirect_stdout(io.StringIO()):\n"
+            "    commands.main(['scan', {path!r}])\n"
+            "print('PyQt5' in sys.modules)\n"
+        ).format(path=CONTENT_PATH)
+
+        output = subprocess.check_output([sys.executable, "-c", code], env=dict(os.environ))
+
+        self.assertEqual(output.strip(), b"False")
@@ -0,0 +1,43 @@
+import unittest
+
+import time
+
+from pelican_metadata_generator import completion
+
+
+class TestNormalize(unittest.TestCase):
+    def test_case_and_accents_are_ignored(self):
+        self.assertEqual(completion.normalize("Café NAÏVE"), "cafe naive")
+        self.assertEqual(completion.normalize("Straße"), "strasse")
+
+
+class TestCompletionIndex(unittest.TestCase):
+    def setUp(self):
+        values = ["Python", "PyQt5 tips", "pelican", "Résumé", "photos", "Pythonic"]
+        counts = {"Python": 5, "PyQt5 tips": 2, "pelican": 3, "Pythonic": 9}
+        self.index = completion.CompletionIndex(values, counts)
+
+    def test_prefix_matches_are_ranked_by_use(self):
+        self.assertEqual(self.index.complete("py"), ["Pythonic", "Python", "PyQt5 tips"])
+
+    def test_prefix_ignores_case_and_accents(self):
+        self.assertEqual(self.index.complete("RESU"), ["Résumé"])
+
+    def test_subsequence_matches_follow_prefix_matches(self):
+        self.assertEqual(self.index.complete("pqt"), ["PyQt5 tips"])
+        self.assertEqual(self.index.complete("pho"), ["photos", "Pythonic", "Python"])
+
+    def test_empty_text_returns_most_used(self):
+        self.assertEqual(self.index.complete("", n=2), ["Pythonic", "Python"])
+
+    def test_lookup_is_fast_with_large_vocabulary(self):
+        values = ["value {} café".format(i) for i in range(100000)]
+        counts = {value: i % 97 for i, value in enumerate(values)}
+        index = completion.CompletionIndex(values, counts)
+
+        for text in ["v", "value 1234", "VALUE 99999 CAFE", "vcf"]:
+            start = time.perf_counter()
+            for _ in range(100):
+                self.assertTrue(index.complete(text))
+            elapsed = (time.perf_counter() - start) / 100
+            self.assertLess(elapsed, 1e-3, text)
@@ -0,0 +1,108 @@
+import unittest
+
+import os
+import sys
+import json
+import pickle
+import subprocess
+from unittest import mock
+
+from pelican_metadata_generator import file_handler
+from pelican_metadata_generator import post
+
+
+# Modules that must work without PyQt5
+CORE_MODULES = [
+    "pelican_metadata_generator.completion",
+    "pelican_metadata_generator.file_handler",
+    "pelican_metadata_generator.post",
+    "pelican_metadata_generator.query",
+    "pelican_metadata_generator.records",
+    "pelican_metadata_generator.scanner",
+    "pelican_metadata_generator.suggestions",
+    "pelican_metadata_generator.vocabulary",
+    "pelican_metadata_generator.walker",
+]
+
+# Seconds; core takes about 0.04 s to import, leaving room for slow machines
+CORE_IMPORT_BUDGET = 0.15
+
+
+class TestPostMetadata(unittest.TestCase):
+    def setUp(self):
+        self.metadata = post.PostMetadata()
+
+    def test_headers_skip_empty_fields(self):
+        self.metadata.title = "Title"
+        self.metadata.tags = ["b", "A"]
+
+        self.assertEqual(self.metadata.headers(), {"title": "Title", "tags": "A, b"})
+
+    def test_filename_uses_format_extension(self):
+        self.metadata.slug = "post"
+        self.metadata.file_format = "restructuredtext"
+
+        self.assertEqual(self.metadata.filename, "post.rst")
+
+    def test_formatting_touches_no_files(self):
+        self.metadata.title = "Title"
+        self.metadata.slug = "post"
+        self.metadata.file_format = "markdown"
+
+        with mock.patch("os.stat", side_effect=AssertionError("stat called")):
+            self.assertEqual(self.metadata.as_pelican_header(), "Title: Title\nSlug: post")
+            self.assertEqual(self.metadata.filename, "post.md")
+
+    def test_unsupported_format_is_rejected(self):
+        self.metadata.file_format = "asciidoc"
+
+        with self.assertRaises(NotImplementedError):
+            self.metadata.as_pelican_header()
+
+    def test_metadata_can_be_pickled(self):
+        self.metadata.title = "Title"
+        self.metadata.add_tag("Tag")
+
+        copy = pickle.loads(pickle.dumps(self.metadata))
+
+        self.assertEqual(copy.headers(), self.metadata.headers())
+
+
+class TestFormatHeaders(unittest.TestCase):
+    HEADERS = {"tags": "a, b", "title": "Title", "custom": "x"}
+
+    def test_matches_handler_output(self):
+        for file_format, handler_class in file_handler.HANDLERS.items():
+            handler = handler_class("")
+            handler.headers = dict(self.HEADERS)
+
+            formatted = file_handler.format_headers(file_format, self.HEADERS)
+
+            self.assertEqual(formatted, handler.formatted_headers)
+
+    def test_extension_lookup(self):
+        self.assertEqual(file_handler.default_extension("markdown"), "md")
+        self.assertEqual(file_handler.default_extension("restructuredtext"), "rst")
+        self.assertIs(file_handler.Factory("post.mkd").handler, file_handler.MarkdownHandler)
+
+
+class TestCoreImport(unittest.TestCase):
+    def test_core_imports_within_budget_without_pyqt(self):
+        code = (
+            "import sys, time, json, importlib\n"
+            "start = time.perf_counter()\n"
+            "for name in {modules!r}:\n"
+            "    importlib.import_module(name)\n"
+            "elapsed = time.perf_counter() - start\n"
+            "print(json.dumps([elapsed, 'PyQt5' in sys.modules]))\n"
+        ).format(modules=CORE_MODULES)
+
+        # Best of few runs, so single slow start does not fail the test
+        results = []
+        for _ in range(3):
+            output = subprocess.check_output([sys.executable, "-c", code], env=dict(os.environ))
+            results.append(json.loads(output))
+
+        elapsed = min(result[0] for result in results)
+        self.assertFalse(any(result[1] for result in results))
+        self.assertLess(elapsed, CORE_IMPORT_BUDGET)
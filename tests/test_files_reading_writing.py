@@ -2,7 +2,9 @@ import unittest
 
 import os
 import io
+import shutil
 import logging
+import tempfile
 
 from pelican_metadata_generator import file_handler
 
@@ -54,6 +56,238 @@ class TestPostFile(unittest.TestCase):
 
         self.assertIsInstance(post, file_handler.MarkdownHandler)
 
+    def test_headers_only_is_passed_to_handler(self):
+        post = file_handler.Factory(
+            os.path.join(CONTENT_PATH, "file_with_headers.md"), headers_only=True
+        ).generate()
+
+        self.assertTrue(post.headers_only)
+
+
+class TestHeadersOnly(unittest.TestCase):
+    def _stream(self, lines, headers_end):
+        for i, line in enumerate(lines):
+            if i > headers_end + 1:
+                raise AssertionError("Read past the end of headers")
+            yield line
+
+    def test_markdown_stops_reading_after_headers(self):
+        expected_headers = {"title": "Big post", "tags": "A, B"}
+        lines = ["Title: Big post\n", "Tags: A, B\n", "\n"] + ["Content\n"] * 100
+        md = file_handler.MarkdownHandler(
+            os.path.join(CONTENT_PATH, "file_that_doesnt_exist.md"), headers_only=True
+        )
+
+        md.read_stream(self._stream(lines, 2))
+
+        self.assertEqual(md.headers, expected_headers)
+        self.assertEqual(md.post_content, "")
+        self.assertEqual(md.raw_content, "")
+
+    def test_restructuredtext_stops_reading_after_headers(self):
+        expected_headers = {"title": "Big post", "tags": "A, B", "category": "C"}
+        lines = ["Big post\n", "########\n", "\n", ":tags: A, B\n", ":category: C\n", "\n"]
+        lines += ["Content\n"] * 100
+        rst = file_handler.RestructuredtextHandler(
+            os.path.join(CONTENT_PATH, "file_that_doesnt_exist.rst"), headers_only=True
+        )
+
+        rst.read_stream(self._stream(lines, 5))
+
+        self.assertEqual(rst.headers, expected_headers)
+        self.assertEqual(rst.post_content, "")
+        self.assertEqual(rst.raw_content, "")
+
+    def test_headers_are_the_same_as_in_full_read(self):
+        for filename in sorted(os.listdir(CONTENT_PATH)):
+            path = os.path.join(CONTENT_PATH, filename)
+            full = file_handler.Factory(path).generate()
+            headers_only = file_handler.Factory(path, headers_only=True).generate()
+
+            self.assertEqual(headers_only.headers, full.headers, filename)
+
+
+class TestHeaderReading(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.threshold = file_handler.MMAP_THRESHOLD
+
+    def tearDown(self):
+        file_handler.MMAP_THRESHOLD = self.threshold
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, content):
+        path = os.path.join(self.tmp_dir, "post.md")
+        with open(path, "wb") as fh:
+            fh.write(content.encode("utf-8"))
+        return path
+
+    def test_only_start_of_big_file_is_read(self):
+        path = self._write("Title: Big\nTags: A\n\n" + "Content\n" * 100000)
+
+        post = file_handler.Factory(path, headers_only=True).generate()
+
+        self.assertEqual(post.headers, {"title": "Big", "tags": "A"})
+        self.assertEqual(post.bytes_read, file_handler.SNIFF_SIZE)
+
+    def test_long_metadata_block_is_read_past_first_buffer(self):
+        summary = "Résumé " * 5000
+        content = "Title: Long\nSummary: {}\nTags: A\n\nContent\n".format(summary)
+        path = self._write(content + "More\n" * 100000)
+
+        for threshold in [self.threshold, 0]:
+            with self.subTest(mmap_threshold=threshold):
+                file_handler.MMAP_THRESHOLD = threshold
+                post = file_handler.Factory(path, headers_only=True).generate()
+
+                self.assertEqual(post.headers["summary"], summary.strip())
+                self.assertEqual(post.headers["tags"], "A")
+                self.assertEqual(post.header_end, len(content.encode("utf-8")) - 8)
+                self.assertLess(post.bytes_read, os.path.getsize(path) / 2)
+
+
+class TestSaveFile(unittest.TestCase):
+    HEADERS = {"title": "Saved title", "tags": "Saved, Tag"}
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _copy(self, filename):
+        path = os.path.join(self.tmp_dir, filename)
+        shutil.copy(os.path.join(CONTENT_PATH, filename), path)
+        return path
+
+    def _read(self, path):
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    def test_saved_file_is_the_same_as_written_stream(self):
+        for filename in sorted(os.listdir(CONTENT_PATH)):
+            if not filename.endswith((".md", ".rst")):
+                continue
+            for method in ["prepend_headers", "overwrite_headers"]:
+                path = self._copy(filename)
+                full = file_handler.Factory(path).generate()
+                full.headers = dict(self.HEADERS)
+                expected = io.StringIO()
+                getattr(full, method + "_stream")(expected)
+                post = file_handler.Factory(path, headers_only=True).generate()
+                post.headers = dict(self.HEADERS)
+
+                getattr(post, method)()
+
+                self.assertEqual(self._read(path).decode("utf-8"), expected.getvalue(), filename)
+
+    def test_windows_line_endings_are_kept(self):
+        path = os.path.join(self.tmp_dir, "windows.md")
+        with open(path, "wb") as fh:
+            fh.write(b"Title: Old\r\nTags: A\r\n\r\nContent\r\n")
+        post = file_handler.Factory(path, headers_only=True).generate()
+        post.headers = {"title": "New"}
+
+        post.overwrite_headers()
+
+        self.assertEqual(self._read(path), b"Title: New\r\n\r\nContent\r\n")
+
+    def test_old_mac_line_endings_are_kept(self):
+        path = os.path.join(self.tmp_dir, "mac.md")
+        with open(path, "wb") as fh:
+            fh.write(b"Title: Old\rTags: A\r\rContent\r")
+        post = file_handler.Factory(path, headers_only=True).generate()
+
+        self.assertEqual(post.headers, {"title": "Old", "tags": "A"})
+        self.assertEqual(post.newline, "\r")
+        post.headers = {"title": "New"}
+        post.overwrite_headers()
+
+        self.assertEqual(self._read(path), b"Title: New\r\rContent\r")
+
+    def test_failed_save_keeps_original_file(self):
+        path = self._copy("file_with_headers.md")
+        original = self._read(path)
+        post = file_handler.Factory(path, headers_only=True).generate()
+        post.headers = {"title": "New"}
+        copy_file_range = file_handler._copy_file_range
+
+        def broken_copy(*args):
+            raise OSError("Disk full")
+
+        file_handler._copy_file_range = broken_copy
+        try:
+            with self.assertRaises(OSError):
+                post.overwrite_headers()
+        finally:
+            file_handler._copy_file_range = copy_file_range
+
+        self.assertEqual(self._read(path), original)
+        self.assertEqual(os.listdir(self.tmp_dir), ["file_with_headers.md"])
+
+
+class TestEncoding(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, content, filename="post.md"):
+        path = os.path.join(self.tmp_dir, filename)
+        with open(path, "wb") as fh:
+            fh.write(content)
+        return path
+
+    def test_sniff(self):
+        for prefix, complete, expected in [
+            (b"Title: A", True, ("utf-8", b"")),
+            (b"\xef\xbb\xbfTitle: A", True, ("utf-8", b"\xef\xbb\xbf")),
+            (b"Title: Caf\xe9", True, ("cp1252", b"")),
+            (b"Title: \x81", True, ("latin-1", b"")),
+            # Character cut at the end of prefix
+            (b"Title: Caf\xc3", False, ("utf-8", b"")),
+        ]:
+            with self.subTest(prefix=prefix):
+                self.assertEqual(file_handler.sniff(prefix, complete), expected)
+
+    def test_binary_and_utf16_files_are_rejected(self):
+        for prefix in [b"\x89PNG\r\n\x1a\n\0\0", "Title: A".encode("utf-16")]:
+            with self.subTest(prefix=prefix):
+                with self.assertRaises(file_handler.UnreadableFileError):
+                    file_handler.sniff(prefix)
+
+    def test_legacy_encoding_is_read_and_converted_on_save(self):
+        path = self._write("Title: Café\nTags: Été\n\nContenu à lire\n".encode("cp1252"))
+        post = file_handler.Factory(path, headers_only=True).generate()
+
+        self.assertEqual(post.headers["tags"], "Été")
+        self.assertEqual(post.encoding, "cp1252")
+        # Not in cp1252
+        post.headers = {"title": "Déjà vu", "tags": "łódź"}
+        post.overwrite_headers()
+
+        with open(path, "rb") as fh:
+            content = fh.read().decode("utf-8")
+        self.assertEqual(content, "Title: Déjà vu\nTags: łódź\n\nContenu à lire\n")
+
+    def test_byte_order_mark_is_kept_on_save(self):
+        path = self._write(b"\xef\xbb\xbfTitle: Old\n\nContent\n")
+        post = file_handler.Factory(path, headers_only=True).generate()
+
+        self.assertEqual(post.headers["title"], "Old")
+        post.headers = {"title": "New"}
+        post.prepend_headers()
+
+        with open(path, "rb") as fh:
+            self.assertTrue(fh.read().startswith(b"\xef\xbb\xbfTitle: New\n"))
+
+    def test_file_over_size_limit_is_rejected(self):
+        path = self._write(b"Title: A\n\n" + b"x" * 100)
+
+        with self.assertRaises(file_handler.UnreadableFileError):
+            file_handler.Factory(path, max_size=50).generate()
+
 
 class TestMarkdownHandler(unittest.TestCase):
     def test_read_nonexisting_file(self):
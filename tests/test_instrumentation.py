@@ -0,0 +1,62 @@
+import unittest
+
+import os
+import shutil
+import tempfile
+
+from pelican_metadata_generator import cache
+from pelican_metadata_generator import instrumentation
+from pelican_metadata_generator import scanner
+
+
+CUR_DIR = os.path.dirname(__file__)
+CONTENT_PATH = os.path.join(CUR_DIR, "posts")
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = instrumentation.enable()
+        self.files = []
+        self.profiler.add_callback(self.files.append)
+
+    def tearDown(self):
+        instrumentation.disable()
+
+    def test_every_parsed_file_is_reported(self):
+        records = list(scanner.Scanner().scan(CONTENT_PATH))
+
+        self.assertEqual(len(self.files), len(records))
+        self.assertEqual(self.profiler.counters["files_parsed"], len(records))
+        self.assertEqual(sum(self.profiler.histogram), len(records))
+        self.assertGreater(self.profiler.counters["bytes_read"], 0)
+        self.assertGreater(self.profiler.counters["header_lines"], 0)
+        self.assertIn("read", self.profiler.timers)
+
+    def test_cache_hits_and_misses_are_counted(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        metadata_cache = cache.MetadataCache(tmp_dir)
+        list(scanner.Scanner(cache=metadata_cache).scan(CONTENT_PATH))
+
+        records = list(scanner.Scanner(cache=metadata_cache).scan(CONTENT_PATH))
+
+        self.assertEqual(self.profiler.counters["cache_misses"], len(records))
+        self.assertEqual(self.profiler.counters["cache_hits"], len(records))
+        self.assertTrue(all(stats.cached for stats in self.files[len(records) :]))
+
+    def test_summary_lists_slowest_files(self):
+        list(scanner.Scanner().scan(CONTENT_PATH))
+
+        summary = self.profiler.summary()
+
+        slowest = self.profiler.slowest()
+        self.assertEqual(len(slowest), self.profiler.top)
+        self.assertIn(slowest[0][1], summary)
+
+    def test_nothing_is_recorded_when_disabled(self):
+        instrumentation.disable()
+
+        list(scanner.Scanner().scan(CONTENT_PATH))
+
+        self.assertEqual(self.files, [])
+        self.assertEqual(self.profiler.counters["files_parsed"], 0)
@@ -2,14 +2,23 @@ import unittest
 
 import os
 import io
+import shutil
 import logging
+import tempfile
+
+from PyQt5 import QtCore
 
 from pelican_metadata_generator import model
+from pelican_metadata_generator import scanner
 
 
 CUR_DIR = os.path.dirname(__file__)
 CONTENT_PATH = os.path.join(CUR_DIR, "posts")
 
+# Kept for the whole session; application destroyed by garbage collector
+# takes Python-owned QObjects created later down with it
+APP = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
 
 class TestPostMetadata(unittest.TestCase):
     def setUp(self):
@@ -41,6 +50,46 @@ class TestPostMetadata(unittest.TestCase):
 
         self.assertNotIn("authors", headers)
 
+    def test_file_that_cannot_be_read_is_not_saved(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "image.md")
+        with open(path, "wb") as fh:
+            fh.write(b"\x89PNG\r\n\x1a\n\0\0")
+        failed = []
+        self.post_metadata.saveFailed.connect(lambda path, reason: failed.append(path))
+        self.post_metadata.set_title("Title")
+
+        with self.assertLogs(level="WARNING"):
+            self.post_metadata.to_file(path)
+
+        self.assertEqual(failed, [path])
+        with open(path, "rb") as fh:
+            self.assertEqual(fh.read(), b"\x89PNG\r\n\x1a\n\0\0")
+
+    def test_batch_update_emits_changed_once(self):
+        emitted = []
+        self.post_metadata.changed.connect(lambda: emitted.append(True))
+
+        with self.post_metadata.batch_update():
+            self.post_metadata.set_title("Title")
+            with self.post_metadata.batch_update():
+                self.post_metadata.set_slug("title")
+            self.post_metadata.add_tag("Tag")
+            self.assertEqual(emitted, [])
+
+        self.assertEqual(emitted, [True])
+        self.assertEqual(self.post_metadata.slug, "title")
+
+    def test_empty_batch_update_does_not_emit_changed(self):
+        emitted = []
+        self.post_metadata.changed.connect(lambda: emitted.append(True))
+
+        with self.post_metadata.batch_update():
+            pass
+
+        self.assertEqual(emitted, [])
+
 
 class TestMetadataDatabase(unittest.TestCase):
     def setUp(self):
@@ -60,6 +109,39 @@ class TestMetadataDatabase(unittest.TestCase):
 
         self.assertEqual(self.db.tags, expected)
 
+    def test_completion_follows_new_values(self):
+        self.db._parseFile(os.path.join(CONTENT_PATH, "tags_separated_by_comma.md"))
+        self.assertEqual(self.db.complete("tags", "te"), [])
+
+        self.db.add_value("tags", "Testing")
+
+        self.assertEqual(self.db.complete("tags", "te"), ["Testing"])
+
+    def test_renamed_file_is_read_on_rescan(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, "a.md"), "w") as fh:
+            fh.write("Title: Post\nTags: x\n")
+        self.db.read_directory(directory)
+
+        os.rename(os.path.join(directory, "a.md"), os.path.join(directory, "b.md"))
+        self.db.read_directory(directory)
+
+        self.assertEqual(self.db.sorted_values("tags"), ["x"])
+        self.assertIn(os.path.join(directory, "b.md"), self.db.query("tag:x"))
+
+    def test_completion_index_is_kept_while_values_do_not_change(self):
+        self.db._addRecord(scanner.HeaderRecord("a.md", {"tags": "Python, Testing"}))
+        self.db.complete("tags", "py")
+        index = self.db._completion["tags"]
+
+        self.db._addRecord(scanner.HeaderRecord("b.md", {"tags": "Python", "category": "Ops"}))
+        self.db._forgetFile("b.md")
+        self.assertIs(self.db._completion["tags"], index)
+
+        self.db._addRecord(scanner.HeaderRecord("c.md", {"tags": "Pytest"}))
+        self.assertEqual(self.db.complete("tags", "pyte"), ["Pytest"])
+
     def test_reading_files_with_different_categories(self):
         expected = ["Tags testing", "Markdown"]
 
@@ -97,3 +179,112 @@ class TestMetadataDatabase(unittest.TestCase):
         self.db._parseFile(os.path.join(CONTENT_PATH, "authors_field.md"))
 
         self.assertEqual(self.db.authors, expected)
+
+    def test_known_values_are_sorted_case_insensitively(self):
+        expected = ["File", "First", "Tag", "Testing"]
+
+        self.db._parseFile(os.path.join(CONTENT_PATH, "tags_separated_by_comma.md"))
+        self.db._parseFile(os.path.join(CONTENT_PATH, "file_with_headers.md"))
+
+        self.assertEqual(self.db.sorted_values("tags"), expected)
+
+    def test_most_common_values(self):
+        expected = ["Tag", "First"]
+
+        self.db._parseFile(os.path.join(CONTENT_PATH, "tags_separated_by_comma.md"))
+        self.db._parseFile(os.path.join(CONTENT_PATH, "file_with_headers.md"))
+
+        self.assertEqual(self.db.most_common("tags", 2), expected)
+
+    def test_updated_file_replaces_its_values(self):
+        path = os.path.join(CONTENT_PATH, "tags_separated_by_comma.md")
+        self.db._parseFile(path)
+        self.db._parseFile(os.path.join(CONTENT_PATH, "file_with_headers.md"))
+
+        self.db.update_files(removed=[path])
+
+        self.assertEqual(self.db.tags, ["Tag", "File", "Testing"])
+        self.assertEqual(self.db.category, ["Markdown"])
+
+
+class TestBackgroundScan(unittest.TestCase):
+    def setUp(self):
+        self.db = model.MetadataDatabase()
+        self.finished = []
+        self.db.scanFinished.connect(lambda done, elapsed: self.finished.append(done))
+
+    def tearDown(self):
+        self.db.cancel_scan()
+
+    def _wait_for_scan(self):
+        loop = QtCore.QEventLoop()
+        self.db.scanFinished.connect(loop.quit)
+        QtCore.QTimer.singleShot(5000, loop.quit)
+        loop.exec_()
+
+    def test_background_scan_reads_the_same_values(self):
+        expected = model.MetadataDatabase(CONTENT_PATH)
+
+        self.db.read_directory_async(CONTENT_PATH)
+        self._wait_for_scan()
+
+        self.assertEqual(self.db.tags, expected.tags)
+        self.assertEqual(self.db.category, expected.category)
+        self.assertEqual(self.db.authors, expected.authors)
+        self.assertEqual(self.db.path, os.path.abspath(CONTENT_PATH))
+
+    def test_new_scan_cancels_running_scan(self):
+        self.db.read_directory_async(CUR_DIR)
+        self.db.read_directory_async(CONTENT_PATH)
+        self._wait_for_scan()
+
+        self.assertEqual(len(self.finished), 1)
+        self.assertEqual(self.db.path, os.path.abspath(CONTENT_PATH))
+
+    def test_overlapping_directories_are_read_once(self):
+        expected = model.MetadataDatabase(CONTENT_PATH)
+        read = []
+        self.db.directoryRead.connect(read.append)
+
+        self.db.read_directories_async([CONTENT_PATH, CUR_DIR])
+        self._wait_for_scan()
+
+        roots = [os.path.abspath(CONTENT_PATH), os.path.abspath(CUR_DIR)]
+        self.assertEqual(read, roots)
+        self.assertEqual(self.db.roots, roots)
+        for tag in expected.tags:
+            self.assertEqual(self.db.stores["tags"].count(tag), expected.stores["tags"].count(tag))
+        path = os.path.join(os.path.abspath(CONTENT_PATH), "tags_separated_by_comma.md")
+        self.assertEqual(self.db.roots_of(path), tuple(roots))
+
+
+class TestTagListModel(unittest.TestCase):
+    def setUp(self):
+        self.model = model.TagListModel()
+        self.model.set_tags(["b", "D", "f"])
+        self.inserted = []
+        self.removed = []
+        self.toggled = []
+        self.model.rowsInserted.connect(lambda _, first, last: self.inserted.append((first, last)))
+        self.model.rowsRemoved.connect(lambda _, first, last: self.removed.append((first, last)))
+        self.model.tagToggled.connect(lambda tag, checked: self.toggled.append((tag, checked)))
+
+    def test_only_changed_rows_are_inserted_and_removed(self):
+        self.model.set_tags(["a", "c", "C2", "D", "f", "g"])
+
+        self.assertEqual(self.model.tags(), ["a", "c", "C2", "D", "f", "g"])
+        self.assertEqual(self.removed, [(0, 0)])
+        self.assertEqual(sorted(self.inserted), [(0, 2), (2, 2)])
+
+    def test_checked_state(self):
+        self.model.set_checked(["D", "unknown"])
+
+        self.assertEqual(self.model.item(1).checkState(), QtCore.Qt.Checked)
+        self.assertEqual(self.model.item(0).checkState(), QtCore.Qt.Unchecked)
+        self.assertEqual(self.toggled, [])
+
+    def test_user_toggle_emits_signal(self):
+        self.model.item(2).setCheckState(QtCore.Qt.Checked)
+
+        self.assertEqual(self.toggled, [("f", True)])
+        self.assertEqual(self.model.checked_tags(), {"f"})
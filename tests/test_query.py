@@ -0,0 +1,90 @@
+import unittest
+
+from array import array
+
+from pelican_metadata_generator import query
+from pelican_metadata_generator import scanner
+from pelican_metadata_generator import vocabulary
+
+
+POSTS = {
+    "python.md": {"tags": "Python, Packaging", "category": "Ops", "author": "Ann"},
+    "bob.md": {"tags": "Python", "category": "Ops", "author": "Bob"},
+    "web.md": {"tags": "Python, Web Development", "category": "Web", "author": "Anna"},
+    "notes.md": {"title": "No metadata"},
+}
+
+
+class TestQuery(unittest.TestCase):
+    def setUp(self):
+        self.vocabulary = vocabulary.Vocabulary()
+        for path, headers in POSTS.items():
+            self.vocabulary.add_record(scanner.HeaderRecord(path, headers))
+
+    def _search(self, text):
+        return sorted(query.search(self.vocabulary, text))
+
+    def test_and_not(self):
+        result = self._search("tag:python AND category:ops AND NOT author:bob")
+
+        self.assertEqual(result, ["python.md"])
+
+    def test_or_binds_weaker_than_and(self):
+        result = self._search("category:web OR tag:packaging author:bob")
+
+        self.assertEqual(result, ["web.md"])
+
+    def test_parentheses_and_implicit_and(self):
+        result = self._search("(category:web OR author:bob) tag:python")
+
+        self.assertEqual(result, ["bob.md", "web.md"])
+
+    def test_values_ignore_case_and_may_be_quoted(self):
+        self.assertEqual(self._search('tag:"web development"'), ["web.md"])
+        self.assertEqual(self._search('"tags:Web Development"'), ["web.md"])
+
+    def test_prefix(self):
+        self.assertEqual(self._search("author:ann*"), ["python.md", "web.md"])
+
+    def test_not_alone_includes_posts_without_values(self):
+        self.assertEqual(self._search("NOT tag:python"), ["notes.md"])
+
+    def test_forgotten_file_does_not_match(self):
+        self.vocabulary.forget_file("bob.md")
+
+        self.assertEqual(self._search("author:bob"), [])
+        self.assertEqual(self._search("NOT category:web"), ["notes.md", "python.md"])
+
+    def test_unknown_value_matches_nothing(self):
+        self.assertEqual(self._search("tag:rust OR tag:go"), [])
+
+    def test_syntax_errors_report_position(self):
+        for text, position in [
+            ("tag:python AND", 14),
+            ("python", 0),
+            ("colour:red", 0),
+            ("(tag:a OR tag:b", 15),
+            ('tag:"open', 4),
+            ("tag:a)", 5),
+            ("", 0),
+        ]:
+            with self.subTest(text=text):
+                with self.assertRaises(query.QuerySyntaxError) as cm:
+                    query.Query(text)
+                self.assertEqual(cm.exception.position, position)
+
+
+class TestSetOperations(unittest.TestCase):
+    def test_intersection_of_short_and_long_arrays(self):
+        long = array("I", range(0, 1000, 2))
+        third = array("I", range(0, 1000, 3))
+
+        self.assertEqual(list(query.intersection([long, array("I", [3, 4, 998])])), [4, 998])
+        self.assertEqual(list(query.intersection([long, third])), list(range(0, 1000, 6)))
+
+    def test_union_and_difference_stay_sorted(self):
+        first = array("I", [1, 5, 9])
+        second = array("I", [2, 5, 10])
+
+        self.assertEqual(list(query.union([first, second])), [1, 2, 5, 9, 10])
+        self.assertEqual(list(query.difference(first, second)), [1, 9])
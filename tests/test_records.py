@@ -0,0 +1,106 @@
+import unittest
+
+import random
+import itertools
+import tracemalloc
+
+from pelican_metadata_generator import records
+from pelican_metadata_generator import scanner
+from pelican_metadata_generator import suggestions
+from pelican_metadata_generator import vocabulary
+
+
+def blog_records(posts, tags=500, seed=0):
+    """Returns HeaderRecords of posts with Zipf-distributed tags, like real blogs"""
+    rng = random.Random(seed)
+    names = ["Tag {}".format(i) for i in range(tags)]
+    weights = list(itertools.accumulate(1 / rank**1.1 for rank in range(1, tags + 1)))
+    result = []
+    for i in range(posts):
+        post_tags = rng.choices(names, cum_weights=weights, k=rng.randint(1, 6))
+        headers = {
+            "title": "Post {}".format(i),
+            "category": "Category {}".format(rng.randrange(10)),
+            "tags": ", ".join(dict.fromkeys(post_tags)),
+            "authors": "Author {}".format(rng.randrange(20)),
+        }
+        result.append(scanner.HeaderRecord("/blog/content/post-{:07d}.md".format(i), headers))
+    return result
+
+
+class TestRecordStore(unittest.TestCase):
+    def setUp(self):
+        self.store = records.RecordStore(["tags", "category"])
+
+    def test_values_are_stored_by_field(self):
+        self.store.set("post.md", {"tags": ["a", "b"], "category": ["c"]})
+
+        self.assertEqual(self.store.get("post.md"), {"tags": ["a", "b"], "category": ["c"]})
+        self.assertIsNone(self.store.get("other.md"))
+
+    def test_set_returns_previous_values(self):
+        self.store.set("post.md", {"tags": ["old"]})
+
+        previous = self.store.set("post.md", {"tags": ["new"]})
+
+        self.assertEqual(previous, {"tags": ["old"], "category": []})
+        self.assertEqual(self.store.get("post.md")["tags"], ["new"])
+
+    def test_removed_post_is_forgotten(self):
+        self.store.set("post.md", {"tags": ["a"]})
+
+        self.assertEqual(self.store.remove("post.md")["tags"], ["a"])
+
+        self.assertNotIn("post.md", self.store)
+        self.assertEqual(len(self.store), 0)
+
+    def test_values_survive_compaction(self):
+        for i in range(3000):
+            self.store.set("post.md", {"tags": ["tag {}".format(i)]})
+            self.store.set("other.md", {"tags": ["x", "y"], "category": ["c"]})
+
+        self.assertEqual(self.store.get("post.md")["tags"], ["tag 2999"])
+        self.assertEqual(self.store.get("other.md"), {"tags": ["x", "y"], "category": ["c"]})
+        self.assertLess(len(self.store._data), 3000)
+
+
+class TestMemoryBudget(unittest.TestCase):
+    """Metadata of every post must fit in RECORD_BUDGET bytes"""
+
+    POSTS = 5000
+
+    def setUp(self):
+        self.records = blog_records(self.POSTS)
+
+    def _measure(self, *indexes):
+        tracemalloc.start()
+        try:
+            built = [index() for index in indexes]
+            for record in self.records:
+                for index in built:
+                    index.add_record(record)
+            used, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return used / self.POSTS
+
+    def test_vocabulary_and_suggestions_fit_budget(self):
+        used = self._measure(vocabulary.Vocabulary, suggestions.TagSuggestions)
+
+        self.assertLess(used, records.RECORD_BUDGET)
+
+    def test_rescan_does_not_grow_memory(self):
+        index = vocabulary.Vocabulary()
+        for record in self.records:
+            index.add_record(record)
+
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            for record in self.records:
+                index.add_record(record)
+            after, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(after - before, self.POSTS * 4 * 10)
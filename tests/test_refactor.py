@@ -0,0 +1,129 @@
+import unittest
+
+import os
+import shutil
+import tempfile
+
+from pelican_metadata_generator import file_handler
+from pelican_metadata_generator import refactor
+
+
+CUR_DIR = os.path.dirname(__file__)
+CONTENT_PATH = os.path.join(CUR_DIR, "posts")
+
+
+class TestRename(unittest.TestCase):
+    def test_value_is_renamed(self):
+        rename = refactor.Rename("tags", {"Tag": "Renamed"})
+
+        headers = rename.apply({"title": "Post", "tags": "First, Tag"})
+
+        self.assertEqual(headers, {"title": "Post", "tags": "First, Renamed"})
+
+    def test_merged_values_are_not_repeated(self):
+        rename = refactor.Rename("authors", {"Doe": "John Doe", "J. Doe": "John Doe"})
+
+        headers = rename.apply({"authors": "Doe; Someone; J. Doe"})
+
+        self.assertEqual(headers, {"authors": "John Doe; Someone"})
+
+    def test_unaffected_headers_are_not_copied(self):
+        rename = refactor.Rename("category", {"Tag": "Renamed"})
+
+        self.assertIsNone(rename.apply({"category": "Other", "tags": "Tag"}))
+
+
+class TestRewriteFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.tmp_dir, "content")
+        shutil.copytree(CONTENT_PATH, self.content_dir)
+        self.rename = refactor.Rename("tags", {"Tag": "Renamed"})
+        self.threshold = refactor.PARALLEL_THRESHOLD
+
+    def tearDown(self):
+        refactor.PARALLEL_THRESHOLD = self.threshold
+        shutil.rmtree(self.tmp_dir)
+
+    def _read(self, name):
+        with open(os.path.join(self.content_dir, name), encoding="utf-8") as fh:
+            return fh.read()
+
+    def test_only_affected_files_are_found(self):
+        paths = refactor.find_files([self.content_dir], self.rename)
+
+        names = sorted(os.path.basename(path) for path in paths)
+        self.assertIn("tags_separated_by_comma.md", names)
+        self.assertNotIn("authors_field.md", names)
+
+    def test_headers_are_rewritten(self):
+        path = os.path.join(self.content_dir, "file_with_headers.md")
+
+        refactor.rewrite_file(path, self.rename)
+
+        handler = file_handler.Factory(path).generate()
+        self.assertEqual(handler.headers["tags"], "File, Renamed, Testing")
+        self.assertEqual(handler.headers["title"], "File with headers")
+
+    def test_dry_run_returns_diff_and_keeps_file(self):
+        path = os.path.join(self.content_dir, "file_with_headers.md")
+        content = self._read("file_with_headers.md")
+
+        diff = refactor.rewrite_file(path, self.rename, dry_run=True)
+
+        self.assertIn("-Tags: File, Tag, Testing\n", diff)
+        self.assertIn("+Tags: File, Renamed, Testing\n", diff)
+        self.assertEqual(self._read("file_with_headers.md"), content)
+
+    def test_parallel_results_are_in_order(self):
+        refactor.PARALLEL_THRESHOLD = 2
+        paths = sorted(refactor.find_files([self.content_dir], self.rename))
+        expected = list(refactor.rewrite_files(paths, self.rename, dry_run=True))
+
+        results = list(refactor.rewrite_files(paths, self.rename, jobs=2, dry_run=True))
+
+        self.assertEqual(results, expected)
+
+    def _write(self, name, content):
+        path = os.path.join(self.content_dir, name)
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            fh.write(content)
+        return path
+
+    def test_other_headers_are_kept_as_they_are(self):
+        content = (
+            "title: Post\r\n"
+            "Tags: python, Tag\r\n"
+            "modified: 2020-01-02\r\n"
+            "Summary: first line\r\n"
+            "    continued line\r\n"
+            "\r\n"
+            "Content\r\n"
+        )
+        path = self._write("multiline.md", content)
+
+        refactor.rewrite_file(path, self.rename)
+
+        expected = content.replace("Tags: python, Tag", "Tags: python, Renamed")
+        with open(path, "rb") as fh:
+            self.assertEqual(fh.read().decode("utf-8"), expected)
+
+    def test_restructuredtext_list_value_is_joined(self):
+        content = "Post\n####\n\n:tags:\n    - Tag\n    - Other\n:date: 2020-01-01\n\nContent\n"
+        path = self._write("list.rst", content)
+
+        refactor.rewrite_file(path, self.rename)
+
+        expected = "Post\n####\n\n:tags: Renamed; Other\n:date: 2020-01-01\n\nContent\n"
+        self.assertEqual(self._read("list.rst"), expected)
+
+    def test_file_whose_headers_cannot_be_kept_is_reported(self):
+        # Parser keeps last of repeated headers, so only first one would change
+        content = "Tags: Tag\nTags: Tag, Other\n\nContent\n"
+        path = self._write("duplicated.md", content)
+
+        results = list(refactor.rewrite_files([path], self.rename))
+
+        self.assertEqual(results[0][:2], (path, ""))
+        self.assertIsNotNone(results[0][2])
+        self.assertEqual(self._read("duplicated.md"), content)
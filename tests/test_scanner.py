@@ -0,0 +1,108 @@
+import unittest
+
+import os
+import pickle
+import shutil
+import tempfile
+
+from pelican_metadata_generator import model
+from pelican_metadata_generator import scanner
+
+
+CUR_DIR = os.path.dirname(__file__)
+CONTENT_PATH = os.path.join(CUR_DIR, "posts")
+
+
+class TestScanner(unittest.TestCase):
+    def setUp(self):
+        self.threshold = scanner.PARALLEL_THRESHOLD
+
+    def tearDown(self):
+        scanner.PARALLEL_THRESHOLD = self.threshold
+
+    def test_unsupported_file_is_skipped(self):
+        record = scanner.parse_file(os.path.join(CONTENT_PATH, "file.txt"))
+
+        self.assertIsNone(record)
+
+    def test_record_can_be_pickled(self):
+        record = scanner.parse_file(os.path.join(CONTENT_PATH, "file_with_headers.md"))
+
+        copy = pickle.loads(pickle.dumps(record))
+
+        self.assertEqual(copy.path, record.path)
+        self.assertEqual(copy.headers, record.headers)
+
+    def test_parallel_scan_yields_records_in_serial_order(self):
+        serial = list(scanner.Scanner(jobs=1).scan(CONTENT_PATH))
+        scanner.PARALLEL_THRESHOLD = 0
+
+        parallel = list(scanner.Scanner(jobs=2).scan(CONTENT_PATH))
+
+        self.assertEqual([r.path for r in parallel], [r.path for r in serial])
+        self.assertEqual([r.headers for r in parallel], [r.headers for r in serial])
+
+    def test_cancelled_scan_stops_listing_files(self):
+        listed = []
+
+        def cancelled():
+            listed.append(None)
+            return len(listed) > 1
+
+        # Cancelled after tests directory is read, before posts are
+        scan = scanner.Scanner(count_files=True)
+        records = list(scan.scan(CUR_DIR, cancelled))
+
+        self.assertEqual(records, [])
+        self.assertEqual(scan.total, 0)
+
+    def test_parallel_read_directory_matches_serial(self):
+        serial = model.MetadataDatabase(CONTENT_PATH)
+        scanner.PARALLEL_THRESHOLD = 0
+
+        parallel = model.MetadataDatabase(CONTENT_PATH, jobs=3)
+
+        self.assertEqual(parallel.tags, serial.tags)
+        self.assertEqual(parallel.category, serial.category)
+        self.assertEqual(parallel.authors, serial.authors)
+
+
+class TestQuarantine(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        for filename, content in [
+            ("good.md", b"Title: Good\nTags: A\n\nContent\n"),
+            ("image.md", b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR"),
+            ("huge.md", b"Title: Huge\n\n" + b"x" * 1000),
+        ]:
+            with open(os.path.join(self.tmp_dir, filename), "wb") as fh:
+                fh.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_unreadable_files_do_not_stop_scan(self):
+        quarantine = scanner.Quarantine()
+        with self.assertLogs(level="WARNING"):
+            records = list(
+                scanner.Scanner(quarantine=quarantine, max_size=500).scan(self.tmp_dir)
+            )
+
+        self.assertEqual([os.path.basename(r.path) for r in records], ["good.md"])
+        reasons = {os.path.basename(path): reason for path, reason in quarantine}
+        self.assertEqual(sorted(reasons), ["huge.md", "image.md"])
+        self.assertIn("binary", reasons["image.md"])
+
+    def test_file_is_released_once_it_is_read(self):
+        quarantine = scanner.Quarantine()
+        path = os.path.join(self.tmp_dir, "image.md")
+        with self.assertLogs(level="WARNING"):
+            scanner.parse_file(path, quarantine=quarantine)
+        self.assertIn(path, quarantine)
+
+        with open(path, "wb") as fh:
+            fh.write(b"Title: Fixed\n")
+        record = scanner.parse_file(path, quarantine=quarantine)
+
+        self.assertEqual(record.headers["title"], "Fixed")
+        self.assertNotIn(path, quarantine)
@@ -0,0 +1,85 @@
+import unittest
+
+import time
+import random
+
+from pelican_metadata_generator import scanner
+from pelican_metadata_generator import suggestions
+
+
+class TestTagSuggestions(unittest.TestCase):
+    def setUp(self):
+        self.suggestions = suggestions.TagSuggestions()
+        self._add("1.md", "python, qt", category="Code")
+        self._add("2.md", "python, qt, gui", category="Code")
+        self._add("3.md", "python, pelican", category="Blog", author="Ann")
+        self._add("4.md", "travel, photos", category="Life", author="Ann")
+
+    def _add(self, path, tags, category=None, author=None):
+        headers = {"tags": tags}
+        if category:
+            headers["category"] = category
+        if author:
+            headers["author"] = author
+        self.suggestions.add_record(scanner.HeaderRecord(path, headers))
+
+    def test_tags_used_together_are_suggested_first(self):
+        self.assertEqual(self.suggestions.suggest(["python"], n=2), ["qt", "pelican"])
+
+    def test_category_and_author_are_evidence(self):
+        self.assertEqual(set(self.suggestions.suggest(category="Code")), {"python", "qt", "gui"})
+        self.assertEqual(self.suggestions.suggest(["python"], "Blog", ["Ann"], n=1), ["pelican"])
+
+    def test_selected_tags_are_not_suggested(self):
+        self.assertNotIn("qt", self.suggestions.suggest(["python", "qt"]))
+
+    def test_forgotten_file_no_longer_counts(self):
+        self.suggestions.forget_file("3.md")
+
+        self.assertEqual(self.suggestions.suggest(["python"]), ["qt", "gui"])
+        self.assertEqual(self.suggestions.suggest(["pelican"]), [])
+
+    def test_changed_file_replaces_its_counts(self):
+        self.assertEqual(self.suggestions.suggest(["travel"]), ["photos"])
+
+        self._add("4.md", "travel, python")
+
+        self.assertEqual(self.suggestions.suggest(["travel"]), ["python"])
+
+    def test_suggestion_is_fast_with_large_vocabulary(self):
+        rng = random.Random(0)
+        tags = ["tag {}".format(i) for i in range(10000)]
+        for i in range(10000):
+            self._add("{}.md".format(i), ", ".join(rng.sample(tags, 5)), category="C")
+        selected = rng.sample(tags, 5)
+
+        # Every call follows an update of all rows it looks at
+        elapsed = 0
+        for i in range(100):
+            self._add("new.md", ", ".join(selected[:i % 5 + 1]), category="C")
+            start = time.perf_counter()
+            self.suggestions.suggest(selected, "C")
+            elapsed += time.perf_counter() - start
+        elapsed /= 100
+
+        self.assertLess(elapsed, 1e-3)
+
+    def test_top_tags_follow_changing_counts(self):
+        rng = random.Random(0)
+        tags = ["tag {}".format(i) for i in range(200)]
+        for _ in range(3000):
+            path = "{}.md".format(rng.randrange(500))
+            if rng.random() < 0.3:
+                self.suggestions.forget_file(path)
+            else:
+                self._add(path, ", ".join(rng.sample(tags[:rng.choice([20, 200])], 3)), "C")
+
+        files = self.suggestions._files[("category", "C")]
+        ids, counts = self.suggestions._rows[("category", "C")]
+        values = self.suggestions._records.values["tags"]
+        likely = sorted(counts[i] / files for i in range(len(ids)))[::-1]
+        top = self.suggestions.top("category", "C")
+        self.assertGreaterEqual(len(top), suggestions.TOP_K // 2)
+        self.assertEqual([likelihood for likelihood, _ in top], likely[:len(top)])
+        for likelihood, tag in top:
+            self.assertEqual(counts[ids.index(values.get(tag))] / files, likelihood)
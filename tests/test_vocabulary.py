@@ -0,0 +1,115 @@
+import unittest
+
+import os
+import pickle
+
+from pelican_metadata_generator import scanner
+from pelican_metadata_generator import vocabulary
+
+
+CUR_DIR = os.path.dirname(__file__)
+CONTENT_PATH = os.path.join(CUR_DIR, "posts")
+
+
+class TestValueStore(unittest.TestCase):
+    def setUp(self):
+        self.store = vocabulary.ValueStore()
+
+    def test_values_are_unique_and_in_insertion_order(self):
+        expected = ["b", "A", "c"]
+
+        for value in ["b", "A", "b", "c", "A"]:
+            self.store.add(value)
+
+        self.assertEqual(self.store.values, expected)
+
+    def test_add_returns_true_only_for_new_value(self):
+        self.assertTrue(self.store.add("tag", "first.md"))
+        self.assertFalse(self.store.add("tag", "second.md"))
+
+    def test_sorted_values_ignore_case(self):
+        expected = ["apple", "Banana", "cherry"]
+
+        for value in ["cherry", "Banana", "apple"]:
+            self.store.add(value)
+
+        self.assertEqual(self.store.sorted_values(), expected)
+
+    def test_files_using_value_are_counted(self):
+        self.store.add("tag", "first.md")
+        self.store.add("tag", "second.md")
+        self.store.add("tag", "second.md")
+
+        self.assertEqual(self.store.count("tag"), 2)
+        self.assertEqual(self.store.files("tag"), {"first.md", "second.md"})
+
+    def test_most_common(self):
+        expected = ["popular", "medium"]
+
+        self.store.add("rare", "1.md")
+        for path in ["1.md", "2.md"]:
+            self.store.add("medium", path)
+        for path in ["1.md", "2.md", "3.md"]:
+            self.store.add("popular", path)
+
+        self.assertEqual(self.store.most_common(2), expected)
+
+    def test_value_is_forgotten_when_last_file_is_discarded(self):
+        self.store.add("kept", "1.md")
+        self.store.add("kept", "2.md")
+        self.store.add("removed", "1.md")
+
+        self.store.discard("kept", "1.md")
+        self.store.discard("removed", "1.md")
+
+        self.assertEqual(self.store.values, ["kept"])
+        self.assertEqual(self.store.sorted_values(), ["kept"])
+        self.assertNotIn("removed", self.store)
+
+
+    def test_values_readded_between_lookups_are_sorted_once(self):
+        for value in ["b", "a", "c"]:
+            self.store.add(value, "1.md")
+        self.assertEqual(self.store.sorted_values(), ["a", "b", "c"])
+
+        self.store.discard("b", "1.md")
+        self.store.add("b", "2.md")
+        self.store.add("d", "1.md")
+        self.store.discard("d", "1.md")
+        self.store.discard("a", "1.md")
+
+        self.assertEqual(self.store.sorted_values(), ["b", "c"])
+        self.assertEqual(self.store.matching_files("b"), [self.store.file_ids("b")])
+        self.assertEqual(self.store.values, ["c", "b"])
+
+class TestVocabulary(unittest.TestCase):
+    def setUp(self):
+        self.vocabulary = vocabulary.Vocabulary()
+
+    def test_record_values_are_added(self):
+        record = scanner.HeaderRecord(
+            "post.md", {"tags": "First; Tag", "author": "Someone", "title": "Post"}
+        )
+
+        self.vocabulary.add_record(record)
+
+        self.assertEqual(self.vocabulary["tags"].values, ["First", "Tag"])
+        self.assertEqual(self.vocabulary["authors"].values, ["Someone"])
+        self.assertEqual(self.vocabulary["category"].values, [])
+
+    def test_record_replaces_previous_values_of_file(self):
+        self.vocabulary.add_record(scanner.HeaderRecord("post.md", {"tags": "Old"}))
+
+        self.vocabulary.add_record(scanner.HeaderRecord("post.md", {"tags": "New"}))
+
+        self.assertEqual(self.vocabulary.sorted_values("tags"), ["New"])
+
+    def test_vocabulary_can_be_pickled(self):
+        for record in scanner.Scanner().scan(CONTENT_PATH):
+            self.vocabulary.add_record(record)
+
+        copy = pickle.loads(pickle.dumps(self.vocabulary))
+
+        for name in self.vocabulary.stores:
+            self.assertEqual(copy[name].values, self.vocabulary[name].values)
+            self.assertEqual(copy.sorted_values(name), self.vocabulary.sorted_values(name))
@@ -0,0 +1,186 @@
+import unittest
+
+import os
+import shutil
+import tempfile
+
+from pelican_metadata_generator import scanner
+from pelican_metadata_generator import walker
+
+
+CUR_DIR = os.path.dirname(__file__)
+CONTENT_PATH = os.path.join(CUR_DIR, "posts")
+
+
+class TestWalker(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def _create(self, *paths):
+        for path in paths:
+            path = os.path.join(self.tmp_dir, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as fh:
+                fh.write("Title: Post\n")
+
+    def _walk(self, directory=""):
+        paths = walker.walk(os.path.join(self.tmp_dir, directory))
+        return sorted(os.path.relpath(path, self.tmp_dir) for path in paths)
+
+    def test_supported_files_in_os_walk_order(self):
+        expected = [
+            os.path.join(root, filename)
+            for root, _, filenames in os.walk(CONTENT_PATH)
+            for filename in filenames
+            if os.path.splitext(filename)[1] in (".md", ".rst")
+        ]
+
+        self.assertEqual(list(walker.walk(CONTENT_PATH)), expected)
+
+    def test_version_control_directories_are_pruned(self):
+        self._create("post.md", ".git/objects/post.md", "node_modules/a/README.md")
+
+        self.assertEqual(self._walk(), ["post.md"])
+
+    def test_pelican_settings_are_honored(self):
+        self._create(
+            "content/posts/post.md",
+            "content/drafts/draft.md",
+            "content/posts/.#post.md",
+            "content/posts/backup~.md",
+            "notes/note.md",
+            "output/post.md",
+        )
+        with open(os.path.join(self.tmp_dir, "pelicanconf.py"), "w") as fh:
+            fh.write(
+                "import os\n"
+                "PATH = 'content'\n"
+                "ARTICLE_EXCLUDES = ['drafts']\n"
+                "IGNORE_FILES = ['.#*', '*~.md']\n"
+                "THEME = os.path.join(os.getcwd(), 'theme')\n"
+            )
+
+        self.assertEqual(self._walk(), ["content/posts/post.md"])
+        self.assertEqual(self._walk("content"), ["content/posts/post.md"])
+
+    def test_article_paths_limit_walked_directories(self):
+        self._create("content/articles/post.md", "content/pages/page.md")
+        with open(os.path.join(self.tmp_dir, "pelicanconf.py"), "w") as fh:
+            fh.write("PATH = 'content'\nARTICLE_PATHS = ['articles']\n")
+
+        self.assertEqual(self._walk(), ["content/articles/post.md"])
+
+    def test_subdirectory_is_walked_with_settings_of_its_root(self):
+        self._create("content/new/post.md", "content/drafts/new/draft.md")
+        with open(os.path.join(self.tmp_dir, "pelicanconf.py"), "w") as fh:
+            fh.write("PATH = 'content'\nARTICLE_EXCLUDES = ['drafts']\n")
+        walker_ = walker.Walker.for_directory(self.tmp_dir)
+
+        def walk_from(directory):
+            return [p for _, paths in walker_.walk_from(directory) for p in paths]
+
+        new = os.path.join(self.tmp_dir, "content", "new")
+        self.assertEqual(walk_from(new), [os.path.join(new, "post.md")])
+        self.assertEqual(walk_from(os.path.join(self.tmp_dir, "content", "drafts", "new")), [])
+        self.assertTrue(walker_.includes(os.path.join(new, "post.md")))
+        self.assertFalse(walker_.includes(os.path.join(self.tmp_dir, "content", "drafts")))
+
+    def test_configuration_is_not_executed(self):
+        marker = os.path.join(self.tmp_dir, "executed")
+        with open(os.path.join(self.tmp_dir, "pelicanconf.py"), "w") as fh:
+            fh.write("open({!r}, 'w').close()\nPATH = 'content'\n".format(marker))
+
+        settings = walker.read_settings(os.path.join(self.tmp_dir, "pelicanconf.py"))
+
+        self.assertEqual(settings["PATH"], "content")
+        self.assertFalse(os.path.exists(marker))
+
+
+@unittest.skipUnless(hasattr(os, "symlink"), "needs symbolic links")
+class TestMultipleRoots(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        for path in ["shared/series.md", "blog/post.md", "site/page.md"]:
+            path = os.path.join(self.tmp_dir, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as fh:
+                fh.write("Title: Post\nTags: shared\n")
+        self.blog = os.path.join(self.tmp_dir, "blog")
+        self.site = os.path.join(self.tmp_dir, "site")
+        self.shared = os.path.join(self.tmp_dir, "shared")
+        try:
+            os.symlink(self.shared, os.path.join(self.blog, "series"))
+            os.symlink(self.shared, os.path.join(self.site, "series"))
+        except OSError:
+            self.skipTest("symbolic links are not permitted")
+
+    def test_shared_file_is_parsed_once(self):
+        records = list(scanner.Scanner().scan([self.blog, self.site]))
+
+        names = sorted(os.path.basename(record.path) for record in records)
+        self.assertEqual(names, ["page.md", "post.md", "series.md"])
+
+    def test_index_remembers_every_root(self):
+        index = walker.FileIndex()
+        paths = list(walker.Walker.for_directories([self.blog, self.site], index).files())
+
+        shared = [path for path in paths if path.endswith("series.md")]
+        self.assertEqual(len(shared), 1)
+        self.assertEqual(index.roots_of(shared[0]), (self.blog, self.site))
+
+    def test_nested_roots_yield_files_once(self):
+        walker_ = walker.Walker.for_directories([self.tmp_dir, self.blog])
+        paths = list(walker_.files())
+
+        post = os.path.join(self.blog, "post.md")
+        self.assertEqual(len(paths), 3)
+        self.assertEqual(walker_.index.roots_of(post), (self.tmp_dir, self.blog))
+
+    def test_symbolic_link_cycle_is_walked_once(self):
+        os.symlink(self.blog, os.path.join(self.blog, "loop"))
+
+        self.assertEqual(len(list(walker.walk(self.blog))), 2)
+
+    def test_shared_index_keeps_first_path(self):
+        index = walker.FileIndex()
+        first = list(walker.Walker.for_directory(self.blog, index).files())
+
+        second = list(walker.Walker.for_directory(self.site, index).files())
+
+        self.assertIn([p for p in first if p.endswith("series.md")][0], second)
+
+
+class TestRescan(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.index = walker.FileIndex()
+
+    def _write(self, name):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "w") as fh:
+            fh.write("Title: Post\nTags: x\n")
+        return path
+
+    def _files(self):
+        return list(walker.Walker.for_directory(self.tmp_dir, self.index).files())
+
+    def test_renamed_file_is_found_under_new_path(self):
+        old = self._write("a.md")
+        self.assertEqual(self._files(), [old])
+        new = os.path.join(self.tmp_dir, "b.md")
+
+        os.rename(old, new)
+
+        self.assertEqual(self._files(), [new])
+        self.assertNotIn(old, self.index)
+
+    def test_file_replaced_by_rename_is_found_again(self):
+        # Editors save by writing new file and renaming it over the old one
+        path = self._write("a.md")
+        self._files()
+        os.rename(self._write("a.md.tmp.md"), path)
+
+        self.assertEqual(self._files(), [path])
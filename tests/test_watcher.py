@@ -0,0 +1,136 @@
+import unittest
+
+import os
+import shutil
+import tempfile
+
+from PyQt5 import QtCore
+
+from pelican_metadata_generator import model
+from pelican_metadata_generator import watcher
+
+
+CUR_DIR = os.path.dirname(__file__)
+CONTENT_PATH = os.path.join(CUR_DIR, "posts")
+
+# Kept for the whole session; application destroyed by garbage collector
+# takes Python-owned QObjects created later down with it
+APP = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+class TestDirectoryWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.tmp_dir, "content")
+        shutil.copytree(CONTENT_PATH, self.content_dir)
+
+        self.watcher = None
+        self._start()
+
+    def tearDown(self):
+        self.watcher.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def _start(self, poll_interval=0):
+        if self.watcher:
+            self.watcher.stop()
+        self.db = model.MetadataDatabase()
+        self.watcher = watcher.DirectoryWatcher(
+            self.db, delay=50, max_delay=500, poll_interval=poll_interval
+        )
+        self.db.read_directory(self.content_dir)
+        self._wait(self.watcher.watchStarted)
+        self.updates = 0
+        self.db.changed.connect(self._count_update)
+
+    def _count_update(self):
+        self.updates += 1
+
+    def _wait(self, signal):
+        loop = QtCore.QEventLoop()
+        signal.connect(loop.quit)
+        QtCore.QTimer.singleShot(3000, loop.quit)
+        loop.exec_()
+        signal.disconnect(loop.quit)
+
+    def _wait_for_update(self):
+        self._wait(self.db.changed)
+
+    def _write(self, name, content):
+        with open(os.path.join(self.content_dir, name), "w", encoding="utf-8") as fh:
+            fh.write(content)
+
+    def test_new_file_is_read(self):
+        self._write("new_post.md", "Title: New\nTags: Brand new tag\n\nContent\n")
+
+        self._wait_for_update()
+
+        self.assertIn("Brand new tag", self.db.tags)
+
+    def test_modified_file_is_read_again(self):
+        # Files are not watched; modification in place is found by polling
+        self._start(poll_interval=100)
+        self._write("tags_separated_by_comma.md", "Title: Changed\nCategory: Changed\n\n")
+
+        self._wait_for_update()
+
+        self.assertIn("Changed", self.db.category)
+
+    def test_deleted_file_contribution_is_removed(self):
+        self._write("new_post.md", "Title: New\nTags: Short lived\n\nContent\n")
+        self._wait_for_update()
+
+        os.remove(os.path.join(self.content_dir, "new_post.md"))
+        self._wait_for_update()
+
+        self.assertNotIn("Short lived", self.db.tags)
+
+    def test_new_subdirectory_is_read(self):
+        os.mkdir(os.path.join(self.content_dir, "series"))
+        self._write(os.path.join("series", "part.md"), "Title: Part\nTags: Series\n\n")
+
+        self._wait_for_update()
+
+        self.assertIn("Series", self.db.tags)
+
+    def test_burst_of_changes_is_coalesced(self):
+        for i in range(20):
+            self._write("post_{}.md".format(i), "Title: {0}\nTags: Burst {0}\n\n".format(i))
+
+        self._wait_for_update()
+
+        self.assertEqual(self.updates, 1)
+        self.assertIn("Burst 19", self.db.tags)
+
+    def test_only_directories_are_watched(self):
+        os.mkdir(os.path.join(self.content_dir, "series"))
+        self._write(os.path.join("series", "part.md"), "Title: Part\n\n")
+        self._wait_for_update()
+
+        self.assertEqual(self.watcher.watcher.files(), [])
+        self.assertEqual(
+            sorted(self.watcher.watcher.directories()),
+            [self.content_dir, os.path.join(self.content_dir, "series")],
+        )
+
+    def test_new_subdirectory_follows_pelican_settings(self):
+        with open(os.path.join(self.tmp_dir, "pelicanconf.py"), "w") as fh:
+            fh.write("PATH = 'content'\nARTICLE_EXCLUDES = ['drafts']\n")
+        self._start()
+
+        os.mkdir(os.path.join(self.content_dir, "drafts"))
+        self._write(os.path.join("drafts", "draft.md"), "Title: Draft\nTags: Draft\n\n")
+        self._write("post.md", "Title: Post\nTags: Published\n\n")
+        self._wait_for_update()
+
+        self.assertIn("Published", self.db.tags)
+        self.assertNotIn("Draft", self.db.tags)
+
+    def test_new_link_to_known_file_is_not_counted_twice(self):
+        path = os.path.join(self.content_dir, "tags_separated_by_comma.md")
+        counts = {tag: self.db.stores["tags"].count(tag) for tag in self.db.tags}
+
+        os.link(path, os.path.join(self.content_dir, "link.md"))
+        self._wait_for_update()
+
+        self.assertEqual({tag: self.db.stores["tags"].count(tag) for tag in self.db.tags}, counts)